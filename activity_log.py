@@ -0,0 +1,197 @@
+"""
+Tamponlu Aktivite Günlüğü
+log_activity çağrıları veritabanına yazmaz, kaydı bellekteki sınırlı bir kuyruğa
+koyar. Süreç başına bir arka plan iş parçacığı kuyruğu batch_size kayda ulaşınca
+veya flush_interval saniye dolunca tek işlemde (tek COMMIT, tek hazırlanmış INSERT)
+yazar. İsteğin kendi COMMIT'ine ek bir yazma kilidi alınmaz; görüntülenen kitap
+sayfası gibi okuma yolları hiç yazmaz. Kuyruk doluysa yeni kayıt atılır (overflow
+'drop_new') veya en eski kayıt çıkarılır ('drop_oldest'); sayılar stats() ile,
+/api/admin/activity-log ile ve Prometheus'ta görülür. Süreç kapanırken kuyruk boşaltılır
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import metrics
+
+MAX_QUEUE = 10000
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 2.0
+RETRY_DELAY = 0.5
+OVERFLOW_POLICIES = ('drop_new', 'drop_oldest')
+
+class ActivityLogWriter:
+    def __init__(self, max_queue=MAX_QUEUE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, overflow='drop_new'):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f'overflow: {", ".join(OVERFLOW_POLICIES)}')
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.engine = None
+        self.table = None
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pid = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.counters = Counter()
+        self.last_flush_ms = None
+        atexit.register(self.close)
+
+    def bind(self, engine, table):
+        """Yazılacak motor ve tablo (ActivityLog.__table__)"""
+        self.engine = engine
+        self.table = table
+
+    def start(self):
+        """Bu süreçte yazıcı iş parçacığını başlat (fork sonrası her worker kendi kuyruğunu açar)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                # Ana süreçten kopyalanan kuyruk ve sayaçlar bu worker'ın değil
+                self._queue = queue.Queue(self.max_queue)
+                self.counters = Counter()
+            self._pid = pid
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._loop, name='activity-log-writer', daemon=True)
+            self._thread.start()
+
+    # --- Kuyruk ---
+
+    def log(self, user_id, action, details=None, ip_address=None, user_agent=None):
+        """Kaydı kuyruğa koy; zaman damgası şimdi alınır. Kuyruğa girdiyse True"""
+        self.start()
+        record = {
+            'user_id': user_id,
+            'action': action,
+            'details': details,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'timestamp': datetime.utcnow(),
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            if self.overflow == 'drop_new':
+                self._count('dropped')
+                return False
+            try:
+                self._queue.get_nowait()
+                self._count('dropped')
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self._count('dropped')
+                return False
+        self._count('enqueued')
+        return True
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+        if name in ('written', 'dropped', 'failed'):
+            metrics.track_activity_log(name, amount)
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    # --- Yazma ---
+
+    def _write(self, batch):
+        """Kayıtları tek işlemde yaz; kilit vb. hatada bir kez yeniden dener, sonra atar"""
+        if not batch:
+            return
+        if self.engine is None:
+            self._count('failed', len(batch))
+            return
+        started = time.perf_counter()
+        for attempt in (1, 2):
+            try:
+                with self._write_lock, self.engine.begin() as connection:
+                    connection.execute(self.table.insert(), batch)
+                break
+            except Exception as e:
+                if attempt == 2:
+                    self._count('failed', len(batch))
+                    print(f"❌ Aktivite günlüğü yazılamadı ({len(batch)} kayıt atıldı): {e}")
+                    return
+                time.sleep(RETRY_DELAY)
+        self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+        self._count('written', len(batch))
+        self._count('batches')
+
+    def flush(self):
+        """Kuyruktaki her şeyi hemen yaz (kapanışta)"""
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return
+            self._write(batch)
+
+    def _loop(self):
+        stop = self._stop
+        while not stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+            metrics.set_activity_log_depth(self._queue.qsize())
+
+    def close(self):
+        """İş parçacığını durdur ve kuyruğu boşalt"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=self.flush_interval + RETRY_DELAY * 2)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        counters.update(
+            pid=os.getpid(),
+            queue_depth=self._queue.qsize(),
+            max_queue=self.max_queue,
+            batch_size=self.batch_size,
+            flush_interval=self.flush_interval,
+            overflow=self.overflow,
+            last_flush_ms=self.last_flush_ms,
+        )
+        return counters
+
+def init_activity_log(engine, writer):
+    """Yazıcıyı ActivityLog tablosuna bağla"""
+    from models import ActivityLog
+
+    writer.bind(engine, ActivityLog.__table__)
@@ -8,13 +8,15 @@ import json
 import re
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 import pickle
 
+from search_index import fold_turkish
+
 class BookRecommendationEngine:
     """Kitap öneri sistemi"""
     
@@ -115,9 +117,9 @@ class DemandPredictor:
         features.append(book.quantity or 1)
         
         # Son 30 günlük ödünç alma sayısı
-        thirty_days_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+        thirty_days_ago = date.today() - timedelta(days=30)
         recent_borrows = len([t for t in transactions 
-                            if t.isbn == book.isbn and t.borrow_date >= thirty_days_ago])
+                            if t.isbn == book.isbn and t.borrow_date and t.borrow_date >= thirty_days_ago])
         features.append(recent_borrows)
         
         # Mevcut ödünç alma sayısı
@@ -209,15 +211,8 @@ class SmartSearch:
     
     def enhance_search_query(self, query):
         """Arama sorgusunu iyileştir"""
-        # Türkçe karakterleri normalize et
-        replacements = {
-            'ç': 'c', 'ğ': 'g', 'ı': 'i', 'ö': 'o', 'ş': 's', 'ü': 'u',
-            'Ç': 'C', 'Ğ': 'G', 'I': 'I', 'Ö': 'O', 'Ş': 'S', 'Ü': 'U'
-        }
-        
-        normalized_query = query
-        for tr_char, en_char in replacements.items():
-            normalized_query = normalized_query.replace(tr_char, en_char)
+        # Türkçe karakterleri katalog aramasıyla aynı kurallarla katla
+        normalized_query = fold_turkish(query)
         
         # Yaygın yazım hatalarını düzelt
         corrections = {
@@ -233,40 +228,14 @@ class SmartSearch:
         
         return query, normalized_query
     
-    def get_search_suggestions(self, partial_query, books_data):
-        """Arama önerileri getir"""
-        suggestions = []
-        
+    def get_search_suggestions(self, partial_query, books_data=None):
+        """Arama önerileri getir (tüm katalog üzerinde önek indeksinden)"""
         if len(partial_query) < 2:
-            return suggestions
-        
-        partial_lower = partial_query.lower()
-        
-        # Kitap başlıklarından öneriler
-        for book in books_data[:100]:  # İlk 100 kitap
-            if partial_lower in book.title.lower():
-                suggestions.append({
-                    'text': book.title,
-                    'type': 'title',
-                    'isbn': book.isbn
-                })
-            
-            if partial_lower in book.authors.lower():
-                suggestions.append({
-                    'text': book.authors,
-                    'type': 'author',
-                    'isbn': book.isbn
-                })
-        
-        # Benzersiz önerileri döndür
-        seen = set()
-        unique_suggestions = []
-        for suggestion in suggestions:
-            if suggestion['text'] not in seen:
-                seen.add(suggestion['text'])
-                unique_suggestions.append(suggestion)
+            return []
         
-        return unique_suggestions[:10]
+        # books_data artık kullanılmıyor; indeks tüm kitapları kapsar
+        from book_suggest import suggest_books
+        return suggest_books(partial_query, 10)
 
 # Global AI engine instance
 ai_engine = {
@@ -1,6 +1,6 @@
-from flask import request, jsonify, send_file
+from flask import request, jsonify, send_file, abort
 from flask_login import login_required, current_user
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 from werkzeug.utils import secure_filename
 import pandas as pd
 import tempfile
@@ -16,39 +16,52 @@ import qrcode
 from config import app, get_setting
 from models import db, User, Book, Member, Transaction, Category, BookCategory, Notification, SearchHistory, Review, Reservation, Fine, ActivityLog, Settings, EmailTemplate, OnlineBorrowRequest, QRCode
 from utils import (log_activity, fetch_book_info_from_api, calculate_fine, 
-                   send_email, add_notification, generate_qr_code, save_qr_code)
+                   queue_email, add_notification, generate_qr_code, save_qr_code,
+                   checkout_book_copy, close_transaction, release_book_copy)
+from catalog_search import apply_search
+from book_suggest import suggest_books
+from cover_store import cover_response, COVER_IMMUTABLE_MAX_AGE, BOOK_COVER_MAX_AGE
+from pagination import MAX_PER_PAGE, cursor_paginate, InvalidCursor, invalid_cursor_response, positive_int
 from routes import role_required
+from api_performance import cache_response, etag_response, rate_limit
 
 # Books API
 @app.route('/api/books')
+@etag_response('books', 'book_categories', 'categories')
 def api_get_books():
     """API endpoint to get all books"""
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     search = request.args.get('search', '')
     
-    query = Book.query
+    cursor = request.args.get('cursor')
     
-    if search:
-        query = query.filter(
-            db.or_(
-                Book.isbn.contains(search),
-                Book.title.contains(search),
-                Book.authors.contains(search)
-            )
-        )
+    query = apply_search(Book.query, search)
     
-    books = query.paginate(page=page, per_page=per_page, error_out=False)
+    if cursor is not None:
+        # Cursor mode pages in ISBN order and counts only when asked
+        try:
+            books = cursor_paginate(query, [Book.isbn], lambda book: [book.isbn], cursor,
+                                    per_page, descending=False,
+                                    with_total=request.args.get('with_total') == 'true')
+        except InvalidCursor:
+            return invalid_cursor_response()
+    else:
+        books = query.paginate(page=page, per_page=per_page, error_out=False)
+    
+    # Get categories for the whole page in one query
+    page_isbns = [book.isbn for book in books.items]
+    categories_by_isbn = {}
+    if page_isbns:
+        category_rows = db.session.query(BookCategory.book_isbn, Category.name)\
+            .join(Category, Category.id == BookCategory.category_id)\
+            .filter(BookCategory.book_isbn.in_(page_isbns)).all()
+        for book_isbn, category_name in category_rows:
+            categories_by_isbn.setdefault(book_isbn, []).append(category_name)
     
     books_data = []
     for book in books.items:
-        borrowed_count = Transaction.query.filter_by(isbn=book.isbn, return_date=None).count()
-        available = book.quantity - borrowed_count
-        
-        # Get categories
-        categories = db.session.query(Category.name).join(BookCategory)\
-            .filter(BookCategory.book_isbn == book.isbn).all()
-        category_names = [cat[0] for cat in categories]
+        category_names = categories_by_isbn.get(book.isbn, [])
         
         books_data.append({
             'isbn': book.isbn,
@@ -59,14 +72,17 @@ def api_get_books():
             'publishers': book.publishers,
             'languages': book.languages,
             'quantity': book.quantity,
-            'borrowed': borrowed_count,
-            'available': available,
+            'borrowed': book.borrowed_count,
+            'available': book.available_quantity,
             'shelf': book.shelf,
             'cupboard': book.cupboard,
             'categories': ', '.join(category_names),
             'image_path': book.image_path
         })
     
+    if cursor is not None:
+        return jsonify({'books': books_data, **books.meta()})
+    
     return jsonify({
         'books': books_data,
         'total': books.total,
@@ -74,6 +90,15 @@ def api_get_books():
         'current_page': page
     })
 
+@app.route('/api/books/suggest')
+@rate_limit(max_requests=120, window=60, user_limit='600 per minute')
+def api_suggest_books():
+    """Autocomplete suggestions for titles, authors and publishers"""
+    query = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    
+    return jsonify({'suggestions': suggest_books(query, limit)})
+
 @app.route('/api/books/fetch', methods=['POST'])
 def api_fetch_books():
     """Fetch book information from Open Library API"""
@@ -141,9 +166,12 @@ def api_update_book(isbn):
     return jsonify({'success': True, 'message': 'Kitap güncellendi'})
 
 @app.route('/api/books/<isbn>', methods=['GET'])
+@etag_response('books')
 def api_get_book(isbn):
-    """Get single book information"""
-    book = Book.query.get_or_404(isbn)
+    """Get single book information (any ISBN-10/ISBN-13 form)"""
+    book = Book.find_by_isbn(isbn)
+    if not book:
+        abort(404)
     
     return jsonify({
         'isbn': book.isbn,
@@ -156,9 +184,24 @@ def api_get_book(isbn):
         'quantity': book.quantity,
         'shelf': book.shelf,
         'cupboard': book.cupboard,
-        'image_path': book.image_path
+        'image_path': book.image_path,
+        'cover_url': book.cover_url
     })
 
+@app.route('/api/books/<isbn>/cover')
+def api_book_cover(isbn):
+    """Serve the stored cover image of a book (ETag = content hash)"""
+    book = Book.find_by_isbn(isbn)
+    if not book or not book.cover_hash:
+        abort(404)
+    
+    return cover_response(book.cover_hash, BOOK_COVER_MAX_AGE)
+
+@app.route('/covers/<digest>')
+def api_cover_by_hash(digest):
+    """Content-addressed cover URL; the bytes never change, so it is cached for a year"""
+    return cover_response(digest, COVER_IMMUTABLE_MAX_AGE, immutable=True)
+
 @app.route('/api/books/<isbn>', methods=['DELETE'])
 def api_delete_book(isbn):
     """Delete a book"""
@@ -227,8 +270,7 @@ def reserve_book(isbn):
     book = Book.query.get_or_404(isbn)
     
     # Check if book is available
-    borrowed_count = Transaction.query.filter_by(isbn=isbn, return_date=None).count()
-    if book.quantity > borrowed_count:
+    if book.available_quantity > 0:
         return jsonify({'success': False, 'message': 'Kitap zaten mevcut, direkt ödünç alabilirsiniz'}), 400
     
     # Check if user already has an active reservation
@@ -255,17 +297,17 @@ def reserve_book(isbn):
         user_id=current_user.id,
         member_id=member.id,
         queue_position=queue_position,
-        expiry_date=datetime.utcnow() + timedelta(days=int(get_setting('reservation_expiry_days', '3')))
+        expiry_date=datetime.utcnow() + timedelta(days=get_setting('reservation_expiry_days', 3, type=int))
     )
     db.session.add(reservation)
-    db.session.commit()
     
-    # Send notification email
-    send_email(current_user.email, 'reservation_confirmation', {
+    # Send notification email (rezervasyonla aynı işlemde giden kutusuna)
+    queue_email(current_user.email, 'reservation_confirmation', {
         'member_name': current_user.username,
         'book_title': book.title,
         'queue_position': queue_position
     })
+    db.session.commit()
     
     log_activity('reserve_book', f'Reserved book: {book.title}')
     
@@ -278,15 +320,13 @@ def reserve_book(isbn):
 def api_book_availability(isbn):
     """Check book availability"""
     book = Book.query.get_or_404(isbn)
-    borrowed_count = Transaction.query.filter_by(isbn=isbn, return_date=None).count()
-    available_count = book.quantity - borrowed_count
     
     return jsonify({
-        'available': available_count > 0,
+        'available': book.available_quantity > 0,
         'title': book.title,
         'total_count': book.quantity,
-        'available_count': available_count,
-        'borrowed_count': borrowed_count
+        'available_count': book.available_quantity,
+        'borrowed_count': book.borrowed_count
     })
 
 @app.route('/api/books/<isbn>/categories', methods=['GET', 'POST'])
@@ -320,12 +360,14 @@ def api_book_categories(isbn):
         return jsonify({'success': True, 'message': 'Kategoriler güncellendi'})
 
 @app.route('/api/books/<isbn>/details')
+@etag_response('books', 'book_categories', 'categories')
 def api_get_book_details(isbn):
     """Kitap detaylarını döndür"""
     try:
-        book = Book.query.get(isbn)
+        book = Book.find_by_isbn(isbn)
         if not book:
             return jsonify({'success': False, 'message': 'Kitap bulunamadı'})
+        isbn = book.isbn
         
         # Get category name
         category = db.session.query(Category).join(BookCategory, Category.id == BookCategory.category_id)\
@@ -357,6 +399,7 @@ def api_get_members():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     search = request.args.get('search', '')
+    cursor = request.args.get('cursor')
     
     query = Member.query
     
@@ -369,7 +412,15 @@ def api_get_members():
             )
         )
     
-    members = query.paginate(page=page, per_page=per_page, error_out=False)
+    if cursor is not None:
+        try:
+            members = cursor_paginate(query, [Member.id], lambda member: [member.id], cursor,
+                                      per_page, descending=False,
+                                      with_total=request.args.get('with_total') == 'true')
+        except InvalidCursor:
+            return invalid_cursor_response()
+    else:
+        members = query.paginate(page=page, per_page=per_page, error_out=False)
     
     members_data = []
     for member in members.items:
@@ -382,6 +433,9 @@ def api_get_members():
             'uye_turu': member.uye_turu
         })
     
+    if cursor is not None:
+        return jsonify({'members': members_data, **members.meta()})
+    
     return jsonify({
         'members': members_data,
         'total': members.total,
@@ -477,6 +531,7 @@ def api_get_member(id):
     })
 
 @app.route('/api/members/<int:id>/borrows')
+@cache_response(timeout=60, vary=('query',), tags=('transactions:member:{id}',))
 def api_member_borrows(id):
     """Get member's active borrows"""
     borrows = db.session.query(Transaction, Book)\
@@ -511,8 +566,7 @@ def api_member_details(member_id):
     
     active_books = []
     for transaction, book in active_transactions:
-        due_date = datetime.strptime(transaction.due_date, '%Y-%m-%d')
-        days_remaining = (due_date.date() - datetime.now().date()).days
+        days_remaining = (transaction.due_date - date.today()).days
         is_overdue = days_remaining < 0
         
         active_books.append({
@@ -524,7 +578,7 @@ def api_member_details(member_id):
             'due_date': transaction.due_date,
             'days_remaining': days_remaining,
             'is_overdue': is_overdue,
-            'fine_amount': abs(days_remaining) * float(get_setting('daily_fine_amount', '1.0')) if is_overdue else 0
+            'fine_amount': abs(days_remaining) * get_setting('daily_fine_amount', 1.0, type=float) if is_overdue else 0
         })
     
     # Son işlemler
@@ -575,6 +629,7 @@ def api_get_transactions():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     status = request.args.get('status', 'all')  # all, active, returned
+    cursor = request.args.get('cursor')
     
     query = db.session.query(Transaction, Book, Member)\
         .join(Book, Transaction.isbn == Book.isbn)\
@@ -585,9 +640,17 @@ def api_get_transactions():
     elif status == 'returned':
         query = query.filter(Transaction.return_date != None)
     
-    transactions = query.order_by(Transaction.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+    if cursor is not None:
+        # Keyset on the primary key: deep pages cost the same as the first one
+        try:
+            transactions = cursor_paginate(query, [Transaction.id], lambda row: [row[0].id], cursor,
+                                           per_page, with_total=request.args.get('with_total') == 'true')
+        except InvalidCursor:
+            return invalid_cursor_response()
+    else:
+        transactions = query.order_by(Transaction.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
     
-    max_renew = int(get_setting('max_renew_count', '2'))
+    max_renew = get_setting('max_renew_count', 2, type=int)
     transactions_data = []
     for trans, book, member in transactions.items:
         can_renew = (trans.return_date is None and trans.renew_count < max_renew)
@@ -600,10 +663,13 @@ def api_get_transactions():
             'borrow_date': trans.borrow_date,
             'due_date': trans.due_date,
             'return_date': trans.return_date,
-            'is_overdue': trans.return_date is None and trans.due_date < datetime.now().strftime("%Y-%m-%d"),
+            'is_overdue': trans.return_date is None and trans.due_date < date.today(),
             'can_renew': can_renew
         })
     
+    if cursor is not None:
+        return jsonify({'transactions': transactions_data, **transactions.meta()})
+    
     return jsonify({
         'transactions': transactions_data,
         'total': transactions.total,
@@ -617,7 +683,13 @@ def api_borrow_book():
     data = request.json
     isbn = data.get('isbn')
     school_no = data.get('school_no')
-    due_date = data.get('due_date')
+    
+    # Teslim tarihi verilmezse varsayılan ödünç süresi uygulanır
+    try:
+        due_date = date.fromisoformat(data['due_date']) if data.get('due_date') else \
+            date.today() + timedelta(days=get_setting('max_borrow_days', 14, type=int))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Geçersiz teslim tarihi'}), 400
     
     # Find member by school number
     member = Member.query.filter_by(numara=school_no).first()
@@ -636,20 +708,22 @@ def api_borrow_book():
         if penalty_dt and now < penalty_dt:
             return jsonify({'success': False, 'message': f"Bu üye {penalty_dt.strftime('%d.%m.%Y')} tarihine kadar ödünç alamaz (cezalı)."}), 403
     
-    # Check book availability
-    book = Book.query.get(isbn)
+    # Check book availability (scanner may send either ISBN form)
+    book = Book.find_by_isbn(isbn)
     if not book:
         return jsonify({'success': False, 'message': 'Kitap bulunamadı'}), 404
+    isbn = book.isbn
     
-    borrowed_count = Transaction.query.filter_by(isbn=isbn, return_date=None).count()
-    if book.quantity <= borrowed_count:
+    # Reserve a copy atomically, in the same DB transaction as the insert
+    if not checkout_book_copy(isbn):
+        db.session.rollback()
         return jsonify({'success': False, 'message': 'Kitap mevcut değil'}), 400
     
     # Create transaction
     transaction = Transaction(
         isbn=isbn,
         member_id=member.id,
-        borrow_date=datetime.now().strftime("%Y-%m-%d"),
+        borrow_date=date.today(),
         due_date=due_date
     )
     
@@ -674,6 +748,10 @@ def api_return_book():
     if not member:
         return jsonify({'success': False, 'message': 'Üye bulunamadı'}), 404
     
+    book = Book.find_by_isbn(isbn)
+    if book:
+        isbn = book.isbn
+    
     # Find active transaction
     transaction = Transaction.query.filter_by(
         isbn=isbn,
@@ -684,8 +762,11 @@ def api_return_book():
     if not transaction:
         return jsonify({'success': False, 'message': 'Aktif ödünç işlemi bulunamadı'}), 404
     
-    # Update transaction
-    transaction.return_date = datetime.now().strftime("%Y-%m-%d")
+    # Update transaction; sayaç yalnızca ödüncü bu istek kapattıysa düşer
+    if not close_transaction(transaction.id):
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Aktif ödünç işlemi bulunamadı'}), 404
+    release_book_copy(isbn)
     db.session.commit()
     
     return jsonify({'success': True, 'message': 'Kitap iade alındı'})
@@ -697,7 +778,7 @@ def api_get_overdue():
         .join(Book, Transaction.isbn == Book.isbn)\
         .join(Member, Transaction.member_id == Member.id)\
         .filter(Transaction.return_date == None)\
-        .filter(Transaction.due_date < datetime.now().strftime("%Y-%m-%d"))\
+        .filter(Transaction.due_date < date.today())\
         .order_by(Transaction.due_date).all()
     
     overdue_data = []
@@ -708,7 +789,7 @@ def api_get_overdue():
             'book_title': book.title,
             'member_name': member.ad_soyad,
             'due_date': trans.due_date,
-            'days_overdue': (datetime.now() - datetime.strptime(trans.due_date, "%Y-%m-%d")).days
+            'days_overdue': (date.today() - trans.due_date).days
         })
     
     return jsonify({'overdue': overdue_data})
@@ -739,16 +820,13 @@ def api_renew_transaction(id):
         return jsonify({'success': False, 'message': 'Bu kitap zaten iade edilmiş'}), 400
     
     # Check renew limit
-    max_renew = int(get_setting('max_renew_count', '2'))
+    max_renew = get_setting('max_renew_count', 2, type=int)
     if transaction.renew_count >= max_renew:
         return jsonify({'success': False, 'message': 'Maksimum yenileme sayısına ulaştınız'}), 400
     
     # Extend due date by original loan period
-    loan_days = int(get_setting('max_borrow_days', '14'))
-    current_due = datetime.strptime(transaction.due_date, '%Y-%m-%d')
-    new_due = current_due + timedelta(days=loan_days)
-    
-    transaction.due_date = new_due.strftime('%Y-%m-%d')
+    loan_days = get_setting('max_borrow_days', 14, type=int)
+    transaction.due_date = transaction.due_date + timedelta(days=loan_days)
     transaction.renew_count += 1
     
     db.session.commit()
@@ -768,7 +846,10 @@ def api_quick_return(id):
     if transaction.return_date:
         return jsonify({'success': False, 'message': 'Kitap zaten iade edilmiş'}), 400
     
-    transaction.return_date = datetime.now().strftime('%Y-%m-%d')
+    if not close_transaction(transaction.id):
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Kitap zaten iade edilmiş'}), 400
+    release_book_copy(transaction.isbn)
     
     # Calculate fine if overdue
     fine_amount = calculate_fine(transaction.due_date)
@@ -801,9 +882,10 @@ def api_quick_return(id):
     return jsonify({'success': True, 'message': 'Kitap iade alındı'})
 
 @app.route('/api/transactions/stats')
+@cache_response(timeout=60, vary=(), tags=('transactions',))
 def api_transaction_stats():
     """Get transaction statistics"""
-    today = datetime.now().strftime('%Y-%m-%d')
+    today = date.today()
     
     active = Transaction.query.filter_by(return_date=None).count()
     today_due = Transaction.query.filter(
@@ -847,9 +929,7 @@ def api_check_transaction():
     if not transaction:
         return jsonify({'error': 'Transaction not found'}), 404
     
-    due_date = datetime.strptime(transaction.due_date, '%Y-%m-%d')
-    today = datetime.now()
-    days_overdue = max(0, (today - due_date).days)
+    days_overdue = max(0, (date.today() - transaction.due_date).days)
     
     return jsonify({
         'transaction': {
@@ -862,6 +942,8 @@ def api_check_transaction():
 
 # Categories API
 @app.route('/api/categories')
+@etag_response('categories')
+@cache_response(timeout=3600, vary=(), tags=('categories',))
 def api_get_categories():
     """Get all categories"""
     categories = Category.query.all()
@@ -926,9 +1008,15 @@ def api_import_books():
             df = pd.read_excel(filepath)
             
             for _, row in df.iterrows():
-                book = Book.query.get(row.get('ISBN'))
+                code = row.get('ISBN')
+                if pd.isna(code):
+                    continue
+                # Excel ISBN sütununu sayı olarak okuyabilir
+                if isinstance(code, float):
+                    code = int(code)
+                book = Book.find_by_isbn(code)
                 if not book:
-                    book = Book(isbn=row.get('ISBN'))
+                    book = Book(isbn=str(code).strip())
                 
                 book.title = row.get('Başlık', '')
                 book.authors = row.get('Yazar', '')
@@ -1006,16 +1094,18 @@ def api_update_theme():
 @app.route('/api/search/advanced', methods=['POST'])
 def api_advanced_search():
     """Advanced book search"""
-    criteria = request.json
-    
-    query = Book.query
+    criteria = request.get_json(silent=True)
+    if not isinstance(criteria, dict):
+        criteria = {}
+    page = positive_int(criteria.get('page'), 1)
+    per_page = positive_int(criteria.get('per_page'), 50, MAX_PER_PAGE)
+    
+    query = apply_search(Book.query, criteria.get('query'), fields={
+        'title': criteria.get('title'),
+        'authors': criteria.get('author'),
+        'publishers': criteria.get('publisher')
+    })
     
-    if criteria.get('title'):
-        query = query.filter(Book.title.contains(criteria['title']))
-    if criteria.get('author'):
-        query = query.filter(Book.authors.contains(criteria['author']))
-    if criteria.get('publisher'):
-        query = query.filter(Book.publishers.contains(criteria['publisher']))
     if criteria.get('year_from'):
         query = query.filter(Book.publish_date >= str(criteria['year_from']))
     if criteria.get('year_to'):
@@ -1025,23 +1115,20 @@ def api_advanced_search():
         query = query.join(BookCategory).join(Category)\
             .filter(Category.name == criteria['category'])
     
-    books = query.all()
+    books = query.paginate(page=page, per_page=per_page, error_out=False)
     
     # Save search to history
     search_term = json.dumps(criteria, ensure_ascii=False)
     search_history = SearchHistory(
         search_term=search_term,
-        search_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        result_count=len(books)
+        search_date=datetime.now(),
+        result_count=books.total
     )
     db.session.add(search_history)
     db.session.commit()
     
     books_data = []
-    for book in books:
-        borrowed_count = Transaction.query.filter_by(isbn=book.isbn, return_date=None).count()
-        available = book.quantity - borrowed_count
-        
+    for book in books.items:
         books_data.append({
             'isbn': book.isbn,
             'title': book.title,
@@ -1049,7 +1136,12 @@ def api_advanced_search():
             'publish_date': book.publish_date,
             'publishers': book.publishers,
             'quantity': book.quantity,
-            'available': available
+            'available': book.available_quantity
         })
     
-    return jsonify({'books': books_data})
+    return jsonify({
+        'books': books_data,
+        'total': books.total,
+        'pages': books.pages,
+        'current_page': page
+    })
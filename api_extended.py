@@ -1,6 +1,6 @@
 from flask import request, jsonify, send_file
 from flask_login import login_required, current_user
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 from werkzeug.utils import secure_filename
 import pandas as pd
 import tempfile
@@ -12,12 +12,15 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 import qrcode
-import shutil
 import subprocess
 import sys
 
-from config import app, get_setting
-from models import db, User, Book, Member, Transaction, Category, BookCategory, Notification, SearchHistory, Review, Reservation, Fine, ActivityLog, Settings, EmailTemplate, OnlineBorrowRequest, QRCode
+from config import app, get_setting, settings_cache, response_cache, sql_profiler, request_profiler, memory_tracer, activity_log, email_templates, email_dispatcher
+from sqlite_profile import copy_database
+from memory_telemetry import GROUPS as MEMORY_GROUPS, large_objects
+from metrics import requests_served
+from api_performance import cache_response, etag_response, rate_limit
+from models import db, User, Book, Member, Transaction, Category, BookCategory, Notification, SearchHistory, Review, Reservation, Fine, ActivityLog, Settings, EmailTemplate, EmailOutbox, OnlineBorrowRequest, QRCode
 from utils import (log_activity, send_email, add_notification, generate_qr_code, 
                    save_qr_code, process_borrow_transaction, process_return_transaction,
                    generate_books_qr_pdf, generate_members_qr_pdf, export_to_excel,
@@ -25,65 +28,96 @@ from utils import (log_activity, send_email, add_notification, generate_qr_code,
                    reject_online_borrow_request, get_inventory_summary, get_member_statistics,
                    quick_search_books, quick_search_members, generate_user_qr, verify_qr_code, use_qr_code)
 from routes import role_required
+from catalog_search import apply_search
+from pagination import cursor_paginate, InvalidCursor, invalid_cursor_response
+from notification_counter import unread_count
 
 # Notifications API
 @app.route('/api/notifications')
 def api_get_notifications():
-    """Get all notifications"""
+    """Get notifications (created_date, id) cursor ile sayfalı, en yeniden eskiye"""
     unread_only = request.args.get('unread_only', 'false') == 'true'
+    notification_type = request.args.get('type')
     
     query = Notification.query
     if unread_only:
-        query = query.filter_by(is_read=0)
+        query = query.filter(Notification.is_read == 0)
+    if notification_type:
+        query = query.filter(Notification.type == notification_type)
     
-    notifications = query.order_by(Notification.created_date.desc()).all()
+    try:
+        page = cursor_paginate(query, [Notification.created_date, Notification.id],
+                               lambda notif: [notif.created_date, notif.id], request.args.get('cursor'),
+                               request.args.get('per_page', 20, type=int),
+                               with_total=request.args.get('with_total') == 'true')
+    except InvalidCursor:
+        return invalid_cursor_response()
     
     notifications_data = []
-    for notif in notifications:
+    for notif in page.items:
         notifications_data.append({
             'id': notif.id,
             'type': notif.type,
             'message': notif.message,
-            'created_date': notif.created_date,
+            'created_date': notif.created_date.strftime('%Y-%m-%d %H:%M:%S') if notif.created_date else None,
             'is_read': notif.is_read,
             'related_isbn': notif.related_isbn
         })
     
-    return jsonify({'notifications': notifications_data})
+    return jsonify({'notifications': notifications_data, **page.meta()})
+
+@app.route('/api/notifications/unread-count')
+@login_required
+def api_notifications_unread_count():
+    """Okunmamış bildirim sayısı (rozet yoklaması; tek satırlık sayaç okuması)"""
+    response = jsonify({'count': unread_count()})
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 @app.route('/api/notifications/<int:id>/read', methods=['POST'])
 def api_mark_notification_read(id):
     """Mark notification as read"""
-    notification = Notification.query.get_or_404(id)
-    notification.is_read = 1
+    result = db.session.execute(
+        db.update(Notification).where(Notification.id == id, Notification.is_read == 0).values(is_read=1)
+    )
+    if not result.rowcount and db.session.get(Notification, id) is None:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Bildirim bulunamadı'}), 404
     db.session.commit()
     
-    return jsonify({'success': True})
+    return jsonify({'success': True, 'unread_count': unread_count()})
 
 @app.route('/api/notifications/mark-all-read', methods=['POST'])
 @login_required
 def api_mark_all_notifications_read():
     """Mark all notifications as read"""
-    Notification.query.filter_by(is_read=0).update({'is_read': 1})
+    result = db.session.execute(
+        db.update(Notification).where(Notification.is_read == 0).values(is_read=1)
+        .execution_options(synchronize_session=False)
+    )
     db.session.commit()
-    return jsonify({'success': True})
+    return jsonify({'success': True, 'updated': result.rowcount, 'unread_count': unread_count()})
 
 @app.route('/api/notifications/<int:id>', methods=['DELETE'])
 @login_required
 def api_delete_notification(id):
     """Delete a notification"""
-    notification = Notification.query.get_or_404(id)
-    db.session.delete(notification)
+    result = db.session.execute(db.delete(Notification).where(Notification.id == id))
+    if not result.rowcount:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Bildirim bulunamadı'}), 404
     db.session.commit()
-    return jsonify({'success': True})
+    return jsonify({'success': True, 'unread_count': unread_count()})
 
 @app.route('/api/notifications/clear-all', methods=['DELETE'])
 @login_required
 def api_clear_all_notifications():
     """Clear all notifications"""
-    Notification.query.delete()
+    result = db.session.execute(
+        db.delete(Notification).execution_options(synchronize_session=False)
+    )
     db.session.commit()
-    return jsonify({'success': True})
+    return jsonify({'success': True, 'deleted': result.rowcount, 'unread_count': unread_count()})
 
 # Reservations API
 @app.route('/api/reservations/<int:id>/cancel', methods=['POST'])
@@ -156,10 +190,121 @@ def api_update_settings():
             db.session.add(setting)
     
     db.session.commit()
+    settings_cache.invalidate()
     log_activity('update_settings', 'System settings updated')
     
     return jsonify({'success': True, 'message': 'Ayarlar güncellendi'})
 
+@app.route('/api/cache/stats')
+@login_required
+@role_required('admin')
+def api_cache_stats():
+    """API yanıt önbelleği sayaçları (bu worker için)"""
+    return jsonify(response_cache.stats())
+
+@app.route('/api/admin/sql-profile')
+@login_required
+@role_required('admin')
+def api_sql_profile():
+    """Son isteklerin sorgu sayıları, N+1 şüpheleri ve yavaş sorgular (bu worker için)"""
+    limit = max(1, min(request.args.get('limit', 20, type=int), 200))
+    return jsonify(sql_profiler.report(limit))
+
+@app.route('/api/admin/activity-log')
+@login_required
+@role_required('admin')
+def api_activity_log_stats():
+    """Aktivite günlüğü kuyruğu: derinlik, yazılan, atılan ve başarısız kayıtlar (bu worker için)"""
+    return jsonify(activity_log.stats())
+
+@app.route('/api/admin/email-outbox')
+@login_required
+@role_required('admin')
+def api_email_outbox():
+    """Giden kutusu durum sayıları, dağıtıcı sayaçları ve son bırakılan (dead) e-postalar"""
+    return jsonify(email_dispatcher.stats())
+
+@app.route('/api/admin/email-outbox/<int:id>/retry', methods=['POST'])
+@login_required
+@role_required('admin')
+def api_email_outbox_retry(id):
+    """Bırakılmış e-postayı yeniden kuyruğa al"""
+    entry = EmailOutbox.query.get_or_404(id)
+    if entry.status != 'dead':
+        return jsonify({'success': False, 'message': 'Yalnızca bırakılmış e-postalar yeniden denenebilir'}), 400
+    entry.status = 'pending'
+    entry.attempts = 0
+    entry.next_attempt_at = datetime.utcnow()
+    db.session.commit()
+    email_dispatcher.wakeup.set()
+    return jsonify({'success': True})
+
+@app.route('/api/admin/memory')
+@login_required
+@role_required('admin')
+def api_memory_report():
+    """Bu worker'ın RSS/USS belleği, tracemalloc durumu ve büyük nesneleri"""
+    report = memory_tracer.report({**large_objects(), 'response_cache_bytes': response_cache.stats()['bytes']})
+    report['requests_served'] = requests_served()
+    if report['tracemalloc']['tracing'] and request.args.get('top'):
+        group = request.args.get('group', 'module')
+        if group not in MEMORY_GROUPS:
+            return jsonify({'error': f'group: {", ".join(MEMORY_GROUPS)}'}), 400
+        report['top'] = memory_tracer.top(group, max(1, min(request.args.get('limit', 25, type=int), 200)))
+    return jsonify(report)
+
+@app.route('/api/admin/memory/tracemalloc', methods=['POST'])
+@login_required
+@role_required('admin')
+def api_memory_tracemalloc():
+    """tracemalloc'u bu worker'da başlat/durdur (çalışırken ayırma başına ek yük vardır)"""
+    data = request.get_json(silent=True) or {}
+    if data.get('action') == 'start':
+        return jsonify(memory_tracer.start(data.get('frames', 25)))
+    if data.get('action') == 'stop':
+        return jsonify(memory_tracer.stop())
+    return jsonify({'error': 'action: start veya stop'}), 400
+
+@app.route('/api/admin/memory/snapshot', methods=['POST'])
+@login_required
+@role_required('admin')
+def api_memory_snapshot():
+    """Karşılaştırma için anlık görüntü al (worker başına son 5 görüntü saklanır)"""
+    data = request.get_json(silent=True) or {}
+    try:
+        entry = memory_tracer.take(data.get('label'))
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(memory_tracer.describe(entry))
+
+@app.route('/api/admin/memory/diff')
+@login_required
+@role_required('admin')
+def api_memory_diff():
+    """Saklanan görüntüden bu yana bellek farkı (group: module, filename, lineno, traceback)"""
+    group = request.args.get('group', 'module')
+    if group not in MEMORY_GROUPS:
+        return jsonify({'error': f'group: {", ".join(MEMORY_GROUPS)}'}), 400
+    limit = max(1, min(request.args.get('limit', 25, type=int), 200))
+    try:
+        return jsonify(memory_tracer.diff(request.args.get('base', type=int), group, limit))
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+
+@app.route('/api/admin/profiles/<filename>')
+@login_required
+@role_required('admin')
+def api_download_profile(filename):
+    """Kaydedilen profil dosyası (.pstats, .txt veya speedscope için .collapsed)"""
+    filepath = request_profiler.profile_path(filename)
+    if filepath is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    binary = filename.endswith('.pstats')
+    return send_file(os.path.abspath(filepath), as_attachment=binary, download_name=filename,
+                     mimetype='application/octet-stream' if binary else 'text/plain')
+
 # Users Management API
 @app.route('/api/users/<int:id>/toggle-active', methods=['POST'])
 @login_required
@@ -258,8 +403,20 @@ def api_delete_user(id):
 @role_required('admin')
 def api_user_activity(id):
     """Get user activity logs"""
-    activities = ActivityLog.query.filter_by(user_id=id)\
-        .order_by(ActivityLog.timestamp.desc()).limit(50).all()
+    cursor = request.args.get('cursor')
+    query = ActivityLog.query.filter_by(user_id=id)
+    
+    if cursor is not None:
+        try:
+            page = cursor_paginate(query, [ActivityLog.timestamp, ActivityLog.id],
+                                   lambda activity: [activity.timestamp, activity.id], cursor,
+                                   request.args.get('per_page', 50, type=int),
+                                   with_total=request.args.get('with_total') == 'true')
+        except InvalidCursor:
+            return invalid_cursor_response()
+        activities = page.items
+    else:
+        activities = query.order_by(ActivityLog.timestamp.desc()).limit(50).all()
     
     activities_data = []
     for activity in activities:
@@ -270,6 +427,9 @@ def api_user_activity(id):
             'ip_address': activity.ip_address
         })
     
+    if cursor is not None:
+        return jsonify({'activities': activities_data, **page.meta()})
+    
     return jsonify({'activities': activities_data})
 
 # Email Templates API
@@ -286,6 +446,7 @@ def api_update_email_template(id):
     template.is_active = data.get('is_active', template.is_active)
     
     db.session.commit()
+    email_templates.invalidate()
     log_activity('update_email_template', f'Updated template: {template.name}')
     
     return jsonify({'success': True, 'message': 'E-posta şablonu güncellendi'})
@@ -305,8 +466,8 @@ def api_create_backup():
         backup_filename = f'backup_{timestamp}.db'
         backup_path = os.path.join(backup_dir, backup_filename)
         
-        # Copy database file
-        shutil.copy2('instance/books_info.db', backup_path)
+        # Copy database file (WAL içeriği dahil)
+        copy_database('instance/books_info.db', backup_path)
         
         log_activity('create_backup', f'Created backup: {backup_filename}')
         
@@ -352,12 +513,12 @@ def api_restore_backup(filename):
         
         # Mevcut veritabanını yedekle
         try:
-            shutil.copy2('instance/books_info.db', f'instance/books_info_before_restore_{datetime.now().strftime("%Y%m%d_%H%M%S")}.db')
+            copy_database('instance/books_info.db', f'instance/books_info_before_restore_{datetime.now().strftime("%Y%m%d_%H%M%S")}.db')
         except:
             pass
         
         # Yedeği geri yükle
-        shutil.copy2(backup_path, 'instance/books_info.db')
+        copy_database(backup_path, 'instance/books_info.db')
         
         log_activity('restore_backup', f'Restored from backup: {filename}')
         
@@ -521,13 +682,12 @@ def api_books_pdf_bulk():
     
     data = []
     for book in books:
-        borrowed = Transaction.query.filter_by(isbn=book.isbn, return_date=None).count()
         data.append({
             'ISBN': book.isbn,
             'Kitap Adı': book.title,
             'Yazar': book.authors,
             'Yayınevi': book.publishers,
-            'Mevcut/Toplam': f"{book.quantity - borrowed}/{book.quantity}"
+            'Mevcut/Toplam': f"{book.available_quantity}/{book.quantity}"
         })
     
     temp_file = export_to_excel(data, 'Kitaplar')
@@ -566,6 +726,8 @@ def api_members_pdf_bulk():
 @app.route('/api/inventory/summary')
 @login_required
 @role_required('admin')
+@etag_response('books', 'transactions', 'members', 'book_categories', 'categories', private=True)
+@cache_response(timeout=300, vary=(), tags=('books', 'transactions', 'members', 'book_categories'))
 def api_inventory_summary():
     summary = get_inventory_summary()
     return jsonify(summary)
@@ -604,6 +766,7 @@ def api_inventory_pdf():
 @app.route('/api/inventory/member-stats')
 @login_required
 @role_required('admin')
+@cache_response(timeout=300, vary=(), tags=('members', 'transactions'))
 def api_inventory_member_stats():
     stats = get_member_statistics()
     return jsonify(stats)
@@ -639,6 +802,8 @@ def api_inventory_members_pdf():
 
 # Shelf Map API
 @app.route('/api/shelf-map')
+@etag_response('books')
+@cache_response(timeout=600, vary=(), tags=('books',))
 def api_shelf_map():
     books = Book.query.all()
     data = []
@@ -655,6 +820,7 @@ def api_shelf_map():
 # Online Borrow APIs
 @app.route('/api/online-borrow/request', methods=['POST'])
 @login_required
+@rate_limit(max_requests=20, window=3600)
 def api_online_borrow_request():
     """Online ödünç alma talebi oluştur"""
     result = process_online_borrow_request(request.json)
@@ -753,6 +919,7 @@ def api_generate_qr():
     })
 
 @app.route('/api/qr/status/<token>')
+@rate_limit(max_requests=60, window=60, scope='qr')
 def api_qr_status(token):
     """QR kod durumunu kontrol et"""
     result = verify_qr_code(token)
@@ -762,6 +929,7 @@ def api_qr_status(token):
         return jsonify(result), 400
 
 @app.route('/api/qr/verify/<token>', methods=['POST'])
+@rate_limit(max_requests=60, window=60, scope='qr')
 def api_verify_qr(token):
     """QR kodu doğrula ve kullanıcıyı giriş yap"""
     result = verify_qr_code(token)
@@ -794,10 +962,11 @@ def api_verify_qr(token):
 @login_required
 def api_mobile_scan_book(isbn):
     """Mobil cihazda kitap QR kodu tarama"""
-    # Kitap kontrolü
-    book = Book.query.get(isbn)
+    # Kitap kontrolü (tireli/tiresiz ISBN-10 veya ISBN-13)
+    book = Book.find_by_isbn(isbn)
     if not book:
         return jsonify({'success': False, 'message': 'Kitap bulunamadı'}), 404
+    isbn = book.isbn
     
     # Üye kontrolü
     member = Member.query.filter_by(user_id=current_user.id).first()
@@ -808,10 +977,6 @@ def api_mobile_scan_book(isbn):
     if member.penalty_until and datetime.now() < member.penalty_until:
         return jsonify({'success': False, 'message': 'Ceza süreniz devam ediyor'}), 403
     
-    # Kullanılabilirlik kontrolü
-    borrowed_count = Transaction.query.filter_by(isbn=isbn, return_date=None).count()
-    available = book.quantity - borrowed_count
-    
     # Kullanıcının bu kitabı ödünç alıp almadığını kontrol et
     user_borrowed = Transaction.query.filter_by(
         isbn=isbn, 
@@ -825,14 +990,14 @@ def api_mobile_scan_book(isbn):
             'title': book.title,
             'authors': book.authors,
             'isbn': book.isbn,
-            'available': available,
+            'available': book.available_quantity,
             'total': book.quantity,
             'user_borrowed': user_borrowed is not None
         },
         'member_info': {
             'name': member.ad_soyad,
             'active_borrows': Transaction.query.filter_by(member_id=member.id, return_date=None).count(),
-            'max_books': int(get_setting('max_books_per_member', '5'))
+            'max_books': get_setting('max_books_per_member', 5, type=int)
         }
     })
 
@@ -848,9 +1013,13 @@ def api_mobile_borrow(isbn):
     if not member:
         return jsonify({'success': False, 'message': 'Üye kaydınız bulunamadı'}), 404
     
+    book = Book.find_by_isbn(isbn)
+    if not book:
+        return jsonify({'success': False, 'message': 'Kitap bulunamadı'}), 404
+    
     # Gelişmiş işlem API'sini kullan
     return process_borrow_transaction(
-        book=Book.query.get(isbn),
+        book=book,
         member=member,
         method='qr',
         notes=notes
@@ -868,9 +1037,13 @@ def api_mobile_return(isbn):
     if not member:
         return jsonify({'success': False, 'message': 'Üye kaydınız bulunamadı'}), 404
     
+    book = Book.find_by_isbn(isbn)
+    if not book:
+        return jsonify({'success': False, 'message': 'Kitap bulunamadı'}), 404
+    
     # Gelişmiş işlem API'sini kullan
     return process_return_transaction(
-        book=Book.query.get(isbn),
+        book=book,
         member=member,
         method='qr',
         notes=notes
@@ -892,8 +1065,7 @@ def api_mobile_my_books():
     
     books_data = []
     for transaction, book in active_transactions:
-        due_date = datetime.strptime(transaction.due_date, '%Y-%m-%d')
-        days_remaining = (due_date.date() - datetime.now().date()).days
+        days_remaining = (transaction.due_date - date.today()).days
         is_overdue = days_remaining < 0
         
         books_data.append({
@@ -905,8 +1077,8 @@ def api_mobile_my_books():
             'due_date': transaction.due_date,
             'days_remaining': days_remaining,
             'is_overdue': is_overdue,
-            'fine_amount': abs(days_remaining) * float(get_setting('daily_fine_amount', '1.0')) if is_overdue else 0,
-            'cover_image': book.image_path if book.image_path else None
+            'fine_amount': abs(days_remaining) * get_setting('daily_fine_amount', 1.0, type=float) if is_overdue else 0,
+            'cover_image': book.cover_url
         })
     
     return jsonify({
@@ -917,6 +1089,7 @@ def api_mobile_my_books():
 
 # Quick Search APIs
 @app.route('/api/books/search/quick')
+@rate_limit(max_requests=120, window=60, user_limit='600 per minute', scope='search')
 def api_books_quick_search():
     """Hızlı kitap arama API'si - online ve QR kod işlemleri için"""
     query = request.args.get('q', '').strip()
@@ -935,6 +1108,7 @@ def api_members_quick_search():
     return jsonify(result)
 
 @app.route('/api/books/search')
+@rate_limit(max_requests=120, window=60, user_limit='600 per minute', scope='search')
 def api_books_search():
     """Kitap arama API'si"""
     try:
@@ -944,17 +1118,8 @@ def api_books_search():
         limit = request.args.get('limit', 20, type=int)
         
         # Base query
-        books_query = Book.query
-        
-        # Arama filtresi
-        if query:
-            books_query = books_query.filter(
-                db.or_(
-                    Book.title.contains(query),
-                    Book.authors.contains(query),
-                    Book.isbn.contains(query)
-                )
-            )
+        # Arama filtresi (FTS5, BM25 sıralı)
+        books_query = apply_search(Book.query, query)
         
         # Kategori filtresi
         if category:
@@ -964,9 +1129,9 @@ def api_books_search():
         
         # Mevcutluk filtresi
         if availability == 'available':
-            books_query = books_query.filter(Book.quantity > Book.total_borrow_count)
+            books_query = books_query.filter(Book.quantity > Book.borrowed_count)
         elif availability == 'unavailable':
-            books_query = books_query.filter(Book.quantity <= Book.total_borrow_count)
+            books_query = books_query.filter(Book.quantity <= Book.borrowed_count)
         
         # Limit uygula
         books = books_query.limit(limit).all()
@@ -995,6 +1160,7 @@ def api_books_search():
 
 # Statistics APIs
 @app.route('/api/books/stats')
+@cache_response(timeout=60, vary=(), tags=('books', 'transactions'))
 def api_books_stats():
     """Kitap istatistiklerini getir"""
     try:
@@ -1021,7 +1187,7 @@ def api_stats():
         
         # Mevcut kitap sayısı
         available_books = db.session.query(Book).filter(
-            Book.quantity > Book.total_borrow_count
+            Book.quantity > Book.borrowed_count
         ).count()
         
         # Kullanıcının rezervasyon sayısı
@@ -1076,6 +1242,7 @@ def api_my_books():
 
 @app.route('/api/books/recommendations')
 @login_required
+@cache_response(timeout=600, vary=(), tags=('books',))
 def api_books_recommendations():
     """Kitap önerilerini döndür"""
     try:
@@ -1131,7 +1298,7 @@ def api_process_transaction():
         return jsonify({'success': False, 'message': 'Eksik parametreler'}), 400
     
     # Kitap kontrolü
-    book = Book.query.get(isbn)
+    book = Book.find_by_isbn(isbn)
     if not book:
         return jsonify({'success': False, 'message': 'Kitap bulunamadı'}), 404
     
@@ -64,6 +64,10 @@ from routes import *
 from api import *
 from api_extended import *
 
+# Database maintenance CLI commands
+from db_maintenance import register_maintenance_commands
+register_maintenance_commands(app)
+
 # Enhanced routes
 try:
     from routes_enhanced import register_enhanced_routes
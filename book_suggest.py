@@ -0,0 +1,407 @@
+"""
+Kitap Öneri İndeksi
+Başlık, yazar ve yayınevi kelimeleri üzerinde bellekte tutulan önek indeksi;
+öneriler total_borrow_count ağırlığına göre sıralanır ve kitaplar değiştikçe
+yalnızca değişen kitaplar yeniden indekslenir
+"""
+
+import hashlib
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from functools import lru_cache
+
+from models import db, Book, SchemaVersion
+from search_index import TOKEN_RE, fold_turkish
+
+CHANGE_TABLE = 'book_changes'
+
+# Bundan fazla kelimeyle eşleşen öneklerin en iyi adayları önbellekte tutulur;
+# kısa öneklerde yüzlerce listeyi birleştirme maliyetini önler
+MERGE_LIMIT = 32
+TOP_SIZE = 50
+
+# Çok kelimeli sorgularda filtrelenecek en fazla aday
+SCAN_LIMIT = 5000
+
+CHANGE_POLL_SECONDS = 1.0
+CHANGE_BATCH = 1000
+CHANGE_LOG_KEEP = 10000
+# Değişiklik günlüğü olmayan veritabanlarında indeks bu aralıkla yeniden kurulur
+REBUILD_SECONDS = 300
+
+NAME_SEPARATORS = re.compile(r'\s*[,;&]\s*')
+
+def change_log_statements():
+    """books tablosundaki öneriyi etkileyen değişiklikleri sıralı günlüğe yazan tetikleyiciler
+
+    Günlük SQLite tetikleyicileriyle doldurulduğu için masaüstü uygulamasının ve
+    diğer worker süreçlerinin yazdıkları da her süreçte görülür.
+    """
+    return [
+        f"CREATE TABLE IF NOT EXISTS {CHANGE_TABLE} (seq INTEGER PRIMARY KEY AUTOINCREMENT, isbn TEXT NOT NULL)",
+        f"""CREATE TRIGGER IF NOT EXISTS {CHANGE_TABLE}_insert AFTER INSERT ON books BEGIN
+            INSERT INTO {CHANGE_TABLE} (isbn) VALUES (new.isbn);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {CHANGE_TABLE}_delete AFTER DELETE ON books BEGIN
+            INSERT INTO {CHANGE_TABLE} (isbn) VALUES (old.isbn);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {CHANGE_TABLE}_update
+            AFTER UPDATE OF isbn, title, authors, publishers, total_borrow_count ON books BEGIN
+            INSERT INTO {CHANGE_TABLE} (isbn) VALUES (old.isbn);
+            INSERT INTO {CHANGE_TABLE} (isbn) SELECT new.isbn WHERE new.isbn <> old.isbn;
+        END""",
+    ]
+
+CHANGE_LOG_VERSION = hashlib.sha1('\n'.join(change_log_statements()).encode()).hexdigest()
+
+def ensure_change_log():
+    """Değişiklik günlüğünü ve tetikleyicilerini kur (yalnızca SQLite)"""
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    applied = db.session.get(SchemaVersion, 'book_changes')
+    if applied is not None and applied.version == CHANGE_LOG_VERSION:
+        return True
+
+    for statement in change_log_statements():
+        db.session.execute(db.text(statement))
+    if applied is None:
+        applied = SchemaVersion(name='book_changes')
+        db.session.add(applied)
+    applied.version = CHANGE_LOG_VERSION
+    db.session.commit()
+    print("✅ Kitap değişiklik günlüğü kuruldu")
+    return True
+
+def tokenize(text):
+    return TOKEN_RE.findall(fold_turkish(text))
+
+@lru_cache(maxsize=65536)
+def folded_name(text):
+    """Metnin katlanmış, kelimeleri tek boşlukla ayrılmış hali (yazar adları çok tekrarlanır)"""
+    return ' '.join(tokenize(text))
+
+def split_names(text):
+    """'Yazar A, Yazar B' biçimindeki alanı ayrı isimlere böl"""
+    return [name for name in NAME_SEPARATORS.split((text or '').strip()) if name]
+
+def book_entries(isbn, title, authors, publishers):
+    """Bir kitabın katkı verdiği öneriler: {anahtar: (tür, metin, katlanmış metin)}
+
+    Başlıklar kitap başına ayrıdır; yazar ve yayınevleri katlanmış adıyla
+    birleştirilir, ağırlıkları kitaplarının ödünç sayılarının toplamıdır.
+    """
+    entries = {}
+    if title and title.strip():
+        title = title.strip()
+        entries[('title', isbn)] = ('title', title, ' '.join(tokenize(title)))
+    for kind, field in (('author', authors), ('publisher', publishers)):
+        for name in split_names(field):
+            folded = folded_name(name)
+            if folded:
+                entries.setdefault((kind, folded), (kind, name, folded))
+    return entries
+
+class _Entry:
+    __slots__ = ('kind', 'text', 'isbn', 'folded', 'tokens', 'books', 'weight')
+
+    def __init__(self, kind, text, folded, isbn):
+        self.kind = kind
+        self.text = text
+        self.isbn = isbn
+        self.folded = folded
+        self.tokens = tuple(sorted(set(folded.split())))
+        self.books = {}
+        self.weight = 0
+
+class SuggestionIndex:
+    """Katlanmış kelimelerin sıralı dizisi üzerinde önek araması
+
+    Her kelime için öneriler (-ağırlık, metin, anahtar) sırasıyla tutulur; bir
+    önekle eşleşen kelimelerin listeleri heapq.merge ile birleştirilerek en
+    popüler öneriler tüm aday kümesi sıralanmadan bulunur.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}    # anahtar -> _Entry
+        self._tokens = []     # sıralı, benzersiz kelimeler
+        self._postings = {}   # kelime -> sıralı [(-ağırlık, metin, anahtar)]
+        self._top = {}        # geniş önek -> en iyi TOP_SIZE anahtar
+        self._books = {}      # isbn -> katkı verdiği anahtarlar
+        self._built = False
+        self._last_seq = 0
+        self._checked_at = 0.0
+        self._built_at = 0.0
+
+    # Kurulum ve güncelleme
+
+    def build(self):
+        """İndeksi books tablosundan baştan kur"""
+        uses_change_log = db.engine.dialect.name == 'sqlite'
+        last_seq = 0
+        if uses_change_log:
+            last_seq = db.session.execute(
+                db.text(f"SELECT coalesce(max(seq), 0) FROM {CHANGE_TABLE}")).scalar()
+
+        rows = db.session.execute(db.select(
+            Book.isbn, Book.title, Book.authors, Book.publishers, Book.total_borrow_count
+        )).all()
+
+        with self._lock:
+            self._entries, self._tokens, self._postings = {}, [], {}
+            self._top, self._books = {}, {}
+            for row in rows:
+                self._apply_book(row.isbn, row, rank=False)
+
+            for key, entry in self._entries.items():
+                item = (-entry.weight, entry.folded, key)
+                for token in entry.tokens:
+                    self._postings.setdefault(token, []).append(item)
+            for postings in self._postings.values():
+                postings.sort()
+            self._tokens = sorted(self._postings)
+
+            self._last_seq = last_seq
+            self._built = True
+            self._checked_at = self._built_at = time.monotonic()
+
+        if uses_change_log:
+            self._prune_change_log()
+        return len(rows)
+
+    def _prune_change_log(self):
+        """Günlüğün yalnızca son CHANGE_LOG_KEEP kaydını tut
+
+        Bu sınırın gerisinde kalan bir worker sıra numaralarındaki boşluğu görür
+        ve indeksini baştan kurar.
+        """
+        db.session.execute(db.text(f"DELETE FROM {CHANGE_TABLE} WHERE seq <= :seq"),
+                           {'seq': self._last_seq - CHANGE_LOG_KEEP})
+        db.session.commit()
+
+    def refresh(self):
+        """Son kontrolden bu yana değişen kitapları indekse uygula"""
+        if self._built and time.monotonic() - self._checked_at < CHANGE_POLL_SECONDS:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            if not self._built:
+                self.build()
+                return
+            if now - self._checked_at < CHANGE_POLL_SECONDS:
+                return
+            self._checked_at = now
+
+            if db.engine.dialect.name != 'sqlite':
+                if now - self._built_at >= REBUILD_SECONDS:
+                    self.build()
+                return
+
+            changes = db.session.execute(
+                db.text(f"SELECT seq, isbn FROM {CHANGE_TABLE} WHERE seq > :seq ORDER BY seq LIMIT :limit"),
+                {'seq': self._last_seq, 'limit': CHANGE_BATCH + 1}
+            ).all()
+            if not changes:
+                return
+            # Günlük budanmışsa veya çok fazla değişiklik birikmişse baştan kurmak daha ucuz
+            if changes[0].seq != self._last_seq + 1 or len(changes) > CHANGE_BATCH:
+                self.build()
+                return
+
+            isbns = {change.isbn for change in changes}
+            rows = {row.isbn: row for row in db.session.execute(db.select(
+                Book.isbn, Book.title, Book.authors, Book.publishers, Book.total_borrow_count
+            ).where(Book.isbn.in_(isbns))).all()}
+
+            for isbn in isbns:
+                self._apply_book(isbn, rows.get(isbn))
+            self._last_seq = changes[-1].seq
+
+    def _apply_book(self, isbn, row, rank=True):
+        """Kitabın eski katkılarını kaldırıp güncel satırdan yenilerini ekle (row None ise silinmiş)"""
+        old_keys = self._books.pop(isbn, ())
+        new_entries = {}
+        weight = 0
+        if row is not None:
+            weight = row.total_borrow_count or 0
+            new_entries = book_entries(isbn, row.title, row.authors, row.publishers)
+
+        for key in old_keys:
+            if key not in new_entries:
+                self._set_contribution(key, isbn, None, rank)
+
+        for key, (kind, text, folded) in new_entries.items():
+            entry = self._entries.get(key)
+            if entry is not None and kind == 'title' and entry.text != text:
+                # Başlık değiştiyse kelimeleri de değişir
+                self._set_contribution(key, isbn, None, rank)
+            if key not in self._entries:
+                self._add_entry(key, _Entry(kind, text, folded, isbn if kind == 'title' else None), rank)
+            self._set_contribution(key, isbn, weight, rank)
+
+        if new_entries:
+            self._books[isbn] = tuple(new_entries)
+
+    def _add_entry(self, key, entry, rank):
+        self._entries[key] = entry
+        if not rank:
+            return
+        for token in entry.tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = []
+                insort(self._tokens, token)
+            insort(postings, (-entry.weight, entry.folded, key))
+        self._promote(key, entry)
+
+    def _set_contribution(self, key, isbn, weight, rank):
+        """Kitabın öneriye katkısını değiştir (weight None ise kaldır)
+
+        rank False iken (toplu kurulum) kelime listeleri sonradan bir kerede
+        oluşturulur; aksi halde listelerin ağırlık sırası yerinde korunur.
+        """
+        entry = self._entries[key]
+        old_item = (-entry.weight, entry.folded, key)
+        new_weight = entry.weight - entry.books.pop(isbn, 0)
+        if weight is not None:
+            entry.books[isbn] = weight
+            new_weight += weight
+
+        if not entry.books:
+            del self._entries[key]
+            if rank:
+                for token in entry.tokens:
+                    postings = self._postings[token]
+                    del postings[bisect_left(postings, old_item)]
+                    if not postings:
+                        del self._postings[token]
+                        del self._tokens[bisect_left(self._tokens, token)]
+                self._demote(key, entry)
+            return
+
+        if new_weight == entry.weight:
+            return
+        entry.weight = new_weight
+        if not rank:
+            return
+        new_item = (-new_weight, entry.folded, key)
+        for token in entry.tokens:
+            postings = self._postings[token]
+            del postings[bisect_left(postings, old_item)]
+            insort(postings, new_item)
+        if -new_weight < old_item[0]:
+            self._promote(key, entry)
+        else:
+            self._demote(key, entry)
+
+    def _prefixes(self, entry):
+        return {token[:size] for token in entry.tokens for size in range(1, len(token) + 1)}
+
+    def _sort_key(self, key):
+        entry = self._entries[key]
+        return (-entry.weight, entry.folded, key)
+
+    def _promote(self, key, entry):
+        """Ağırlığı artan (veya yeni) öneriyi önbellekteki önek listelerine yerleştir"""
+        for prefix in self._prefixes(entry):
+            top = self._top.get(prefix)
+            if top is None:
+                continue
+            if key not in top:
+                if len(top) >= TOP_SIZE and self._sort_key(key) >= self._sort_key(top[-1]):
+                    continue
+                top.append(key)
+            top.sort(key=self._sort_key)
+            del top[TOP_SIZE:]
+
+    def _demote(self, key, entry):
+        """Ağırlığı azalan veya silinen öneri listeden düşebilir; dolu listeler yeniden hesaplanır"""
+        for prefix in self._prefixes(entry):
+            top = self._top.get(prefix)
+            if top is None or key not in top:
+                continue
+            if len(top) >= TOP_SIZE:
+                del self._top[prefix]
+            elif key in self._entries:
+                top.sort(key=self._sort_key)
+            else:
+                top.remove(key)
+
+    # Sorgulama
+
+    def _token_range(self, prefix):
+        start = bisect_left(self._tokens, prefix)
+        return start, bisect_left(self._tokens, prefix + '\uffff', start)
+
+    def _merged(self, start, end):
+        """Aralıktaki kelimelerin öneri anahtarları, ağırlık sırasıyla (tekrarlar olabilir)"""
+        lists = [self._postings[token] for token in self._tokens[start:end]]
+        return (key for _, _, key in heapq.merge(*lists))
+
+    def _ranked(self, prefix):
+        start, end = self._token_range(prefix)
+        if end - start <= MERGE_LIMIT:
+            yield from self._merged(start, end)
+            return
+
+        top = self._top.get(prefix)
+        if top is None:
+            top = []
+            for key in self._merged(start, end):
+                if key not in top:
+                    top.append(key)
+                    if len(top) == TOP_SIZE:
+                        break
+            self._top[prefix] = top
+        yield from top
+        if len(top) == TOP_SIZE:
+            yield from self._merged(start, end)
+
+    def suggest(self, text, limit=10):
+        """Sorgudaki tüm kelimelerle (önek olarak) eşleşen en popüler öneriler"""
+        terms = tokenize(text)
+        if not terms:
+            return []
+        self.refresh()
+
+        # En uzun (en seçici) kelime adayları üretir, diğerleri filtre olur
+        driver = max(terms, key=len)
+        others = list(terms)
+        others.remove(driver)
+
+        suggestions = []
+        seen_keys, seen_texts = set(), set()
+        with self._lock:
+            for scanned, key in enumerate(self._ranked(driver)):
+                if scanned >= SCAN_LIMIT or len(suggestions) >= limit:
+                    break
+                if key in seen_keys:
+                    continue
+                seen_keys.add(key)
+
+                entry = self._entries[key]
+                if others and not all(any(token.startswith(term) for token in entry.tokens)
+                                      for term in others):
+                    continue
+                if (entry.kind, entry.folded) in seen_texts:
+                    continue
+                seen_texts.add((entry.kind, entry.folded))
+
+                suggestions.append({
+                    'text': entry.text,
+                    'type': entry.kind,
+                    'isbn': entry.isbn,
+                    'borrow_count': entry.weight,
+                })
+        return suggestions
+
+suggestion_index = SuggestionIndex()
+
+def suggest_books(text, limit=10):
+    """Otomatik tamamlama önerileri (başlık, yazar, yayınevi)"""
+    return suggestion_index.suggest(text, limit)
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+import search_index
+from isbn_utils import to_isbn13
+
+
+def populate_isbn13(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    taken = set()
+    for book in Book.objects.only('isbn').order_by('isbn').iterator():
+        isbn13 = to_isbn13(book.isbn)
+        # Aynı ISBN'in ikinci kaydı tekil indeksi bozmasın diye boş bırakılır
+        if isbn13 is None or isbn13 in taken:
+            continue
+        taken.add(isbn13)
+        Book.objects.filter(isbn=book.isbn).update(isbn13=isbn13)
+
+
+def restore_search_triggers(apps, schema_editor):
+    # SQLite'ta kolon eklemek tabloyu yeniden oluşturur ve tetikleyiciler düşer
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        search_index.install(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_book_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='isbn13',
+            field=models.CharField(blank=True, editable=False, help_text='Kanonik ISBN-13 (tiresiz); ISBN olmayan kodlarda boş', max_length=13, null=True, unique=True, verbose_name='ISBN-13'),
+        ),
+        migrations.RunPython(populate_isbn13, migrations.RunPython.noop),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
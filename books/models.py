@@ -4,6 +4,8 @@ from django.utils import timezone
 from django.urls import reverse
 import os
 
+from isbn_utils import to_isbn13
+
 
 class Category(models.Model):
     """
@@ -45,6 +47,16 @@ class Book(models.Model):
         verbose_name='ISBN'
     )
     
+    isbn13 = models.CharField(
+        max_length=13,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='ISBN-13',
+        help_text='Kanonik ISBN-13 (tiresiz); ISBN olmayan kodlarda boş'
+    )
+    
     title = models.TextField(
         verbose_name='Başlık'
     )
@@ -185,6 +197,22 @@ class Book(models.Model):
     def get_absolute_url(self):
         return reverse('books:detail', kwargs={'isbn': self.isbn})
     
+    def save(self, *args, **kwargs):
+        self.isbn13 = to_isbn13(self.isbn)
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def find_by_isbn(cls, code):
+        """Tireli/tiresiz ISBN-10 veya ISBN-13 ile kitabı bul, yoksa None"""
+        if not code:
+            return None
+        isbn13 = to_isbn13(code)
+        if isbn13:
+            book = cls.objects.filter(isbn13=isbn13).first()
+            if book:
+                return book
+        return cls.objects.filter(isbn=str(code).strip()).first()
+    
     def is_available(self):
         """Kitabın mevcut olup olmadığını kontrol eder"""
         return self.available_quantity > 0
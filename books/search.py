@@ -0,0 +1,70 @@
+"""
+Kitap Arama
+Katalog aramasını FTS5 indeksi (bkz. search_index) üzerinden yapan ortak yardımcı
+"""
+
+from django.db import connection
+from django.db.models import Q
+
+import search_index
+from isbn_utils import to_isbn13
+
+_index_ready = None
+
+
+def search_index_available():
+    """FTS5 arama indeksi bu veritabanında kurulu mu"""
+    global _index_ready
+    if _index_ready is None:
+        _index_ready = connection.vendor == 'sqlite' and \
+            search_index.SEARCH_TABLE in connection.introspection.table_names()
+    return _index_ready
+
+
+def search_books(queryset, query):
+    """Kitap queryset'ini arama terimiyle daralt, BM25 skoruna göre sırala"""
+    query = (query or '').strip()
+    if not query:
+        return queryset
+
+    if search_index.is_isbn_query(query):
+        isbn13 = to_isbn13(query)
+        if isbn13:
+            return queryset.filter(Q(isbn13=isbn13) | Q(isbn=query))
+        return queryset.filter(Q(isbn__icontains=query) | Q(isbn__icontains=search_index.normalize_isbn(query)))
+
+    match = search_index.match_expression(query)
+    if match is None:
+        return queryset
+    if not search_index_available():
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(authors__icontains=query) |
+            Q(isbn__icontains=query)
+        )
+    if search_index.is_numeric_query(query):
+        # "1984" gibi sayısal terimler: başlık eşleşmeleri ve ISBN parçası eşleşmeleri birlikte
+        digits = search_index.normalize_isbn(query)
+        matched = search_books_fts(queryset, match).order_by().values('pk')
+        return queryset.filter(
+            Q(pk__in=matched) | Q(isbn__icontains=query) | Q(isbn__icontains=digits)
+        )
+
+    return search_books_fts(queryset, match)
+
+
+def search_books_fts(queryset, match):
+    """FTS5 MATCH ile daraltılmış, BM25 skoruna göre sıralı queryset"""
+    fts, mapping = search_index.SEARCH_TABLE, search_index.MAP_TABLE
+    weights = ', '.join(str(weight) for weight in search_index.BM25_WEIGHTS)
+    return queryset.extra(
+        select={'search_rank': f'bm25({fts}, {weights})'},
+        tables=[mapping, fts],
+        where=[
+            f'{mapping}.isbn = books.isbn',
+            f'{fts}.rowid = {mapping}.id',
+            f'{fts} MATCH %s',
+        ],
+        params=[match],
+        order_by=['search_rank'],
+    )
@@ -1,12 +1,13 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView, TemplateView
-from django.http import JsonResponse, HttpResponseRedirect
+from django.http import JsonResponse, HttpResponseRedirect, Http404
 from django.db.models import Q, Count, Avg
 from django.core.paginator import Paginator
 from django.utils import timezone
 from django.urls import reverse
 
 from .models import Book, Category, Review, OnlineBorrowRequest, Reservation
+from .search import search_books
 from accounts.models import Member
 from transactions.models import Transaction, Fine
 
@@ -23,11 +24,7 @@ class BookListView(ListView):
         q = self.request.GET.get('q')
         cat = self.request.GET.get('category')
         if q:
-            qs = qs.filter(
-                Q(title__icontains=q) |
-                Q(authors__icontains=q) |
-                Q(isbn__icontains=q)
-            ).distinct()
+            qs = search_books(qs, q).distinct()
         if cat:
             qs = qs.filter(categories__id=cat)
         return qs
@@ -50,6 +47,13 @@ class BookDetailView(DetailView):
     slug_field = 'isbn'
     slug_url_kwarg = 'isbn'
 
+    def get_object(self, queryset=None):
+        # Tireli/tiresiz ISBN-10 veya ISBN-13 ile gelen bağlantılar aynı kitaba gider
+        book = Book.find_by_isbn(self.kwargs.get(self.slug_url_kwarg))
+        if book is None:
+            raise Http404('Kitap bulunamadı')
+        return book
+
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         book = self.object
@@ -70,11 +74,7 @@ class SearchView(TemplateView):
         query = request.GET.get('q', '').strip()
         results = []
         if query:
-            books = Book.objects.filter(
-                Q(title__icontains=query) |
-                Q(authors__icontains=query) |
-                Q(isbn__icontains=query)
-            )[:10]
+            books = search_books(Book.objects.all(), query)[:10]
             results = [
                 {
                     'isbn': b.isbn,
@@ -104,7 +104,9 @@ class OnlineBorrowView(TemplateView):
         pickup_time = request.POST.get('pickup_time')
         notes = request.POST.get('notes', '')
 
-        book = get_object_or_404(Book, isbn=book_isbn)
+        book = Book.find_by_isbn(book_isbn)
+        if book is None:
+            raise Http404('Kitap bulunamadı')
         member = request.user.member_profile
 
         OnlineBorrowRequest.objects.create(
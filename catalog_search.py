@@ -0,0 +1,118 @@
+"""
+Katalog Arama Servisi
+Kitap aramalarının tek giriş noktası: FTS5 + BM25 sıralama, ISBN/barkod araması
+ve FTS5 olmayan veritabanları için LIKE yedeği
+"""
+
+import sqlite3
+
+from isbn_utils import to_isbn13
+from models import db, Book, SchemaVersion
+import search_index
+
+_index_ready = None
+
+def search_index_available():
+    """FTS5 arama indeksi bu veritabanında kurulu mu (süreç başına bir kez bakılır)"""
+    global _index_ready
+    if _index_ready is None:
+        _index_ready = db.engine.dialect.name == 'sqlite' and \
+            db.inspect(db.engine).has_table(search_index.SEARCH_TABLE)
+    return _index_ready
+
+def ensure_search_index(rebuild=False):
+    """Arama indeksini kur veya şema sürümü değiştiyse yeniden oluştur"""
+    global _index_ready
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    applied = db.session.get(SchemaVersion, 'search_index')
+    outdated = applied is not None and applied.version != search_index.SCHEMA_VERSION
+    if applied is not None and not outdated and not rebuild:
+        return True
+    db.session.commit()
+
+    connection = db.engine.raw_connection()
+    try:
+        indexed = search_index.install(connection.cursor(), rebuild=rebuild or outdated)
+        connection.commit()
+    except sqlite3.OperationalError as e:
+        # SQLite FTS5 desteği olmadan derlenmişse LIKE aramasıyla devam edilir
+        connection.rollback()
+        print(f"⚠️ Katalog arama indeksi oluşturulamadı: {e}")
+        _index_ready = False
+        return False
+    finally:
+        connection.close()
+
+    if applied is None:
+        applied = SchemaVersion(name='search_index')
+        db.session.add(applied)
+    applied.version = search_index.SCHEMA_VERSION
+    db.session.commit()
+
+    _index_ready = True
+    if indexed is not None:
+        print(f"✅ Katalog arama indeksi oluşturuldu ({indexed} kitap)")
+    return True
+
+def _identifier_filter(digits):
+    """ISBN'in rakamlarında veya barkodda geçen sayı parçası"""
+    return db.or_(
+        db.func.replace(db.func.replace(Book.isbn, '-', ''), ' ', '').contains(digits),
+        Book.barcode.contains(digits)
+    )
+
+def _like_search(query, text, fields, identifier=None):
+    """FTS5 yokken eski LIKE tabanlı arama"""
+    if text:
+        conditions = [
+            Book.title.contains(text),
+            Book.authors.contains(text),
+            Book.publishers.contains(text)
+        ]
+        if identifier is not None:
+            conditions.append(identifier)
+        query = query.filter(db.or_(*conditions))
+    for column, value in fields.items():
+        query = query.filter(getattr(Book, column).contains(value))
+    return query
+
+def apply_search(query, text=None, fields=None):
+    """Book sorgusunu katalog aramasıyla daralt; sonuçlar BM25 skoruna göre sıralanır
+
+    text serbest metindir; tam bir ISBN ise doğrudan ISBN kolonlarında aranır.
+    "1984" gibi sayısal terimler hem metin olarak hem ISBN/barkod parçası olarak
+    aranır. fields kolon bazlı terimlerdir ({'authors': 'ali'}).
+    """
+    text = (text or '').strip()
+    fields = {column: value.strip() for column, value in (fields or {}).items()
+              if value and value.strip()}
+
+    identifier = None
+    if search_index.is_isbn_query(text):
+        digits = search_index.normalize_isbn(text)
+        isbn13 = to_isbn13(digits)
+        if isbn13:
+            # Tam ISBN: kanonik kolonda indeksli eşitlik
+            query = query.filter(db.or_(Book.isbn13 == isbn13, Book.isbn == text))
+        else:
+            query = query.filter(_identifier_filter(digits))
+        text = ''
+    elif search_index.is_numeric_query(text):
+        identifier = _identifier_filter(search_index.normalize_isbn(text))
+
+    match = search_index.match_expression(text, fields)
+    if match is None:
+        return query
+    if not search_index_available():
+        return _like_search(query, text, fields, identifier)
+
+    ranked = db.text(search_index.ranked_isbns_sql(':match')).bindparams(match=match)\
+        .columns(isbn=db.String, rank=db.Float).subquery('search_rank')
+    if identifier is None:
+        return query.join(ranked, ranked.c.isbn == Book.isbn).order_by(ranked.c.rank)
+    # Metin eşleşmeleri skor sırasıyla önce, yalnızca ISBN/barkodu eşleşenler sonra
+    return query.outerjoin(ranked, ranked.c.isbn == Book.isbn)\
+        .filter(db.or_(ranked.c.isbn.is_not(None), identifier))\
+        .order_by(ranked.c.rank.is_(None), ranked.c.rank)
@@ -6,7 +6,7 @@ Arka plan görevleri: e-posta, raporlama, yedekleme
 import os
 from celery import Celery
 from celery.schedules import crontab
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 
 def make_celery(app):
     """Celery instance oluştur"""
@@ -16,10 +16,13 @@ def make_celery(app):
         broker=app.config.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
     )
     
+    from config import sql_profiler
+    from metrics import task_timer
+    
     class ContextTask(celery.Task):
-        """Flask app context ile task"""
+        """Flask app context ile task (süre metrics'e, sorgular sql_profiler'a yazılır)"""
         def __call__(self, *args, **kwargs):
-            with app.app_context():
+            with app.app_context(), task_timer(self.name), sql_profiler.profile(f'task {self.name}'):
                 return self.run(*args, **kwargs)
     
     celery.Task = ContextTask
@@ -52,6 +55,21 @@ celery_config = {
         'retrain-ai-models': {
             'task': 'celery_app.retrain_ai_models',
             'schedule': crontab(minute=0, hour='*/6'),
+        },
+        # Her saat WAL checkpoint ve PRAGMA optimize (web worker'ları boştayken de)
+        'sqlite-maintenance': {
+            'task': 'celery_app.sqlite_maintenance',
+            'schedule': crontab(minute=30),
+        },
+        # Her dakika e-posta giden kutusunu boşalt (EMAIL_DISPATCHER=external kurulumlarında tek dağıtıcı)
+        'dispatch-email-outbox': {
+            'task': 'celery_app.dispatch_email_outbox',
+            'schedule': crontab(),
+        },
+        # Her saat başı artımlı gecikme taraması (yalnızca durumu değişen ödünçler)
+        'scan-loan-notifications': {
+            'task': 'celery_app.scan_loan_notifications',
+            'schedule': crontab(minute=5),
         }
     },
     'timezone': 'Europe/Istanbul',
@@ -70,65 +88,37 @@ def init_celery(app):
 # Background Tasks
 
 def send_overdue_notifications():
-    """Geciken kitaplar için e-posta bildirimi gönder"""
+    """Geciken kitaplar için üye başına tek özet e-posta (aynı gün yeniden çalışırsa tekrar göndermez)"""
+    return send_loan_digest_task('overdue', "📧 Geciken kitap özetleri")
+
+def send_loan_digest_task(kind, title):
     try:
-        from models import db, Transaction, Member, Book
-        from utils import send_email
-        
-        print("📧 Geciken kitap bildirimleri gönderiliyor...")
+        from config import email_templates, email_dispatcher, get_setting
+        from loan_reminders import send_loan_digests
         
-        # Geciken işlemleri bul
-        today = datetime.now().strftime('%Y-%m-%d')
-        overdue_transactions = Transaction.query.filter(
-            Transaction.return_date == None,
-            Transaction.due_date < today
-        ).all()
+        print(f"{title} hazırlanıyor...")
+        if not get_setting('email_notifications', True, type=bool):
+            print("⚠️ E-posta bildirimleri kapalı")
+            return None
         
-        sent_count = 0
-        
-        for transaction in overdue_transactions:
-            try:
-                member = Member.query.get(transaction.member_id)
-                book = Book.query.get(transaction.isbn)
-                
-                if member and member.email and book:
-                    # Gecikme gün sayısını hesapla
-                    due_date = datetime.strptime(transaction.due_date, '%Y-%m-%d')
-                    days_overdue = (datetime.now().date() - due_date.date()).days
-                    
-                    # E-posta gönder
-                    email_data = {
-                        'member_name': member.ad_soyad,
-                        'book_title': book.title,
-                        'due_date': transaction.due_date,
-                        'days_overdue': days_overdue,
-                        'fine_amount': days_overdue * 1.0  # Günlük 1₺ ceza
-                    }
-                    
-                    success = send_email(
-                        member.email,
-                        'overdue_reminder',
-                        email_data
-                    )
-                    
-                    if success:
-                        sent_count += 1
-                        
-            except Exception as e:
-                print(f"❌ E-posta gönderme hatası (Transaction {transaction.id}): {e}")
+        stats = send_loan_digests(kind, email_templates, get_setting('fine_per_day', 1.0, type=float))
+        if 'missing_template' in stats:
+            print(f"⚠️ E-posta şablonu bulunamadı: {stats['missing_template']}")
+        # Giden kutusunu hemen boşalt (tek SMTP bağlantısı)
+        stats['dispatch'] = email_dispatcher.dispatch()
         
-        print(f"✅ {sent_count} geciken kitap bildirimi gönderildi")
-        return sent_count
+        print(f"✅ {title}: {stats['emails']} e-posta ({stats['members']} üye, {stats['loans']} ödünç), "
+              f"{stats['seconds']} sn, {stats['loans_per_second']} ödünç/sn; gönderim: {stats['dispatch']}")
+        return stats
         
     except Exception as e:
-        print(f"❌ Geciken kitap bildirimi görevi başarısız: {e}")
-        return 0
+        print(f"❌ {title} görevi başarısız: {e}")
+        return None
 
 def backup_database():
     """Veritabanı yedeği al"""
     try:
-        import shutil
-        import sqlite3
+        from sqlite_profile import copy_database
         from datetime import datetime
         
         print("💾 Veritabanı yedeği alınıyor...")
@@ -145,7 +135,7 @@ def backup_database():
         # SQLite veritabanını kopyala
         db_path = 'instance/library.db'  # SQLite dosya yolu
         if os.path.exists(db_path):
-            shutil.copy2(db_path, backup_path)
+            copy_database(db_path, backup_path)
             
             # Eski yedekleri temizle (30 günden eski olanları)
             cleanup_old_backups(backup_dir, days=30)
@@ -186,9 +176,9 @@ def generate_monthly_reports():
         print("📊 Aylık raporlar oluşturuluyor...")
         
         # Geçen ay verilerini al
-        last_month = datetime.now().replace(day=1) - timedelta(days=1)
-        month_start = last_month.replace(day=1).strftime('%Y-%m-%d')
-        month_end = last_month.strftime('%Y-%m-%d')
+        last_month = date.today().replace(day=1) - timedelta(days=1)
+        month_start = last_month.replace(day=1)
+        month_end = last_month
         
         # Aylık işlem raporu
         monthly_transactions = Transaction.query.filter(
@@ -252,7 +242,7 @@ def update_popular_books():
         print("📈 Popüler kitaplar güncelleniyor...")
         
         # Son 30 günlük verilerle popülerlik skorlarını güncelle
-        thirty_days_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+        thirty_days_ago = date.today() - timedelta(days=30)
         
         # Her kitap için son 30 günlük ödünç alma sayısını hesapla
         books = Book.query.all()
@@ -311,53 +301,51 @@ def retrain_ai_models():
         return False
 
 def send_due_date_reminders():
-    """Teslim tarihi yaklaşan kitaplar için hatırlatma gönder"""
+    """Yarın teslim edilecek kitaplar için üye başına tek hatırlatma (teslim tarihi başına bir kez)"""
+    return send_loan_digest_task('due_soon', "⏰ Teslim tarihi hatırlatmaları")
+
+def sqlite_maintenance():
+    """SQLite WAL checkpoint ve PRAGMA optimize"""
     try:
-        from models import db, Transaction, Member, Book
-        from utils import send_email
-        
-        print("⏰ Teslim tarihi hatırlatmaları gönderiliyor...")
-        
-        # Yarın teslim edilecek kitapları bul
-        tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
-        
-        due_tomorrow = Transaction.query.filter(
-            Transaction.due_date == tomorrow,
-            Transaction.return_date == None
-        ).all()
-        
-        sent_count = 0
-        
-        for transaction in due_tomorrow:
-            try:
-                member = Member.query.get(transaction.member_id)
-                book = Book.query.get(transaction.isbn)
-                
-                if member and member.email and book:
-                    email_data = {
-                        'member_name': member.ad_soyad,
-                        'book_title': book.title,
-                        'due_date': transaction.due_date
-                    }
-                    
-                    success = send_email(
-                        member.email,
-                        'due_date_reminder',
-                        email_data
-                    )
-                    
-                    if success:
-                        sent_count += 1
-                        
-            except Exception as e:
-                print(f"❌ Hatırlatma e-postası gönderme hatası: {e}")
-        
-        print(f"✅ {sent_count} teslim tarihi hatırlatması gönderildi")
-        return sent_count
-        
+        from config import sqlite_maintenance as maintenance, sqlite_profile_enabled
+
+        if not sqlite_profile_enabled:
+            return None
+        result = maintenance.run()
+        print(f"✅ SQLite bakımı tamamlandı (checkpoint: {result})")
+        return result
+
     except Exception as e:
-        print(f"❌ Teslim tarihi hatırlatması görevi başarısız: {e}")
-        return 0
+        print(f"❌ SQLite bakım hatası: {e}")
+        return None
+
+def dispatch_email_outbox():
+    """Giden kutusundaki zamanı gelmiş e-postaları tek SMTP bağlantısıyla gönder"""
+    try:
+        from config import email_dispatcher
+
+        result = email_dispatcher.dispatch()
+        if result.get('sent') or result.get('retried') or result.get('dead'):
+            print(f"✅ Giden kutusu: {result}")
+        return result
+
+    except Exception as e:
+        print(f"❌ E-posta dağıtım hatası: {e}")
+        return None
+
+def scan_loan_notifications():
+    """İade hatırlatması ve gecikme bildirimlerini artımlı olarak üret"""
+    try:
+        from overdue_scanner import scan_loan_notifications as scan
+
+        result = scan()
+        if result['return_reminder'] or result['overdue']:
+            print(f"✅ Gecikme taraması: {result}")
+        return result
+
+    except Exception as e:
+        print(f"❌ Gecikme taraması hatası: {e}")
+        return None
 
 # Task registration (these will be registered when celery starts)
 def register_tasks(celery_app):
@@ -387,6 +375,18 @@ def register_tasks(celery_app):
     def task_send_due_date_reminders():
         return send_due_date_reminders()
     
+    @celery_app.task(name='celery_app.sqlite_maintenance')
+    def task_sqlite_maintenance():
+        return sqlite_maintenance()
+    
+    @celery_app.task(name='celery_app.dispatch_email_outbox')
+    def task_dispatch_email_outbox():
+        return dispatch_email_outbox()
+    
+    @celery_app.task(name='celery_app.scan_loan_notifications')
+    def task_scan_loan_notifications():
+        return scan_loan_notifications()
+    
     print("✅ Celery task'ları kaydedildi")
 
 print("⚙️ Celery background tasks modülü yüklendi!") 
\ No newline at end of file
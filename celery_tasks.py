@@ -3,7 +3,7 @@ Celery Background Tasks
 """
 
 import os
-import shutil
+from sqlite_profile import copy_database
 from celery import Celery
 from datetime import datetime, timedelta
 
@@ -32,7 +32,7 @@ def backup_database():
         db_path = 'instance/library.db'
         if os.path.exists(db_path):
             backup_path = os.path.join(backup_dir, backup_filename)
-            shutil.copy2(db_path, backup_path)
+            copy_database(db_path, backup_path)
             print(f"✅ Yedek oluşturuldu: {backup_filename}")
             return backup_filename
         else:
@@ -0,0 +1,121 @@
+"""
+Koşullu İstekler (ETag / If-None-Match)
+Katalog ve başvuru uçlarının zayıf ETag'i yanıt gövdesinden değil, okudukları
+tabloların değişiklik sürümlerinden üretilir. Sürümler SQLite tetikleyicileriyle
+table_versions tablosunda sayılır; masaüstü uygulamasının ve diğer worker'ların
+yazdıkları da görülür. Eşleşen If-None-Match isteği tek bir küçük SELECT ile,
+ORM'e ve görünüme hiç girmeden 304 döner
+"""
+
+import hashlib
+from functools import wraps
+
+from flask import current_app, g, request
+
+from models import db, SchemaVersion
+
+VERSION_TABLE = 'table_versions'
+
+# Sürümü tutulan tablolar; koşullu uçların okuduğu tablolar burada olmalı
+TRACKED_TABLES = ('books', 'categories', 'book_categories', 'members', 'transactions')
+
+def trigger_name(table, operation):
+    return f"{table}_version_{operation.lower()}"
+
+def version_statements():
+    """Her izlenen tablo için INSERT/UPDATE/DELETE'te sürümü artıran tetikleyiciler"""
+    statements = [
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} "
+        f"(name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID",
+    ]
+    for table in TRACKED_TABLES:
+        statements.append(f"INSERT OR IGNORE INTO {VERSION_TABLE} (name, version) VALUES ('{table}', 0)")
+        for operation in ('INSERT', 'UPDATE', 'DELETE'):
+            statements.append(
+                f"CREATE TRIGGER IF NOT EXISTS {trigger_name(table, operation)} "
+                f"AFTER {operation} ON {table} BEGIN "
+                f"UPDATE {VERSION_TABLE} SET version = version + 1 WHERE name = '{table}'; END"
+            )
+    return statements
+
+TABLE_VERSIONS_VERSION = hashlib.sha1('\n'.join(version_statements()).encode()).hexdigest()
+
+def missing_triggers(names):
+    """sqlite_master'da bulunmayan tetikleyiciler; tablo yeniden oluşturulunca (DROP + RENAME)
+    tetikleyicileri de silinir, kayıtlı sürüm buna güvenmek için yeterli değildir"""
+    installed = set(db.session.scalars(db.text("SELECT name FROM sqlite_master WHERE type = 'trigger'")))
+    return [name for name in names if name not in installed]
+
+def ensure_table_versions(force=False):
+    """Sürüm tablosunu ve tetikleyicilerini kur (yalnızca SQLite)"""
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    applied = db.session.get(SchemaVersion, VERSION_TABLE)
+    triggers = [trigger_name(table, operation) for table in TRACKED_TABLES
+                for operation in ('INSERT', 'UPDATE', 'DELETE')]
+    if (applied is not None and applied.version == TABLE_VERSIONS_VERSION and not force
+            and not missing_triggers(triggers)):
+        return True
+
+    for statement in version_statements():
+        db.session.execute(db.text(statement))
+    if applied is None:
+        applied = SchemaVersion(name=VERSION_TABLE)
+        db.session.add(applied)
+    applied.version = TABLE_VERSIONS_VERSION
+    db.session.commit()
+    print("✅ Tablo sürüm sayaçları kuruldu")
+    return True
+
+def table_versions():
+    """{tablo: sürüm}; istek başına bir kez okunur. Tablo yoksa (SQLite dışı) None"""
+    if 'table_versions' not in g:
+        try:
+            rows = db.session.execute(db.text(f"SELECT name, version FROM {VERSION_TABLE}")).all()
+            g.table_versions = dict(rows) or None
+        except Exception:
+            db.session.rollback()
+            g.table_versions = None
+    return g.table_versions
+
+def change_etag(tables, args, kwargs):
+    """Uç, URL parametreleri ve tablo sürümlerinden zayıf ETag değeri (tırnaksız)"""
+    versions = table_versions()
+    if versions is None or any(table not in versions for table in tables):
+        return None
+    parts = [request.endpoint, repr(args), repr(sorted(kwargs.items()))]
+    parts.extend(f'{table}={versions[table]}' for table in tables)
+    return hashlib.sha1('\x1f'.join(parts).encode()).hexdigest()[:20]
+
+def conditional(*tables, private=False):
+    """Görünüm dekoratörü: tablo sürümlerinden ETag, eşleşen If-None-Match'e 304
+
+    Sorgu parametreleri ETag'e katılmaz; tarayıcı ETag'i URL başına sakladığından
+    aynı sürümde farklı sayfalar çakışmaz. Kimlik/rol kontrolünden sonra kullanılmalı.
+    """
+    cache_control = 'private, no-cache' if private else 'no-cache'
+
+    def decorator(view):
+        @wraps(view)
+        def decorated_function(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+
+            etag = change_etag(tables, args, kwargs)
+            if etag is None:
+                return view(*args, **kwargs)
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                # Yanıt önbelleği anahtarına katılır; başka sürümde hesaplanmış gövde bu ETag ile sunulmaz
+                g.change_etag = etag
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return decorated_function
+    return decorator
@@ -1,11 +1,22 @@
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from flask_login import LoginManager
 from flask_mail import Mail
-from datetime import datetime
+from datetime import datetime, date
 import os
 
+class LibraryJSONProvider(DefaultJSONProvider):
+    """DATE kolonlarını API'de 'YYYY-MM-DD' olarak serileştir"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, date) and not isinstance(o, datetime):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
 # Flask uygulaması oluştur
 app = Flask(__name__)
+app.json = LibraryJSONProvider(app)
 
 # Uygulama konfigürasyonu
 app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
@@ -14,13 +25,38 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# SQL profili: aynı sorgu şekli bir istekte bu kadar tekrarlanırsa N+1 uyarısı, bu süreyi
+# aşan ifadeler EXPLAIN planıyla instance/slow-queries.log'a yazılır
+app.config['SQL_SLOW_QUERY_MS'] = int(os.environ.get('SQL_SLOW_QUERY_MS', 200))
+app.config['SQL_N_PLUS_ONE_THRESHOLD'] = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 10))
+app.config['SQL_QUERY_BUDGET'] = int(os.environ.get('SQL_QUERY_BUDGET', 30))
+app.config['SQL_PROFILER_HEADERS'] = os.environ.get('SQL_PROFILER_HEADERS') == '1'
+
+# İstek profilleri profiles/ altına yazılır; örnekleme aralığı (sn) 0 ise sürekli örnekleme kapalı
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', 'profiles')
+app.config['PROFILE_SAMPLING_INTERVAL'] = float(os.environ.get('PROFILE_SAMPLING_INTERVAL', 0))
+
+# Aktivite günlüğü tamponu: kayıtlar bu kadar birikince veya bu kadar saniyede bir toplu yazılır
+app.config['ACTIVITY_LOG_BATCH_SIZE'] = int(os.environ.get('ACTIVITY_LOG_BATCH_SIZE', 200))
+app.config['ACTIVITY_LOG_FLUSH_INTERVAL'] = float(os.environ.get('ACTIVITY_LOG_FLUSH_INTERVAL', 2))
+app.config['ACTIVITY_LOG_MAX_QUEUE'] = int(os.environ.get('ACTIVITY_LOG_MAX_QUEUE', 10000))
+app.config['ACTIVITY_LOG_OVERFLOW'] = os.environ.get('ACTIVITY_LOG_OVERFLOW', 'drop_new')
+
+# İstek sınırlama durumu: tek sunucuda worker'lar arası paylaşılan SQLite dosyası,
+# birden çok sunucuda redis://... (bkz. rate_limiting)
+app.config['RATELIMIT_STORAGE_URL'] = os.environ.get(
+    'RATELIMIT_STORAGE_URL', 'sqlite:///' + os.path.join(app.instance_path, 'ratelimit.db')
+)
+
 # Mail configuration
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
+app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', '1') != '0'
 app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME', 'your-email@gmail.com')
 app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD', 'your-app-password')
 app.config['MAIL_DEFAULT_SENDER'] = app.config['MAIL_USERNAME']
+# thread: her web sürecinde giden kutusu dağıtıcısı; external: yalnızca Celery/CLI (bkz. email_outbox.py)
+app.config['EMAIL_DISPATCHER'] = os.environ.get('EMAIL_DISPATCHER', 'thread')
 
 # Create necessary folders
 for folder in ['uploads', 'static/qrcodes', 'reports', 'backups']:
@@ -37,18 +73,98 @@ login_manager.login_view = 'login'
 from models import db
 db.init_app(app)
 
+# SQLite bağlantı profili (WAL, busy_timeout, önbellek) ve periyodik checkpoint/optimize
+from sqlite_profile import SqliteMaintenance, install_sqlalchemy_profile
+with app.app_context():
+    sqlite_profile_enabled = install_sqlalchemy_profile(db.engine)
+    sqlite_maintenance = SqliteMaintenance(
+        db.engine.raw_connection,
+        os.path.join(app.instance_path, 'sqlite-maintenance.stamp')
+    )
+
+# İstek süresi, durum kodu, SQL sayısı/süresi ve önbellek metrikleri; /metrics (Prometheus)
+from metrics import init_metrics
+with app.app_context():
+    init_metrics(app, db.engine)
+
+# İstek başına SQL kaydı, N+1 uyarısı, yavaş sorgu günlüğü ve sorgu bütçesi başlıkları
+from sql_profiler import SqlProfiler, init_sql_profiler
+sql_profiler = SqlProfiler(
+    os.path.join(app.instance_path, 'slow-queries.log'),
+    slow_query_ms=app.config['SQL_SLOW_QUERY_MS'],
+    n_plus_one_threshold=app.config['SQL_N_PLUS_ONE_THRESHOLD'],
+    budget=app.config['SQL_QUERY_BUDGET']
+)
+with app.app_context():
+    init_sql_profiler(app, db.engine, sql_profiler)
+
+# Yönetici ?_profile=1 / X-Profile-Token ile tek istek profili ve düşük hızlı sürekli örnekleme
+from request_profiler import RequestProfiler, init_request_profiler
+request_profiler = RequestProfiler(
+    app.config['PROFILE_DIR'], app.config['SECRET_KEY'],
+    sampling_interval=app.config['PROFILE_SAMPLING_INTERVAL']
+)
+init_request_profiler(app, request_profiler)
+
+# tracemalloc anlık görüntü/fark (yönetici API'si); görüntüler profiles/memory/ altına da yazılır
+from memory_telemetry import MemoryTracer
+memory_tracer = MemoryTracer(os.path.join(app.config['PROFILE_DIR'], 'memory'))
+
+# log_activity kayıtları kuyruğa alınır, arka planda toplu yazılır (bkz. activity_log.py)
+from activity_log import ActivityLogWriter, init_activity_log
+activity_log = ActivityLogWriter(
+    max_queue=app.config['ACTIVITY_LOG_MAX_QUEUE'],
+    batch_size=app.config['ACTIVITY_LOG_BATCH_SIZE'],
+    flush_interval=app.config['ACTIVITY_LOG_FLUSH_INTERVAL'],
+    overflow=app.config['ACTIVITY_LOG_OVERFLOW']
+)
+with app.app_context():
+    init_activity_log(db.engine, activity_log)
+
+@app.before_request
+def start_sqlite_maintenance():
+    # gunicorn preload_app ile fork edilen her worker'da ilk istekte başlar
+    if sqlite_profile_enabled:
+        sqlite_maintenance.start()
+
+# brotli/gzip yanıt sıkıştırma ve static/ altındaki .br/.gz kopyalarının sunumu
+from http_compression import init_compression, register_compression_commands
+init_compression(app)
+register_compression_commands(app)
+
+# İçerik özetli statik dosya adları (url_for çevirisi, immutable önbellek, /sw.js)
+from static_assets import init_static_assets, register_static_commands
+init_static_assets(app)
+register_static_commands(app)
+
 # Import all models after db is initialized
 from models import *
+from response_cache import ResponseCache
+from settings_cache import SettingsCache
+
+# Ayarlar süreç başına önbelleklenir; api_update_settings sürüm dosyasını güncelleyerek
+# tüm worker'ların önbelleğini geçersiz kılar
+settings_cache = SettingsCache(os.path.join(app.instance_path, 'settings.version'))
+
+# API yanıt önbelleği; commit edilen değişiklikler ilgili etiketleri tüm worker'larda geçersiz kılar
+response_cache = ResponseCache(os.path.join(app.instance_path, 'cache-invalidations.log'))
+response_cache.install_invalidation_hooks(db.session)
+
+# E-postalar email_outbox tablosuna iş değişikliğiyle aynı işlemde yazılır, dağıtıcı gönderir;
+# şablonlar derlenip önbelleklenir, api_update_email_template sürüm dosyasını günceller
+from email_outbox import EmailDispatcher, TemplateCache, init_email_outbox
+email_templates = TemplateCache(os.path.join(app.instance_path, 'email-templates.version'))
+email_dispatcher = EmailDispatcher(app, mail)
+init_email_outbox(app, email_dispatcher)
 
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
 
 # Helper Functions
-def get_setting(key, default=None):
-    """Get setting value from database"""
-    setting = Settings.query.filter_by(key=key).first()
-    return setting.value if setting else default
+def get_setting(key, default=None, type=None):
+    """Get setting value from the settings cache (type=int/float/bool converts it)"""
+    return settings_cache.get(key, default, type)
 
 # Add get_setting to template context
 @app.context_processor
@@ -66,6 +182,10 @@ def init_database():
     with app.app_context():
         db.create_all()
         
+        # Add columns introduced after the initial schema to existing databases
+        from db_maintenance import upgrade_schema
+        upgrade_schema()
+        
         # Add default categories if not exist
         default_categories = [
             ("Türk Edebiyatı", "Türk edebiyatı eserleri"),
@@ -109,10 +229,12 @@ def init_database():
             ('email_notifications', 'true', 'E-posta bildirimleri aktif mi?')
         ]
         
+        settings_added = False
         for key, value, desc in default_settings:
             if not Settings.query.filter_by(key=key).first():
                 setting = Settings(key=key, value=value, description=desc)
                 db.session.add(setting)
+                settings_added = True
         
         # Add default email templates
         email_templates = [
@@ -251,6 +373,36 @@ Başka bir kitap için talep oluşturabilir veya kütüphanemizi ziyaret edebili
 Saygılarımızla,
 Kütüphane Yönetimi''',
                 'variables': '["member_name", "book_title", "request_id", "reason"]'
+            },
+            {
+                'name': 'overdue_digest',
+                'subject': 'Gecikmiş Kitaplarınız ({{book_count}})',
+                'body': '''Sayın {{member_name}},
+
+Aşağıdaki kitapların iade süresi dolmuştur:
+
+{{book_list}}
+
+Toplam Gecikme Cezası: {{total_fine}} TL (günlük {{fine_per_day}} TL)
+
+Lütfen en kısa sürede kitapları iade ediniz.
+
+Saygılarımızla,
+Kütüphane Yönetimi''',
+                'variables': '["member_name", "book_count", "book_list", "total_fine", "fine_per_day"]'
+            },
+            {
+                'name': 'due_date_digest',
+                'subject': 'Kitap İade Hatırlatması ({{book_count}})',
+                'body': '''Sayın {{member_name}},
+
+Aşağıdaki kitapların iade tarihi yarındır ({{due_date}}):
+
+{{book_list}}
+
+Saygılarımızla,
+Kütüphane Yönetimi''',
+                'variables': '["member_name", "book_count", "book_list", "due_date"]'
             }
         ]
         
@@ -270,6 +422,8 @@ Kütüphane Yönetimi''',
             db.session.add(admin)
         
         db.session.commit()
+        if settings_added:
+            settings_cache.invalidate()
 
 # Initialize scheduled tasks when app starts
 def init_app():
@@ -80,7 +80,8 @@ class Config:
     CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', f'redis://{REDIS_HOST}:{REDIS_PORT}/0')
     
     # Rate Limiting Configuration
-    RATELIMIT_STORAGE_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/1'
+    # api_performance.rate_limit (rate_limiting.RedisBackend) ve flask-limiter ortak kullanır
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL', f'redis://{REDIS_HOST}:{REDIS_PORT}/1')
     RATELIMIT_DEFAULT = "200 per day, 50 per hour"
     
     # Push Notifications
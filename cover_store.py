@@ -0,0 +1,117 @@
+"""
+Kapak Resmi Deposu
+Kitap kapakları books satırında değil, SHA-256 özetiyle adreslenen book_covers
+tablosunda tutulur; aynı resim birden çok kitapta tek kopya olarak saklanır
+"""
+
+import hashlib
+
+from flask import Response, abort, request
+
+from models import db, Book, BookCover
+
+# Dosya imzasından içerik tipi tespiti
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+# İçerik adresli URL hiç değişmez; kitap URL'si ise kapak değişebileceği için daha kısa tutulur
+COVER_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+BOOK_COVER_MAX_AGE = 24 * 3600
+
+def detect_content_type(data):
+    """Resim verisinin içerik tipini imzasından bul"""
+    for signature, content_type in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+def store_cover(data, content_type=None):
+    """Resmi depoya ekle (zaten varsa tekrar yazılmaz) ve özetini döndür"""
+    digest = hashlib.sha256(data).hexdigest()
+    exists = db.session.query(BookCover.sha256).filter_by(sha256=digest).first()
+    if not exists:
+        db.session.add(BookCover(
+            sha256=digest,
+            content_type=content_type or detect_content_type(data),
+            size=len(data),
+            data=data
+        ))
+    return digest
+
+def delete_cover_if_unused(digest):
+    """Hiçbir kitabın kullanmadığı kapağı sil"""
+    if digest and not db.session.query(Book.isbn).filter_by(cover_hash=digest).first():
+        BookCover.query.filter_by(sha256=digest).delete()
+
+def set_book_cover(book, data, content_type=None):
+    """Kitabın kapağını değiştir (data None ise kaldır); commit çağırana bırakılır"""
+    old_digest = book.cover_hash
+    book.cover_hash = store_cover(data, content_type) if data else None
+    db.session.flush()
+    if old_digest != book.cover_hash:
+        delete_cover_if_unused(old_digest)
+
+def migrate_cover_blobs(chunk_size=100):
+    """books.cover_image verilerini parça parça book_covers'a taşı
+
+    Her parçada yalnızca chunk_size kitabın resmi belleğe alınır ve parça ayrı
+    commit edilir. Taşınan satırlarda cover_image NULL yapılır.
+    """
+    select_sql = db.text(
+        "SELECT isbn, cover_image FROM books "
+        "WHERE cover_image IS NOT NULL AND isbn > :last_isbn ORDER BY isbn LIMIT :limit"
+    )
+    last_isbn = ''
+    moved = 0
+    moved_bytes = 0
+
+    while True:
+        rows = db.session.execute(select_sql, {'last_isbn': last_isbn, 'limit': chunk_size}).fetchall()
+        if not rows:
+            break
+
+        changes = []
+        for row in rows:
+            data = bytes(row.cover_image)
+            changes.append({'isbn': row.isbn, 'digest': store_cover(data) if data else None})
+            moved_bytes += len(data)
+        db.session.flush()
+        db.session.execute(
+            db.text("UPDATE books SET cover_hash = :digest, cover_image = NULL WHERE isbn = :isbn"),
+            changes
+        )
+        db.session.commit()
+        # Parçanın resimleri oturumda tutulmasın
+        db.session.expunge_all()
+
+        moved += len(rows)
+        last_isbn = rows[-1].isbn
+
+    if moved:
+        print(f"✅ {moved} kapak resmi ({moved_bytes // 1024} KB) book_covers tablosuna taşındı")
+        if db.engine.dialect.name == 'sqlite':
+            print("💡 Boşalan alanı geri kazanmak için: sqlite3 instance/books_info.db 'VACUUM'")
+    return moved
+
+def cover_response(digest, max_age, immutable=False):
+    """Kapağı ETag (içerik özeti) ile sun; istemcideki kopya güncelse resim okunmadan 304 döner"""
+    if request.if_none_match.contains(digest):
+        response = Response(status=304)
+    else:
+        cover = db.session.get(BookCover, digest)
+        if cover is None:
+            abort(404)
+        response = Response(cover.data, mimetype=cover.content_type)
+
+    response.set_etag(digest)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    return response
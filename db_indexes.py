@@ -0,0 +1,204 @@
+"""
+İndeks Yönetimi
+models.py'de __table_args__ ile tanımlanan indeksleri veritabanına uygular ve
+sık çalışan sorguların EXPLAIN QUERY PLAN çıktısından indeks raporu üretir
+
+Kullanım:
+    flask --app app sync-indexes
+    flask --app app index-report
+"""
+
+import hashlib
+import re
+from datetime import date, timedelta
+
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression
+from sqlalchemy.sql.schema import Column
+
+from models import (db, SchemaVersion, User, Member, Transaction, Reservation, Fine,
+                    ActivityLog, Notification, SearchHistory)
+
+# Eski QueryOptimizer'ın oluşturmaya çalıştığı, artık kullanılmayan indeksler
+RETIRED_INDEXES = {
+    'books': ['idx_books_isbn', 'idx_books_title', 'idx_books_category'],
+    'transactions': ['idx_transactions_book_isbn', 'idx_transactions_member_id', 'idx_transactions_status'],
+}
+
+def index_registry():
+    """Modellerde tanımlı indeksler (tablo adı -> Index listesi)
+
+    users.email, users.username ve settings.key gibi unique kolonlar indekslerini
+    UNIQUE kısıtından alır, burada ayrıca listelenmez.
+    """
+    return {table.name: sorted(table.indexes, key=lambda index: index.name)
+            for table in db.metadata.sorted_tables if table.indexes}
+
+def registry_version():
+    """İndeks tanımlarından türetilen sürüm; tanımlar değişince sürüm de değişir"""
+    parts = []
+    for table_name, indexes in sorted(index_registry().items()):
+        for index in indexes:
+            columns = ','.join(column.name for column in index.columns)
+            parts.append(f"{table_name}.{index.name}({columns}){' unique' if index.unique else ''}")
+    for table_name, names in sorted(RETIRED_INDEXES.items()):
+        parts.append(f"-{table_name}.{','.join(sorted(names))}")
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+def create_missing_indexes(model):
+    """Modelde tanımlı olup veritabanında bulunmayan indeksleri oluştur"""
+    created = 0
+    with db.engine.begin() as connection:
+        existing = {index['name'] for index in db.inspect(connection).get_indexes(model.__tablename__)}
+        for index in model.__table__.indexes:
+            if index.name not in existing:
+                index.create(connection)
+                print(f"✅ {index.name} indeksi oluşturuldu")
+                created += 1
+    return created
+
+def sync_indexes(force=False):
+    """Kayıttaki indeksleri oluştur, emekliye ayrılanları kaldır
+
+    Uygulanan sürüm schema_versions tablosunda tutulur; sürüm değişmediyse
+    (ve force verilmediyse) veritabanı incelenmeden dönülür.
+    """
+    version = registry_version()
+    applied = db.session.get(SchemaVersion, 'indexes')
+    if applied and applied.version == version and not force:
+        return 0
+    db.session.commit()
+
+    changes = 0
+    with db.engine.begin() as connection:
+        inspector = db.inspect(connection)
+        existing_tables = set(inspector.get_table_names())
+
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(connection)
+                    print(f"✅ {index.name} indeksi oluşturuldu")
+                    changes += 1
+
+            for name in RETIRED_INDEXES.get(table.name, []):
+                if name in existing:
+                    connection.execute(db.text(f'DROP INDEX {name}'))
+                    print(f"🗑️ {name} indeksi kaldırıldı")
+                    changes += 1
+
+    if applied is None:
+        applied = SchemaVersion(name='indexes')
+        db.session.add(applied)
+    applied.version = version
+    db.session.commit()
+
+    return changes
+
+def hot_queries():
+    """Uygulamada en sık çalışan sorguların temsilcileri (parametre değerleri önemsiz)"""
+    today = date.today()
+    return {
+        'Geciken ödünçler': db.select(Transaction.id)
+            .where(Transaction.return_date.is_(None), Transaction.due_date < today),
+        'Yarın teslim edilecekler': db.select(Transaction.id)
+            .where(Transaction.return_date.is_(None), Transaction.due_date == today + timedelta(days=1)),
+        'Üyenin aktif ödünçleri': db.select(Transaction)
+            .where(Transaction.member_id == 1, Transaction.return_date.is_(None)),
+        'Kitabın aktif ödünçleri': db.select(Transaction)
+            .where(Transaction.isbn == '', Transaction.return_date.is_(None)),
+        'Son 30 günün ödünçleri': db.select(db.func.count(Transaction.id))
+            .where(Transaction.borrow_date >= today - timedelta(days=30)),
+        'Okul numarasıyla üye': db.select(Member).where(Member.numara == ''),
+        'Kullanıcının üye kaydı': db.select(Member).where(Member.user_id == 1),
+        'E-posta ile kullanıcı': db.select(User).where(User.email == ''),
+        'Rezervasyon kuyruğu': db.select(Reservation)
+            .where(Reservation.isbn == '', Reservation.status == 'active')
+            .order_by(Reservation.queue_position.desc()),
+        'Aktif rezervasyon sayısı': db.select(db.func.count(Reservation.id))
+            .where(Reservation.status == 'active'),
+        'Kullanıcının cezaları': db.select(Fine).where(Fine.user_id == 1),
+        'Üyenin ödenmemiş cezaları': db.select(Fine)
+            .where(Fine.member_id == 1, Fine.status == 'unpaid'),
+        'Son aktiviteler': db.select(ActivityLog)
+            .order_by(ActivityLog.timestamp.desc()).limit(20),
+        'Kullanıcı aktiviteleri': db.select(ActivityLog)
+            .where(ActivityLog.user_id == 1).order_by(ActivityLog.timestamp.desc()).limit(20),
+        'Bildirim listesi': db.select(Notification)
+            .order_by(Notification.created_date.desc()),
+        'Okunmamış bildirimler': db.select(Notification)
+            .where(Notification.is_read == 0).order_by(Notification.created_date.desc()),
+        'Arama geçmişi': db.select(SearchHistory)
+            .where(SearchHistory.user_id == 1).order_by(SearchHistory.search_date.desc()),
+    }
+
+def explain_query_plan(statement):
+    """Sorgunun SQLite planını satır açıklamaları olarak döndür"""
+    sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}').fetchall()
+    return [row[-1] for row in rows]
+
+def suggest_index(statement, table_name):
+    """WHERE koşulundaki kolonlardan (önce eşitlik, sonra tek aralık) indeks öner"""
+    if statement.whereclause is None:
+        return None
+
+    equality, ranges = [], []
+    for element in visitors.iterate(statement.whereclause):
+        if not isinstance(element, BinaryExpression) or not isinstance(element.left, Column):
+            continue
+        column = element.left
+        if column.table.name != table_name or column.name in equality + ranges:
+            continue
+        if element.operator in (operators.eq, operators.is_):
+            equality.append(column.name)
+        else:
+            ranges.append(column.name)
+
+    columns = equality + ranges[:1]
+    if not columns:
+        return None
+    return f"CREATE INDEX ix_{table_name}_{'_'.join(columns)} ON {table_name} ({', '.join(columns)})"
+
+def index_report():
+    """Sık sorguların planlarını incele; tam tablo taramaları için indeks öner"""
+    if db.engine.dialect.name != 'sqlite':
+        print("⚠️ İndeks raporu yalnızca SQLite (EXPLAIN QUERY PLAN) için destekleniyor")
+        return None
+
+    used_indexes = set()
+    suggestions = {}
+
+    for label, statement in hot_queries().items():
+        details = explain_query_plan(statement)
+        used = set()
+        for detail in details:
+            used.update(re.findall(r'USING (?:COVERING )?INDEX (\w+)', detail))
+        used_indexes.update(used)
+
+        full_scans = [match.group(1) for match in map(re.compile(r'^SCAN (\w+)$').match, details) if match]
+        temp_sort = any('USE TEMP B-TREE' in detail for detail in details)
+
+        status = '❌' if full_scans else ('⚠️' if temp_sort else '✅')
+        print(f"{status} {label}: {'; '.join(details)}")
+
+        for table_name in full_scans:
+            suggestion = suggest_index(statement, table_name)
+            if suggestion:
+                suggestions[label] = suggestion
+                print(f"   💡 {suggestion}")
+
+    registered = {index.name for indexes in index_registry().values() for index in indexes}
+    unused = sorted(registered - used_indexes)
+    if unused:
+        print(f"ℹ️ Sık sorgularda kullanılmayan indeksler: {', '.join(unused)}")
+
+    return {
+        'used_indexes': sorted(used_indexes),
+        'unused_indexes': unused,
+        'suggestions': suggestions,
+    }
@@ -0,0 +1,400 @@
+"""
+Veritabanı Bakım Araçları
+Şema yükseltmeleri ve tek seferlik bakım komutları
+
+Kullanım:
+    flask --app app backfill-availability
+    flask --app app migrate-dates [--chunk-size 1000]
+    flask --app app sync-indexes
+    flask --app app index-report
+    flask --app app rebuild-search-index
+    flask --app app backfill-isbn13
+    flask --app app migrate-covers [--chunk-size 100]
+    flask --app app sqlite-maintenance
+    flask --app app scan-overdue
+    flask --app app compact-notifications
+    python db_maintenance.py [backfill-availability | migrate-dates | sync-indexes | index-report | rebuild-search-index | backfill-isbn13 | migrate-covers | sqlite-maintenance | scan-overdue | compact-notifications]
+"""
+
+import sys
+from datetime import datetime
+
+import click
+from sqlalchemy.schema import CreateTable
+
+from book_suggest import ensure_change_log
+from catalog_search import ensure_search_index
+from conditional_requests import ensure_table_versions
+from cover_store import migrate_cover_blobs
+from db_indexes import create_missing_indexes, sync_indexes, index_report
+from isbn_utils import to_isbn13
+from notification_counter import ensure_notification_counter
+from models import db, Book, Transaction, Notification, SchemaVersion, SearchHistory
+from overdue_scanner import compact_notifications, scan_loan_notifications
+from sqlite_profile import checkpoint_and_optimize, current_pragmas
+
+# TEXT olarak oluşturulmuş tarih kolonları ve hedef tipleri
+DATE_COLUMNS = {
+    Transaction: {'borrow_date': 'date', 'due_date': 'date', 'return_date': 'date'},
+    Notification: {'created_date': 'datetime'},
+    SearchHistory: {'search_date': 'datetime'},
+}
+
+# Eski kayıtlarda görülen tarih biçimleri
+DATE_INPUT_FORMATS = (
+    '%Y-%m-%d',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%d %H:%M',
+    '%d.%m.%Y',
+    '%d.%m.%Y %H:%M',
+    '%d.%m.%Y %H:%M:%S',
+    '%d/%m/%Y',
+)
+
+def column_exists(table, column):
+    """Tabloda kolonun olup olmadığını kontrol et"""
+    columns = db.inspect(db.engine).get_columns(table)
+    return any(col['name'] == column for col in columns)
+
+def add_column_if_missing(table, column, ddl):
+    """Eksik kolonu ALTER TABLE ile ekle, eklendiyse True döndür"""
+    if column_exists(table, column):
+        return False
+
+    db.session.execute(db.text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+    db.session.commit()
+    print(f"✅ {table}.{column} kolonu eklendi")
+    return True
+
+def backfill_borrowed_counts():
+    """books.borrowed_count sayacını transactions tablosundan yeniden hesapla"""
+    active_count = db.select(db.func.count(Transaction.id))\
+        .where(Transaction.isbn == Book.isbn, Transaction.return_date.is_(None))\
+        .scalar_subquery()
+
+    # Tek bir UPDATE ile tüm kitaplar; sadece sapma olan satırlar yazılır
+    result = db.session.execute(
+        db.update(Book)
+        .where(Book.borrowed_count.is_distinct_from(active_count))
+        .values(borrowed_count=active_count)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    print(f"✅ {result.rowcount} kitabın ödünç sayacı güncellendi")
+    return result.rowcount
+
+def backfill_isbn13(chunk_size=1000):
+    """Boş books.isbn13 değerlerini ISBN'den hesapla
+
+    Aynı kanonik ISBN'e sahip ikinci bir kayıt (ör. aynı kitabın ISBN-10 ve
+    ISBN-13 ile iki kez girilmesi) tekil indeksi bozacağı için boş bırakılır ve
+    raporlanır.
+    """
+    taken = set(db.session.execute(
+        db.select(Book.isbn13).where(Book.isbn13.is_not(None))).scalars())
+    pending = db.session.execute(
+        db.select(Book.isbn).where(Book.isbn13.is_(None)).order_by(Book.isbn)).scalars().all()
+
+    changes, duplicates = [], []
+    for isbn in pending:
+        isbn13 = to_isbn13(isbn)
+        if isbn13 is None:
+            continue
+        if isbn13 in taken:
+            duplicates.append(isbn)
+            continue
+        taken.add(isbn13)
+        changes.append({'isbn': isbn, 'isbn13': isbn13})
+
+    for start in range(0, len(changes), chunk_size):
+        db.session.execute(db.text("UPDATE books SET isbn13 = :isbn13 WHERE isbn = :isbn"),
+                           changes[start:start + chunk_size])
+        db.session.commit()
+
+    if changes:
+        print(f"✅ {len(changes)} kitabın kanonik ISBN-13 değeri dolduruldu")
+    if duplicates:
+        print(f"⚠️ Aynı ISBN'e sahip {len(duplicates)} mükerrer kitap kaydı var "
+              f"({', '.join(duplicates[:20])}) - isbn13 boş bırakıldı")
+    return len(changes)
+
+def normalize_date_value(value, kind):
+    """Serbest biçimli tarih metnini SQLAlchemy'nin SQLite biçimine çevir, çözülemezse None"""
+    value = value.strip()
+    for fmt in DATE_INPUT_FORMATS:
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if kind == 'date':
+            return parsed.strftime('%Y-%m-%d')
+        return parsed.strftime('%Y-%m-%d %H:%M:%S.%f')
+    return None
+
+def normalize_date_columns(model, columns, chunk_size=1000):
+    """Tarih kolonlarını id sırasıyla parça parça okuyup kanonik biçime yaz
+
+    Tablo belleğe alınmaz; her parça ayrı commit edilir, böylece büyük tablolar
+    uzun süre kilitlenmez. Çözülemeyen değerlerin id'leri döndürülür.
+    """
+    table = model.__tablename__
+    select_sql = db.text(
+        f"SELECT id, {', '.join(columns)} FROM {table} WHERE id > :last_id ORDER BY id LIMIT :limit"
+    )
+    last_id = 0
+    updated = 0
+    invalid = []
+
+    while True:
+        rows = db.session.execute(select_sql, {'last_id': last_id, 'limit': chunk_size}).fetchall()
+        if not rows:
+            break
+
+        for column, kind in columns.items():
+            changes = []
+            for row in rows:
+                value = getattr(row, column)
+                if value is None or not isinstance(value, str):
+                    continue
+                normalized = normalize_date_value(value, kind) if value.strip() else None
+                if normalized is None and value.strip():
+                    invalid.append(row.id)
+                elif normalized != value:
+                    changes.append({'id': row.id, 'value': normalized})
+            if changes:
+                db.session.execute(db.text(f"UPDATE {table} SET {column} = :value WHERE id = :id"), changes)
+                updated += len(changes)
+
+        db.session.commit()
+        last_id = rows[-1].id
+
+    print(f"✅ {table}: {updated} tarih değeri normalleştirildi")
+    return sorted(set(invalid))
+
+TIMESTAMP_TEXT = 'timestamp_text'
+TIMESTAMP_TEXT_VERSION = '1'
+
+def normalize_timestamp_text(chunk_size=1000):
+    """Masaüstünün mikro saniyesiz yazdığı eski zaman damgalarını ORM biçimine getir (bir kez)
+
+    Bildirimler created_date ile sayfalandığından tablodaki metin biçimi tek olmalıdır.
+    """
+    applied = db.session.get(SchemaVersion, TIMESTAMP_TEXT)
+    if applied is not None and applied.version == TIMESTAMP_TEXT_VERSION:
+        return
+    for model in (Notification, SearchHistory):
+        columns = {name: kind for name, kind in DATE_COLUMNS[model].items() if kind == 'datetime'}
+        normalize_date_columns(model, columns, chunk_size)
+    if applied is None:
+        applied = SchemaVersion(name=TIMESTAMP_TEXT)
+        db.session.add(applied)
+    applied.version = TIMESTAMP_TEXT_VERSION
+    db.session.commit()
+
+def date_columns_pending(model, columns):
+    """Veritabanında hâlâ TEXT olarak duran tarih kolonlarını döndür"""
+    reflected = {col['name']: col['type'] for col in db.inspect(db.engine).get_columns(model.__tablename__)}
+    return [name for name in columns
+            if name in reflected and not isinstance(reflected[name], (db.Date, db.DateTime))]
+
+def rebuild_sqlite_table(model):
+    """SQLite kolon tipini değiştiremediği için tabloyu model şemasıyla yeniden oluştur"""
+    table = model.__table__
+    metadata = db.MetaData()
+    for other in db.metadata.tables.values():
+        other.to_metadata(metadata)
+    new_table = table.to_metadata(metadata, name=f'{table.name}__new')
+
+    existing = {col['name'] for col in db.inspect(db.engine).get_columns(table.name)}
+    columns = ', '.join(col.name for col in table.columns if col.name in existing)
+    create_sql = str(CreateTable(new_table).compile(db.engine))
+
+    db.session.close()
+    connection = db.engine.raw_connection()
+    driver_connection = connection.driver_connection
+    previous_isolation = driver_connection.isolation_level
+    driver_connection.isolation_level = None
+    try:
+        cursor = connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=OFF')
+        cursor.execute('BEGIN')
+        try:
+            cursor.execute(f'DROP TABLE IF EXISTS {new_table.name}')
+            cursor.execute(create_sql)
+            cursor.execute(f'INSERT INTO {new_table.name} ({columns}) SELECT {columns} FROM {table.name}')
+            cursor.execute(f'DROP TABLE {table.name}')
+            cursor.execute(f'ALTER TABLE {new_table.name} RENAME TO {table.name}')
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+    finally:
+        driver_connection.isolation_level = previous_isolation
+        connection.close()
+
+    # Havuzdaki diğer bağlantılar eski şemayı önbellekte tutuyor olabilir
+    db.engine.dispose()
+    # DROP TABLE tabloya bağlı tetikleyicileri de sildi; sayaç yeniden sayılır
+    ensure_table_versions(force=True)
+    ensure_notification_counter(recount=True)
+
+    print(f"✅ {table.name} tablosu DATE kolonlarıyla yeniden oluşturuldu")
+
+def alter_date_column_types(model, columns):
+    """PostgreSQL'de kolon tipini yerinde dönüştür"""
+    table = model.__tablename__
+    for column in columns:
+        target = 'DATE' if DATE_COLUMNS[model][column] == 'date' else 'TIMESTAMP'
+        db.session.execute(db.text(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {target} "
+            f"USING NULLIF({column}, '')::{target}"
+        ))
+        print(f"✅ {table}.{column} kolonu {target} tipine çevrildi")
+    db.session.commit()
+
+def migrate_date_columns(chunk_size=1000):
+    """TEXT tarih kolonlarını DATE/DATETIME tipine taşı ve aralık indekslerini oluştur"""
+    for model, columns in DATE_COLUMNS.items():
+        invalid = normalize_date_columns(model, columns, chunk_size)
+        if invalid:
+            print(f"❌ {model.__tablename__}: {len(invalid)} kayıtta çözülemeyen tarih var "
+                  f"(id: {', '.join(map(str, invalid[:20]))}) - tablo dönüştürülmedi")
+            continue
+
+        pending = date_columns_pending(model, columns)
+        if pending:
+            if db.engine.dialect.name == 'sqlite':
+                rebuild_sqlite_table(model)
+            else:
+                alter_date_column_types(model, pending)
+
+        create_missing_indexes(model)
+
+def sqlite_maintenance():
+    """WAL checkpoint + PRAGMA optimize çalıştır ve bağlantı profilini göster"""
+    if db.engine.dialect.name != 'sqlite':
+        print("⚠️ Veritabanı SQLite değil, bakım gerekmiyor")
+        return
+    connection = db.engine.raw_connection()
+    try:
+        for name, value in current_pragmas(connection).items():
+            print(f"   {name} = {value}")
+        busy, wal_pages, checkpointed = checkpoint_and_optimize(connection)
+    finally:
+        connection.close()
+    if busy:
+        print(f"⚠️ Checkpoint tamamlanamadı: {checkpointed}/{wal_pages} sayfa aktarıldı (okuyucular meşgul)")
+    else:
+        print(f"✅ WAL checkpoint ({checkpointed} sayfa) ve PRAGMA optimize tamamlandı")
+
+def upgrade_schema():
+    """create_all() tarafından eklenmeyen yeni kolonları mevcut veritabanına ekle"""
+    if add_column_if_missing('books', 'borrowed_count', 'INTEGER NOT NULL DEFAULT 0'):
+        backfill_borrowed_counts()
+    add_column_if_missing('books', 'isbn13', 'VARCHAR(13)')
+    # ORM dışında (masaüstü uygulaması) eklenen kitaplar da yakalanır; tekil indeksten önce çalışmalı
+    backfill_isbn13()
+    if add_column_if_missing('books', 'cover_hash', 'VARCHAR(64) REFERENCES book_covers (sha256)'):
+        migrate_cover_blobs()
+
+    normalize_timestamp_text()
+
+    sync_indexes()
+    ensure_search_index()
+    ensure_change_log()
+    ensure_table_versions()
+    ensure_notification_counter()
+
+def scan_overdue():
+    stats = scan_loan_notifications()
+    print(f"✅ Gecikme taraması: {stats['candidates']} ödünç incelendi, "
+          f"{stats['return_reminder']} hatırlatma, {stats['overdue']} gecikme bildirimi ({stats['seconds']} sn)")
+
+def register_maintenance_commands(app):
+    """Bakım komutlarını Flask CLI'ye kaydet"""
+
+    @app.cli.command('backfill-availability')
+    def backfill_availability_command():
+        """Kitap ödünç sayaçlarını yeniden hesapla"""
+        upgrade_schema()
+        backfill_borrowed_counts()
+
+    @app.cli.command('migrate-dates')
+    @click.option('--chunk-size', default=1000, show_default=True, help='Her commit\'te işlenecek satır sayısı')
+    def migrate_dates_command(chunk_size):
+        """Metin tarih kolonlarını DATE/DATETIME tipine dönüştür"""
+        migrate_date_columns(chunk_size)
+
+    @app.cli.command('sync-indexes')
+    def sync_indexes_command():
+        """Model indekslerini sürümden bağımsız olarak yeniden uygula"""
+        changes = sync_indexes(force=True)
+        print(f"✅ İndeksler güncel ({changes} değişiklik)")
+
+    @app.cli.command('index-report')
+    def index_report_command():
+        """Sık sorguların planlarını ve indeks önerilerini göster"""
+        index_report()
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Katalog arama (FTS5) indeksini baştan oluştur"""
+        ensure_search_index(rebuild=True)
+
+    @app.cli.command('backfill-isbn13')
+    def backfill_isbn13_command():
+        """Kanonik ISBN-13 kolonunu doldur ve mükerrer kayıtları raporla"""
+        upgrade_schema()
+        backfill_isbn13()
+
+    @app.cli.command('migrate-covers')
+    @click.option('--chunk-size', default=100, show_default=True, help='Her commit\'te taşınacak kapak sayısı')
+    def migrate_covers_command(chunk_size):
+        """books.cover_image verilerini içerik adresli kapak deposuna taşı"""
+        migrate_cover_blobs(chunk_size)
+
+    @app.cli.command('sqlite-maintenance')
+    def sqlite_maintenance_command():
+        """WAL checkpoint ve PRAGMA optimize çalıştır"""
+        sqlite_maintenance()
+
+    @app.cli.command('scan-overdue')
+    def scan_overdue_command():
+        """Durumu değişen ödünçler için iade/gecikme bildirimleri üret"""
+        scan_overdue()
+
+    @app.cli.command('compact-notifications')
+    def compact_notifications_command():
+        """Tekrarlanan bildirim satırlarını tekilleştir"""
+        compact_notifications()
+
+COMMANDS = {
+    'backfill-availability': backfill_borrowed_counts,
+    'migrate-dates': migrate_date_columns,
+    'sync-indexes': lambda: sync_indexes(force=True),
+    'index-report': index_report,
+    'rebuild-search-index': lambda: ensure_search_index(rebuild=True),
+    'backfill-isbn13': backfill_isbn13,
+    'migrate-covers': migrate_cover_blobs,
+    'sqlite-maintenance': sqlite_maintenance,
+    'scan-overdue': scan_overdue,
+    'compact-notifications': compact_notifications,
+}
+
+def main(argv):
+    if len(argv) < 2 or argv[1] not in COMMANDS:
+        print(f"Kullanım: python db_maintenance.py [{' | '.join(COMMANDS)}]")
+        return 1
+
+    from config import app
+    with app.app_context():
+        upgrade_schema()
+        COMMANDS[argv[1]]()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
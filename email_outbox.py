@@ -0,0 +1,419 @@
+"""
+E-posta Giden Kutusu
+E-postalar gönderilmez, email_outbox tablosuna iş değişikliğiyle aynı işlemde
+yazılır (queue_email; COMMIT'i çağıran yapar). Dağıtıcı bekleyen satırları
+partiler halinde sahiplenir ve tek, açık tutulan SMTP bağlantısı üzerinden
+gönderir. Başarısız gönderimler üstel bekleme ile yeniden denenir, MAX_ATTEMPTS
+sonunda 'dead' olarak bırakılır. EmailTemplate şablonları bir kez derlenir ve
+sürüm dosyasıyla (ayarlar gibi) worker'lar arasında geçersizleştirilir.
+
+Dağıtıcı EMAIL_DISPATCHER=thread (varsayılan) ise her web sürecinde arka plan
+iş parçacığı olarak, ayrıca Celery beat görevi ve CLI ile çalışır; sahiplenme
+sayesinde aynı anda birden çok dağıtıcı çalışması güvenlidir.
+
+Kullanım:
+    flask --app app dispatch-emails [--loop]
+    flask --app app smtp-debug-server --port 1025   # MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=0
+"""
+
+import os
+import re
+import smtplib
+import socketserver
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import click
+from flask_mail import BadHeaderError, Message
+
+from models import db, EmailOutbox, EmailTemplate
+
+SEND_BATCH = 50
+MAX_ATTEMPTS = 8
+BACKOFF_SECONDS = 60          # 1, 2, 4, ... dakika
+MAX_BACKOFF_SECONDS = 3600
+CLAIM_TIMEOUT = timedelta(minutes=10)
+POLL_SECONDS = 5
+# Boşta kalan SMTP bağlantısı kapatılır (sunucular genelde birkaç dakikada düşürür)
+IDLE_DISCONNECT_SECONDS = 60
+TEMPLATE_MAX_AGE_SECONDS = 300
+
+VARIABLE_RE = re.compile(r'\{\{(\w+)\}\}')
+
+# --- Şablonlar ---
+
+def compile_template(text):
+    """'Merhaba {{member_name}}' -> ('Merhaba ', 'member_name', '') ; tek indisler değişken adı"""
+    return tuple(VARIABLE_RE.split(text or ''))
+
+def render(parts, context):
+    """Derlenmiş şablonu doldur; bağlamda olmayan değişkenler olduğu gibi kalır"""
+    out = []
+    for index, part in enumerate(parts):
+        if index % 2 == 0:
+            out.append(part)
+        elif part in context:
+            out.append(str(context[part]))
+        else:
+            out.append('{{' + part + '}}')
+    return ''.join(out)
+
+class TemplateCache:
+    """Etkin şablonları tek sorguyla yükleyip derleyen, sürüm dosyasıyla geçersizleşen önbellek"""
+
+    def __init__(self, stamp_path, max_age=TEMPLATE_MAX_AGE_SECONDS):
+        self.stamp_path = stamp_path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._templates = None   # ad -> (konu parçaları, gövde parçaları)
+        self._stamp = None
+        self._loaded_at = 0.0
+        self.loads = 0
+
+    def _read_stamp(self):
+        try:
+            stat = os.stat(self.stamp_path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _current(self):
+        stamp = self._read_stamp()
+        templates = self._templates
+        if templates is None or stamp != self._stamp or \
+                time.monotonic() - self._loaded_at > self.max_age:
+            rows = db.session.execute(
+                db.select(EmailTemplate.name, EmailTemplate.subject, EmailTemplate.body)
+                .where(EmailTemplate.is_active.is_(True))
+            ).all()
+            templates = {name: (compile_template(subject), compile_template(body))
+                         for name, subject, body in rows}
+            with self._lock:
+                self._templates = templates
+                self._stamp = stamp
+                self._loaded_at = time.monotonic()
+                self.loads += 1
+        return templates
+
+    def render(self, name, context):
+        """(konu, gövde); şablon yoksa veya etkin değilse None"""
+        compiled = self._current().get(name)
+        if compiled is None:
+            return None
+        return render(compiled[0], context), render(compiled[1], context)
+
+    def invalidate(self):
+        """Bu süreçte önbelleği boşalt ve sürüm dosyasını güncelleyerek diğer worker'ları uyar"""
+        os.makedirs(os.path.dirname(self.stamp_path), exist_ok=True)
+        temp_path = f'{self.stamp_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as stamp_file:
+            stamp_file.write(f'{time.time_ns()} {os.getpid()}\n')
+        os.replace(temp_path, self.stamp_path)
+        with self._lock:
+            self._templates = None
+
+def queue_email(templates, to_email, template_name, context):
+    """Şablonu doldurup giden kutusuna ekle (oturuma eklenir, COMMIT çağırana ait)"""
+    rendered = templates.render(template_name, context)
+    if rendered is None or not to_email:
+        return None
+    subject, body = rendered
+    entry = EmailOutbox(to_email=to_email, template_name=template_name, subject=subject, body=body)
+    db.session.add(entry)
+    db.session.info['email_queued'] = True
+    return entry
+
+# --- Gönderim ---
+
+class SmtpSession:
+    """Partiler boyunca açık tutulan SMTP bağlantısı (Flask-Mail Connection üzerinden)"""
+
+    def __init__(self, mail):
+        self.mail = mail
+        self.connection = None
+        self.last_used = 0.0
+        self.connects = 0
+
+    def _open(self):
+        self.close()
+        self.connection = self.mail.connect().__enter__()
+        self.connects += 1
+
+    def send(self, message):
+        if self.connection is None or time.monotonic() - self.last_used > IDLE_DISCONNECT_SECONDS:
+            self._open()
+        try:
+            self.connection.send(message)
+        except smtplib.SMTPServerDisconnected:
+            # Sunucu boşta bağlantıyı kapatmış; bir kez yeniden bağlan
+            self._open()
+            self.connection.send(message)
+        self.last_used = time.monotonic()
+
+    def close(self):
+        connection, self.connection = self.connection, None
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                pass
+
+# Yalnızca o iletiyi etkileyen hatalar; diğerlerinde (bağlantı, kimlik doğrulama)
+# partinin kalanı da denenmeden ertelenir
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, BadHeaderError,
+                  AssertionError, UnicodeError)
+
+def backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS))
+
+class EmailDispatcher:
+    def __init__(self, app, mail, batch_size=SEND_BATCH, max_attempts=MAX_ATTEMPTS):
+        self.app = app
+        self.mail = mail
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.smtp = SmtpSession(mail)
+        self.counters = Counter()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._reclaimed_at = 0.0
+        self.wakeup = threading.Event()
+
+    def claim(self):
+        """Zamanı gelen satırları 'sending' olarak sahiplen; takılı kalan eski sahiplenmeler geri alınır"""
+        now = datetime.utcnow()
+        if time.monotonic() - self._reclaimed_at > CLAIM_TIMEOUT.total_seconds():
+            # Boş yoklamalar yazma kilidi almasın diye seyrek çalışır
+            self._reclaimed_at = time.monotonic()
+            db.session.execute(
+                db.update(EmailOutbox)
+                .where(EmailOutbox.status == 'sending', EmailOutbox.claimed_at < now - CLAIM_TIMEOUT)
+                .values(status='pending')
+            )
+        ids = db.session.scalars(
+            db.select(EmailOutbox.id)
+            .where(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+            .limit(self.batch_size)
+        ).all()
+        if not ids:
+            db.session.commit()
+            return []
+        # Mikro saniyeli damga sahiplenme belirteci: aynı satırları başka dağıtıcı almışsa eşleşmez
+        db.session.execute(
+            db.update(EmailOutbox)
+            .where(EmailOutbox.id.in_(ids), EmailOutbox.status == 'pending')
+            .values(status='sending', claimed_at=now)
+        )
+        db.session.commit()
+        return db.session.scalars(
+            db.select(EmailOutbox)
+            .where(EmailOutbox.id.in_(ids), EmailOutbox.status == 'sending', EmailOutbox.claimed_at == now)
+            .order_by(EmailOutbox.id)
+        ).all()
+
+    def _fail(self, entry, error):
+        entry.attempts += 1
+        entry.last_error = str(error)[:1000]
+        entry.claimed_at = None
+        if entry.attempts >= self.max_attempts:
+            entry.status = 'dead'
+            self.counters['dead'] += 1
+            print(f"❌ E-posta gönderilemedi, bırakıldı (#{entry.id} {entry.to_email}): {error}")
+        else:
+            entry.status = 'pending'
+            entry.next_attempt_at = datetime.utcnow() + backoff(entry.attempts)
+            self.counters['retried'] += 1
+
+    def dispatch_batch(self):
+        """Bir parti gönder; gönderilen (veya ertelenen) satır sayısını döndürür"""
+        entries = self.claim()
+        for index, entry in enumerate(entries):
+            message = Message(subject=entry.subject, recipients=[entry.to_email], body=entry.body)
+            try:
+                self.smtp.send(message)
+            except MESSAGE_ERRORS as e:
+                self._fail(entry, e)
+                continue
+            except Exception as e:
+                self.smtp.close()
+                for pending in entries[index:]:
+                    self._fail(pending, e)
+                print(f"⚠️ SMTP bağlantı hatası, {len(entries) - index} e-posta ertelendi: {e}")
+                break
+            entry.status = 'sent'
+            entry.sent_at = datetime.utcnow()
+            entry.claimed_at = None
+            entry.attempts += 1
+            self.counters['sent'] += 1
+        db.session.commit()
+        return len(entries)
+
+    def dispatch(self):
+        """Zamanı gelmiş tüm e-postaları gönder; (sonuç sayaçları, süre)"""
+        started = time.perf_counter()
+        before = Counter(self.counters)
+        while self.dispatch_batch() == self.batch_size:
+            pass
+        result = dict(self.counters - before)
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        return result
+
+    def run_forever(self, interval=POLL_SECONDS):
+        while True:
+            self.wakeup.clear()
+            try:
+                with self.app.app_context():
+                    result = self.dispatch()
+                if result.get('sent') or result.get('retried') or result.get('dead'):
+                    print(f"📧 Giden kutusu: {result}")
+            except Exception as e:
+                print(f"❌ E-posta dağıtıcı hatası: {e}")
+            if time.monotonic() - self.smtp.last_used > IDLE_DISCONNECT_SECONDS:
+                self.smtp.close()
+            self.wakeup.wait(interval)
+
+    def start(self):
+        """Bu süreçte dağıtıcı iş parçacığını başlat (fork sonrası her worker kendi iş parçacığını açar)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            self.smtp = SmtpSession(self.mail)
+            threading.Thread(target=self.run_forever, name='email-dispatcher', daemon=True).start()
+
+    def stats(self):
+        rows = db.session.execute(
+            db.select(EmailOutbox.status, db.func.count()).group_by(EmailOutbox.status)
+        ).all()
+        dead = db.session.scalars(
+            db.select(EmailOutbox).where(EmailOutbox.status == 'dead')
+            .order_by(EmailOutbox.id.desc()).limit(20)
+        ).all()
+        return {
+            'pid': os.getpid(),
+            'statuses': dict(rows),
+            'counters': dict(self.counters),
+            'smtp_connects': self.smtp.connects,
+            'dead': [{'id': e.id, 'to': e.to_email, 'template': e.template_name,
+                      'attempts': e.attempts, 'error': e.last_error} for e in dead],
+        }
+
+# --- Yerel SMTP (test/geliştirme) ---
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 localhost library debug SMTP')
+        mail_from, rcpt_tos = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                mail_from, rcpt_tos = command.split(':', 1)[1].strip(), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                rcpt_tos.append(command.split(':', 1)[1].strip())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                for data_line in iter(self.rfile.readline, b''):
+                    if data_line in (b'.\r\n', b'.\n'):
+                        break
+                    data.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                self.server.received(mail_from, rcpt_tos, b''.join(data))
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            elif verb in ('RSET', 'NOOP'):
+                mail_from, rcpt_tos = (None, []) if verb == 'RSET' else (mail_from, rcpt_tos)
+                self.reply('250 OK')
+            else:
+                self.reply('502 Command not implemented')
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """Gelen iletileri bellekte tutan (ve isteğe bağlı yazdıran) yerel SMTP; TLS/AUTH yok
+
+    Testlerde: server = LocalSMTPServer(port=0).start(); MAIL_PORT = server.port
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=1025, echo=False):
+        super().__init__((host, port), _SMTPHandler)
+        self.port = self.server_address[1]
+        self.echo = echo
+        self.messages = []   # (gönderen, alıcılar, ham ileti)
+
+    def received(self, mail_from, rcpt_tos, data):
+        self.messages.append((mail_from, rcpt_tos, data))
+        if self.echo:
+            print(f"📧 {mail_from} -> {', '.join(rcpt_tos)}\n{data.decode('utf-8', 'replace')}\n")
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='local-smtp', daemon=True).start()
+        return self
+
+# --- Flask ---
+
+def init_email_outbox(app, dispatcher):
+    """EMAIL_DISPATCHER=thread ise worker içi dağıtıcı; giden kutusuna yazan COMMIT onu uyandırır"""
+    from sqlalchemy import event
+
+    in_process = app.config.get('EMAIL_DISPATCHER', 'thread') == 'thread'
+
+    @event.listens_for(db.session, 'after_commit')
+    def wake_email_dispatcher(session):
+        if session.info.pop('email_queued', False) and in_process:
+            dispatcher.wakeup.set()
+
+    @event.listens_for(db.session, 'after_rollback')
+    def forget_queued_email(session):
+        session.info.pop('email_queued', None)
+
+    if in_process:
+        @app.before_request
+        def start_email_dispatcher():
+            # gunicorn preload_app ile fork edilen her worker'da ilk istekte başlar
+            dispatcher.start()
+
+    register_email_commands(app, dispatcher)
+
+def register_email_commands(app, dispatcher):
+    @app.cli.command('dispatch-emails')
+    @click.option('--loop', is_flag=True, help='Durmadan çalış (ayrı bir dağıtıcı süreci olarak)')
+    @click.option('--interval', default=POLL_SECONDS, show_default=True, help='Döngüde bekleme (sn)')
+    def dispatch_emails_command(loop, interval):
+        """Giden kutusundaki zamanı gelmiş e-postaları gönder"""
+        if loop:
+            dispatcher.run_forever(interval)
+        result = dispatcher.dispatch()
+        dispatcher.smtp.close()
+        print(f"✅ Giden kutusu: {result}")
+
+    @app.cli.command('smtp-debug-server')
+    @click.option('--host', default='127.0.0.1', show_default=True)
+    @click.option('--port', default=1025, show_default=True)
+    def smtp_debug_server_command(host, port):
+        """Gelen e-postaları ekrana yazan yerel SMTP sunucusu"""
+        server = LocalSMTPServer(host, port, echo=True)
+        print(f"📧 Yerel SMTP {host}:{port} (MAIL_SERVER={host} MAIL_PORT={port} MAIL_USE_TLS=0)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
@@ -1,11 +1,37 @@
+import os
+import shutil
+import tempfile
+
 bind = "127.0.0.1:8000"
 workers = 3
 worker_class = "sync"
 worker_connections = 1000
+# Bellek büyümesini gizleyen geri dönüşüm; gerekip gerekmediği worker_memory_bytes ve
+# worker_requests_served metrikleriyle izlenebilir (bkz. memory_telemetry.py)
 max_requests = 1000
 max_requests_jitter = 100
 timeout = 30
 keepalive = 2
 preload_app = True
 user = "library"
-group = "library" 
\ No newline at end of file
+group = "library" 
+
+# Prometheus multiprocess modu: her worker metriklerini bu klasöre yazar, /metrics
+# hepsini toplar. Uygulama (preload_app) yüklenmeden önce tanımlanmalı ve temizlenmeli.
+prometheus_multiproc_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'library-prometheus')
+)
+shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+if hasattr(os, 'geteuid') and os.geteuid() == 0:
+    # Worker'lar user/group kimliğiyle çalışır ve klasöre yazabilmeli
+    shutil.chown(prometheus_multiproc_dir, user, group)
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
+
+def worker_exit(server, worker):
+    # Kuyrukta bekleyen aktivite kayıtlarını yaz (max_requests geri dönüşümü, yeniden başlatma)
+    from config import activity_log
+    activity_log.close()
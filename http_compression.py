@@ -0,0 +1,246 @@
+"""
+HTTP Yanıt Sıkıştırma
+Accept-Encoding'e göre brotli/gzip seçimi, eşik altı ve zaten sıkıştırılmış içerik
+tiplerini atlama, akış (streaming) yanıtları parça parça sıkıştırma ve statik
+dosyaların önceden sıkıştırılmış .br/.gz kopyalarını üretme/sunma.
+Flask (init_compression) ve Django (library.middleware) aynı çekirdeği kullanır
+
+Kullanım:
+    flask --app app compress-static
+    python http_compression.py [static klasörü]
+"""
+
+import gzip
+import mimetypes
+import os
+import re
+import sys
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bu boyutun altındaki yanıtlarda sıkıştırma kazancı başlık maliyetini karşılamaz
+MIN_SIZE = 500
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5          # dinamik yanıtlar için hız/oran dengesi
+STATIC_BROTLI_QUALITY = 11  # statik dosyalar bir kez sıkıştırılır, en yüksek oran
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'application/xml',
+    'application/manifest+json', 'application/x-javascript', 'image/svg+xml',
+}
+
+# Önceden sıkıştırılan statik dosya uzantıları (bootstrap, jquery, main.js...)
+STATIC_EXTENSIONS = ('.js', '.css', '.json', '.svg', '.html', '.txt', '.map')
+
+# Tercih sırası: brotli aynı hızda daha küçük çıktı verir
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+ACCEPT_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*')
+
+def is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES)
+
+def accepted_encodings(header):
+    """Accept-Encoding başlığından q>0 olan kodlamalar kümesi"""
+    accepted = set()
+    for part in (header or '').split(','):
+        match = ACCEPT_ENCODING_RE.fullmatch(part)
+        if not match:
+            continue
+        name, quality = match.group(1).lower(), match.group(2)
+        try:
+            if quality is not None and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name)
+    return accepted
+
+def choose_encoding(header, available=ENCODINGS):
+    """İstemcinin kabul ettiği, sunucunun desteklediği ilk kodlama; yoksa None"""
+    accepted = accepted_encodings(header)
+    for encoding in available:
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
+
+def compress(data, encoding, quality=None):
+    if encoding == 'br':
+        return brotli.compress(data, quality=quality or BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=quality or GZIP_LEVEL)
+
+def compress_stream(chunks, encoding):
+    """Akış yanıtını parça parça sıkıştır; her parça flush edilir, istemci beklemeden alır"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip başlığı
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def weaken_etag(etag):
+    """Sıkıştırılmış gövde farklı bayt dizisi olduğundan güçlü ETag zayıflatılır"""
+    if etag and not etag.startswith('W/'):
+        return f'W/{etag}'
+    return etag
+
+# --- Flask ---
+
+def _compress_flask_response(response, encoding, streaming):
+    if streaming:
+        response.response = compress_stream(response.response, encoding)
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    if 'ETag' in response.headers:
+        response.headers['ETag'] = weaken_etag(response.headers['ETag'])
+    response.vary.add('Accept-Encoding')
+    return response
+
+def compress_flask_response(response, accept_encoding, min_size=MIN_SIZE, stream=True):
+    """Yanıtı uygunsa sıkıştır (after_request ve compress_response dekoratörü kullanır)"""
+    if response.status_code < 200 or response.status_code in (204, 206, 304) or \
+            'Content-Encoding' in response.headers or not is_compressible(response.mimetype) or \
+            'no-transform' in response.headers.get('Cache-Control', ''):
+        return response
+
+    streaming = response.is_streamed
+    if streaming and not stream:
+        return response
+    if not streaming and response.calculate_content_length() < min_size:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return response
+    return _compress_flask_response(response, encoding, streaming)
+
+def precompressed_variant(path, accept_encoding):
+    """Statik dosyanın güncel .br/.gz kopyası varsa (yol, kodlama)"""
+    accepted = accepted_encodings(accept_encoding)
+    try:
+        source_mtime = os.stat(path).st_mtime
+    except OSError:
+        return None, None
+    # .br kopyası sunmak için brotli modülü gerekmez
+    for encoding in ('br', 'gzip'):
+        if encoding not in accepted:
+            continue
+        variant = path + SUFFIXES[encoding]
+        try:
+            if os.stat(variant).st_mtime >= source_mtime:
+                return variant, encoding
+        except OSError:
+            continue
+    return None, None
+
+def init_compression(app, min_size=MIN_SIZE):
+    """Flask uygulamasına dinamik sıkıştırma ve önceden sıkıştırılmış statik dosya sunumu ekle"""
+    from flask import request, send_file
+    from werkzeug.exceptions import NotFound
+    from werkzeug.security import safe_join
+
+    @app.after_request
+    def compress_after_request(response):
+        # Önceden sıkıştırılmış statik kopyalar Content-Encoding taşıdığı için atlanır
+        return compress_flask_response(response, request.headers.get('Accept-Encoding'), min_size)
+
+    default_static = app.view_functions.get('static')
+    if default_static is None:
+        return
+
+    def static(filename):
+        path = safe_join(app.static_folder, filename)
+        variant, encoding = (None, None)
+        if path and filename.endswith(STATIC_EXTENSIONS):
+            variant, encoding = precompressed_variant(path, request.headers.get('Accept-Encoding'))
+        if variant is None:
+            return default_static(filename=filename)
+        if not os.path.isfile(path):
+            raise NotFound()
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_file(
+            variant, mimetype=mimetype, conditional=True, etag=True,
+            max_age=app.get_send_file_max_age(filename)
+        )
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    app.view_functions['static'] = static
+
+# --- Statik dosya derleme ---
+
+def precompress_static(root, extensions=STATIC_EXTENSIONS, min_size=MIN_SIZE):
+    """root altındaki metin dosyalarının .gz (ve brotli kuruluysa .br) kopyalarını yaz
+
+    Kopya kaynaktan yeni ise tekrar sıkıştırılmaz; küçülmeyen kopyalar yazılmaz.
+    (yazılan, atlanan) sayılarını döndürür.
+    """
+    written = skipped = 0
+    encodings = [('gzip', 9)] + ([('br', STATIC_BROTLI_QUALITY)] if brotli else [])
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if not name.endswith(extensions):
+                continue
+            path = os.path.join(directory, name)
+            source_mtime = os.stat(path).st_mtime
+            data = None
+            for encoding, quality in encodings:
+                variant = path + SUFFIXES[encoding]
+                if os.path.exists(variant) and os.stat(variant).st_mtime >= source_mtime:
+                    skipped += 1
+                    continue
+                if data is None:
+                    with open(path, 'rb') as source:
+                        data = source.read()
+                if len(data) < min_size:
+                    break
+                compressed = compress(data, encoding, quality)
+                if len(compressed) >= len(data):
+                    continue
+                with open(variant, 'wb') as target:
+                    target.write(compressed)
+                written += 1
+    return written, skipped
+
+def register_compression_commands(app):
+    @app.cli.command('compress-static')
+    def compress_static_command():
+        """static/js ve static/css dosyalarının .gz/.br kopyalarını oluştur"""
+        written, skipped = precompress_static(app.static_folder)
+        print(f"✅ {written} sıkıştırılmış dosya yazıldı, {skipped} güncel")
+        if brotli is None:
+            print("💡 .br kopyaları için: pip install Brotli")
+
+def main(argv):
+    root = argv[1] if len(argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    written, skipped = precompress_static(root)
+    print(f"✅ {written} sıkıştırılmış dosya yazıldı, {skipped} güncel")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
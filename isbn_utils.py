@@ -0,0 +1,49 @@
+"""
+ISBN Yardımcıları
+ISBN-10/ISBN-13 kontrol hanesi doğrulama ve kanonik ISBN-13 biçimine dönüştürme;
+Flask ve Django modelleri aynı fonksiyonları kullanır
+"""
+
+import re
+
+ISBN_CHARS_RE = re.compile(r'[^0-9X]')
+
+def clean_isbn(text):
+    """Tire, boşluk ve 'ISBN' önekini at; X büyük harfe çevrilir"""
+    return ISBN_CHARS_RE.sub('', str(text or '').upper().replace('ISBN', ''))
+
+def isbn10_check_digit(first9):
+    total = sum((10 - position) * int(digit) for position, digit in enumerate(first9))
+    check = (11 - total % 11) % 11
+    return 'X' if check == 10 else str(check)
+
+def isbn13_check_digit(first12):
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+def is_valid_isbn10(code):
+    return bool(re.fullmatch(r'\d{9}[\dX]', code)) and isbn10_check_digit(code[:9]) == code[9]
+
+def is_valid_isbn13(code):
+    return bool(re.fullmatch(r'97[89]\d{10}', code)) and isbn13_check_digit(code[:12]) == code[12]
+
+def is_valid_isbn(text):
+    code = clean_isbn(text)
+    return is_valid_isbn10(code) or is_valid_isbn13(code)
+
+def to_isbn13(text):
+    """Geçerli bir ISBN-10 veya ISBN-13'ü tiresiz ISBN-13'e çevir, geçersizse None"""
+    code = clean_isbn(text)
+    if is_valid_isbn13(code):
+        return code
+    if is_valid_isbn10(code):
+        body = '978' + code[:9]
+        return body + isbn13_check_digit(body)
+    return None
+
+def to_isbn10(text):
+    """978 önekli ISBN-13'ü (veya ISBN-10'u) ISBN-10'a çevir; karşılığı yoksa None"""
+    code = to_isbn13(text)
+    if code is None or not code.startswith('978'):
+        return None
+    return code[3:12] + isbn10_check_digit(code[3:12])
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from sqlite_profile import checkpoint_and_optimize
+
+
+class Command(BaseCommand):
+    help = 'SQLite WAL checkpoint ve PRAGMA optimize çalıştırır (cron ile periyodik çağrılır)'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write('Veritabanı SQLite değil, bakım gerekmiyor')
+            return
+
+        connection.ensure_connection()
+        busy, wal_pages, checkpointed = checkpoint_and_optimize(connection.connection)
+        if busy:
+            self.stdout.write(self.style.WARNING(
+                f'Checkpoint tamamlanamadı: {checkpointed}/{wal_pages} sayfa aktarıldı (okuyucular meşgul)'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'WAL checkpoint ({checkpointed} sayfa) ve PRAGMA optimize tamamlandı'
+            ))
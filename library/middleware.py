@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from http_compression import (MIN_SIZE, choose_encoding, compress, compress_stream,
+                              is_compressible, weaken_etag)
+from metrics import UNMATCHED, begin_request, end_request, track_query
+from sql_profiler import SLOW_QUERY_MS, N_PLUS_ONE_THRESHOLD, QUERY_BUDGET, SqlProfiler
+
+
+class CompressionMiddleware:
+    """
+    Yanıtları Accept-Encoding'e göre brotli/gzip ile sıkıştır (Flask tarafıyla aynı kurallar).
+    Statik dosyalar WhiteNoise'un önceden sıkıştırılmış kopyalarından sunulur.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if response.status_code < 200 or response.status_code in (204, 206, 304) or \
+                response.has_header('Content-Encoding') or not is_compressible(content_type) or \
+                'no-transform' in response.get('Cache-Control', ''):
+            return response
+        if not response.streaming and len(response.content) < MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            del response['Content-Length']
+        else:
+            response.content = compress(response.content, encoding)
+            response['Content-Length'] = str(len(response.content))
+
+        if response.has_header('ETag'):
+            response['ETag'] = weaken_etag(response['ETag'])
+        response['Content-Encoding'] = encoding
+        return response
+
+
+def _track_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        track_query(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """
+    Route başına istek süresi, durum kodu ve SQL sayısı/süresi metrikleri (bkz. metrics).
+    Tüm istekleri ölçmek için MIDDLEWARE listesinin başında olmalı.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = begin_request()
+        status = 500
+        response = None
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_track_query))
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            match = getattr(request, 'resolver_match', None)
+            endpoint = match.route if match is not None and match.route else UNMATCHED
+            cache_result = response.get('X-Cache') if response is not None else None
+            end_request(started, request.method, endpoint, status, cache_result)
+
+
+sql_profiler = SqlProfiler(
+    getattr(settings, 'SQL_SLOW_QUERY_LOG', os.path.join(settings.BASE_DIR, 'logs', 'slow-queries.log')),
+    slow_query_ms=getattr(settings, 'SQL_SLOW_QUERY_MS', SLOW_QUERY_MS),
+    n_plus_one_threshold=getattr(settings, 'SQL_N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD),
+    budget=getattr(settings, 'SQL_QUERY_BUDGET', QUERY_BUDGET),
+)
+
+_explaining = threading.local()
+
+
+def _explainer(connection):
+    """Yavaş sorgunun planı; EXPLAIN sorgusu profile tekrar kaydedilmez"""
+    def explain(sql, params):
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        _explaining.active = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                return [str(row[-1]) for row in cursor.fetchall()]
+        finally:
+            _explaining.active = False
+    return explain
+
+
+def _profile_query(execute, sql, params, many, context):
+    if getattr(_explaining, 'active', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        explain = None if many else _explainer(context['connection'])
+        sql_profiler.track(sql, params, time.perf_counter() - started, explain)
+
+
+class SqlProfilerMiddleware:
+    """
+    İstek başına SQL kaydı, N+1 uyarısı ve yavaş sorgu günlüğü (bkz. sql_profiler).
+    Sorgu bütçesi başlıkları DEBUG'da, SQL_PROFILER_HEADERS açıksa veya yöneticilere eklenir.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sql_profiler.start(f'{request.method} {request.path}')
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_profile_query))
+                response = self.get_response(request)
+        finally:
+            summary = sql_profiler.stop()
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.route:
+            summary['label'] = f'{request.method} {match.route}'
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or getattr(settings, 'SQL_PROFILER_HEADERS', False) or \
+                (user is not None and user.is_authenticated and user.is_admin()):
+            for name, value in sql_profiler.response_headers(summary).items():
+                response[name] = value
+        return response
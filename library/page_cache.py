@@ -0,0 +1,32 @@
+import time
+
+from django.core.cache import cache
+from django.utils.translation import get_language
+
+# Kitap/işlem/üye değişikliklerinde library.signals bu sürümü yeniler; eski anahtarlar
+# kendiliğinden kullanılmaz hale gelir. Worker'lar arası geçersizleştirme için CACHES
+# paylaşılan bir arka uç (Redis, memcached, dosya) olmalı.
+VERSION_KEY = 'page_cache:version'
+PAGE_CACHE_TIMEOUT = 120
+
+
+def page_cache_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_page_cache_version():
+    # Sayaç yerine zaman damgası: anahtar düşse bile eski sürüm numarası tekrar kullanılmaz
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def anonymous_page_key(request, name):
+    """Anonim ziyaretçi sayfasının anahtarı; önbelleklenemiyorsa None"""
+    if request.method != 'GET' or request.user.is_authenticated or 'messages' in request.COOKIES:
+        return None
+    theme = request.COOKIES.get('theme', 'light')
+    return f'page:{name}:{get_language()}:{theme}:{page_cache_version()}'
@@ -1,14 +1,39 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from accounts.models import Member
 from transactions.models import Transaction, Fine
 from notifications.models import Notification, NotificationPreference
-from books.models import Book
+from books.models import Book, BookCategory, Category
+
+from library.page_cache import bump_page_cache_version
+from sqlite_profile import apply_pragmas
 
 User = get_user_model()
 
 
+@receiver(connection_created)
+def apply_sqlite_profile(sender, connection, **kwargs):
+    """
+    Yeni SQLite bağlantısına WAL, busy_timeout ve önbellek ayarlarını uygula
+    """
+    if connection.vendor == 'sqlite':
+        apply_pragmas(connection.connection)
+
+
+@receiver([post_save, post_delete], sender=Book)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=BookCategory)
+@receiver([post_save, post_delete], sender=Member)
+@receiver([post_save, post_delete], sender=Transaction)
+def invalidate_page_cache(sender, **kwargs):
+    """
+    Ödünç/iade, kitap ve kategori değişikliklerinde anonim sayfa önbelleğini geçersiz kıl
+    """
+    bump_page_cache_version()
+
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     """
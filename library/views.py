@@ -4,13 +4,18 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView
 from django.db.models import Count, Q, Sum
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.core.cache import cache
 from datetime import timedelta
 
 from accounts.models import User, Member
 from books.models import Book, Category
+from books.search import search_books
 from transactions.models import Transaction, Fine
 from notifications.models import Notification
+from library.page_cache import PAGE_CACHE_TIMEOUT, anonymous_page_key
+from library.middleware import sql_profiler
+from metrics import metrics_authorized, render_metrics
 
 
 class IndexView(TemplateView):
@@ -19,13 +24,29 @@ class IndexView(TemplateView):
     """
     template_name = 'index.html'
     
+    def get(self, request, *args, **kwargs):
+        """
+        Anonim ziyaretçilere dil/temaya göre önbelleklenmiş sayfayı sun
+        """
+        if request.user.is_authenticated:
+            return redirect('dashboard')
+        
+        key = anonymous_page_key(request, 'index')
+        if key is not None:
+            content = cache.get(key)
+            if content is not None:
+                return HttpResponse(content, headers={'X-Cache': 'HIT'})
+        
+        response = super().get(request, *args, **kwargs)
+        response.render()
+        if key is not None and response.status_code == 200 and not response.cookies:
+            cache.set(key, response.content, PAGE_CACHE_TIMEOUT)
+            response['X-Cache'] = 'MISS'
+        return response
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Eğer kullanıcı giriş yapmışsa dashboard'a yönlendir
-        if self.request.user.is_authenticated:
-            return redirect('dashboard')
-        
         # Genel istatistikler
         context.update({
             'total_books': Book.objects.count(),
@@ -151,11 +172,7 @@ def quick_search(request):
     
     if query and len(query) >= 2:
         # Kitap araması
-        books = Book.objects.filter(
-            Q(title__icontains=query) |
-            Q(authors__icontains=query) |
-            Q(isbn__icontains=query)
-        )[:10]
+        books = search_books(Book.objects.all(), query)[:10]
         
         results = [{
             'type': 'book',
@@ -200,3 +217,27 @@ def library_stats(request):
     }
     
     return JsonResponse(stats)
+
+
+def prometheus_metrics(request):
+    """
+    Prometheus metrikleri (METRICS_TOKEN tanımlıysa Bearer token gerekir)
+    """
+    if not metrics_authorized(request.META.get('HTTP_AUTHORIZATION')):
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type, headers={'Cache-Control': 'no-store'})
+
+
+@login_required
+def sql_profile_report(request):
+    """
+    Son isteklerin sorgu sayıları, N+1 şüpheleri ve yavaş sorgular (bu worker için)
+    """
+    if not request.user.is_admin():
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 20)), 200))
+    except ValueError:
+        limit = 20
+    return JsonResponse(sql_profiler.report(limit))
@@ -38,6 +38,10 @@ urlpatterns = [
     # API endpoints
     # path('api/v1/', include('library.api_urls')),
     
+    # Prometheus metrikleri
+    path('metrics', library_views.prometheus_metrics, name='metrics'),
+    path('admin-tools/sql-profile/', library_views.sql_profile_report, name='sql_profile'),
+    
     # Favicon redirect
     path('favicon.ico', RedirectView.as_view(url='/static/img/favicon.ico', permanent=True)),
 ]
@@ -0,0 +1,128 @@
+"""
+Ödünç Hatırlatma Özetleri
+Geciken ve teslim tarihi yaklaşan ödünçler için üye başına tek e-posta (özet)
+hazırlar. Ödünç, üye ve kitap bilgisi tek birleştirilmiş sorguyla, üye kimliğine
+göre parça parça (keyset) okunur; her parçanın e-postaları ve reminder_log
+kayıtları tek işlemde toplu INSERT ile giden kutusuna yazılır, gönderimi
+email_outbox dağıtıcısı tek SMTP bağlantısıyla yapar. reminder_log sayesinde
+görev aynı gün yeniden çalışırsa (veya yarıda kesilip yeniden başlarsa) aynı
+ödünç için ikinci e-posta oluşmaz
+"""
+
+import time
+from datetime import date, datetime, timedelta
+from itertools import groupby
+
+from models import db, Book, EmailOutbox, Member, ReminderLog, Transaction
+
+MEMBERS_PER_BATCH = 200
+
+DIGEST_TEMPLATES = {
+    'overdue': 'overdue_digest',
+    'due_soon': 'due_date_digest',
+}
+
+def pending_loans_query(kind, today, member_ids):
+    """Verilen üyelerin henüz bildirilmemiş ödünçleri (üye, teslim tarihi sırasıyla)"""
+    reminder_date, condition = reminder_key(kind, today)
+    already_sent = db.select(ReminderLog.transaction_id).where(
+        ReminderLog.kind == kind,
+        ReminderLog.transaction_id == Transaction.id,
+        ReminderLog.reminder_date == reminder_date,
+    )
+    return (
+        db.select(Transaction.id, Transaction.due_date, Member.id, Member.ad_soyad, Member.email, Book.title)
+        .join(Member, Transaction.member_id == Member.id)
+        .join(Book, Transaction.isbn == Book.isbn)
+        .where(Transaction.return_date.is_(None), condition, Member.id.in_(member_ids),
+               ~already_sent.exists())
+        .order_by(Member.id, Transaction.due_date, Transaction.id)
+    )
+
+def reminder_key(kind, today):
+    """(reminder_log tarihi, ödünç koşulu); gecikme her gün, yaklaşan teslim tarih başına bir kez"""
+    if kind == 'overdue':
+        return today, Transaction.due_date < today
+    tomorrow = today + timedelta(days=1)
+    return tomorrow, Transaction.due_date == tomorrow
+
+def member_id_batches(kind, today, size):
+    """E-postası olan ve koşula uyan ödünçü bulunan üyelerin kimlikleri, parça parça"""
+    _, condition = reminder_key(kind, today)
+    last_id = 0
+    while True:
+        ids = db.session.scalars(
+            db.select(Transaction.member_id).distinct()
+            .join(Member, Transaction.member_id == Member.id)
+            .where(Transaction.return_date.is_(None), condition, Transaction.member_id > last_id,
+                   Member.email.is_not(None), Member.email != '')
+            .order_by(Transaction.member_id)
+            .limit(size)
+        ).all()
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+def digest_context(kind, name, loans, today, fine_per_day):
+    lines = []
+    total_fine = 0.0
+    for _, due_date, title in loans:
+        if kind == 'overdue':
+            days_overdue = (today - due_date).days
+            fine = days_overdue * fine_per_day
+            total_fine += fine
+            lines.append(f'- "{title}": son teslim {due_date}, {days_overdue} gün gecikme, {fine:.2f} TL')
+        else:
+            lines.append(f'- "{title}": son teslim {due_date}')
+    return {
+        'member_name': name,
+        'book_count': len(loans),
+        'book_list': '\n'.join(lines),
+        'total_fine': f'{total_fine:.2f}',
+        'fine_per_day': f'{fine_per_day:.2f}',
+        'due_date': loans[0][1],
+    }
+
+def send_loan_digests(kind, templates, fine_per_day, today=None, batch_size=MEMBERS_PER_BATCH):
+    """Üye başına özet e-postaları giden kutusuna yaz; istatistik sözlüğü döndürür"""
+    today = today or date.today()
+    started = time.perf_counter()
+    stats = {'kind': kind, 'members': 0, 'loans': 0, 'emails': 0, 'batches': 0}
+    reminder_date, _ = reminder_key(kind, today)
+
+    for member_ids in member_id_batches(kind, today, batch_size):
+        rows = db.session.execute(pending_loans_query(kind, today, member_ids)).all()
+        outbox, reminders = [], []
+        now = datetime.utcnow()
+        for (member_id, name, email), group in groupby(rows, key=lambda r: (r[2], r[3], r[4])):
+            loans = [(row[0], row[1], row[5]) for row in group]
+            rendered = templates.render(DIGEST_TEMPLATES[kind],
+                                        digest_context(kind, name, loans, today, fine_per_day))
+            if rendered is None:
+                stats['missing_template'] = DIGEST_TEMPLATES[kind]
+                return _with_timing(stats, started)
+            outbox.append({'to_email': email, 'template_name': DIGEST_TEMPLATES[kind],
+                           'subject': rendered[0], 'body': rendered[1], 'status': 'pending',
+                           'attempts': 0, 'next_attempt_at': now, 'created_at': now})
+            reminders.extend({'kind': kind, 'transaction_id': loan[0], 'reminder_date': reminder_date,
+                              'sent_at': now} for loan in loans)
+            stats['members'] += 1
+            stats['loans'] += len(loans)
+
+        if outbox:
+            # E-postalar ve "gönderildi" kayıtları aynı işlemde: ya ikisi birden yazılır ya hiçbiri
+            db.session.execute(db.insert(EmailOutbox), outbox)
+            db.session.execute(db.insert(ReminderLog), reminders)
+            db.session.info['email_queued'] = True
+            db.session.commit()
+            stats['emails'] += len(outbox)
+            stats['batches'] += 1
+
+    return _with_timing(stats, started)
+
+def _with_timing(stats, started):
+    seconds = time.perf_counter() - started
+    stats['seconds'] = round(seconds, 3)
+    stats['loans_per_second'] = round(stats['loans'] / seconds, 1) if seconds else None
+    return stats
@@ -15,6 +15,9 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
 from PyQt5.QtGui import QPixmap
 
+# Web uygulamasının (SQLAlchemy) zaman damgası biçimi; bildirimler bu metne göre sayfalanır
+DB_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
 ###############################################################################
 # Bildirim Sistemi
 ###############################################################################
@@ -31,7 +34,7 @@ class NotificationSystem:
             cursor.execute("""
                 INSERT INTO notifications (type, message, created_date, related_isbn)
                 VALUES (?, ?, ?, ?)
-            """, (type, message, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), related_isbn))
+            """, (type, message, datetime.now().strftime(DB_DATETIME_FORMAT), related_isbn))
             self.conn.commit()
         except Exception as e:
             print(f"Bildirim ekleme hatası: {e}")
@@ -899,6 +902,21 @@ class ISBNApp(QWidget):
 
         self.conn.commit()
 
+    def adjust_borrowed_count(self, cursor, isbn, delta):
+        """Web uygulamasının books.borrowed_count sayacını aynı işlemde güncelle
+        (kolon yalnızca web uygulamasının şema yükseltmesiyle eklenir; yoksa atlanır)"""
+        if not hasattr(self, '_has_borrowed_count'):
+            cursor.execute("PRAGMA table_info(books)")
+            self._has_borrowed_count = any(row[1] == 'borrowed_count' for row in cursor.fetchall())
+        if not self._has_borrowed_count or not delta:
+            return
+        if delta > 0:
+            cursor.execute("UPDATE books SET borrowed_count = borrowed_count + ? WHERE isbn = ?", (delta, isbn))
+        else:
+            cursor.execute(
+                "UPDATE books SET borrowed_count = MAX(borrowed_count + ?, 0) WHERE isbn = ?", (delta, isbn)
+            )
+
     ###########################################################################
     # 1. SEKME: VERİ ÇEKME
     ###########################################################################
@@ -1731,7 +1749,7 @@ class ISBNApp(QWidget):
                     cursor.execute("""
                         INSERT INTO search_history (search_term, search_date) 
                         VALUES (?, ?)
-                    """, (search_term_display, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+                    """, (search_term_display, datetime.now().strftime(DB_DATETIME_FORMAT)))
                     self.conn.commit()
                 except Exception as e:
                     print(f"Arama geçmişi kaydetme hatası: {e}")
@@ -2057,6 +2075,7 @@ class ISBNApp(QWidget):
                     "UPDATE books SET last_borrowed_date = ?, total_borrow_count = total_borrow_count + 1 WHERE isbn = ?",
                     (datetime.now().strftime("%Y-%m-%d"), isbn)
                 )
+                self.adjust_borrowed_count(cursor, isbn, 1)
                 self.conn.commit()
                 QMessageBox.information(self, "Başarılı", "Kitap ödünç verildi.")
                 self.load_transactions_from_db() # İşlemler tablosunu güncelle
@@ -2106,9 +2125,14 @@ class ISBNApp(QWidget):
                      QMessageBox.information(self, "Bilgi", "Bu işlem zaten daha önce iade alınmış.")
                      return
 
-                # İade işlemini gerçekleştir
-                cursor.execute("UPDATE transactions SET return_date = ? WHERE id = ?", 
+                # İade işlemini gerçekleştir (web uygulaması aynı anda iade aldıysa sayaç tekrar düşmez)
+                cursor.execute("UPDATE transactions SET return_date = ? WHERE id = ? AND return_date IS NULL",
                                (datetime.now().strftime("%Y-%m-%d"), trans_id))
+                if cursor.rowcount != 1:
+                    self.conn.rollback()
+                    QMessageBox.information(self, "Bilgi", "Bu işlem zaten daha önce iade alınmış.")
+                    return
+                self.adjust_borrowed_count(cursor, isbn, -1)
                 self.conn.commit()
                 QMessageBox.information(self, "Başarılı", "Kitap iade alındı.")
                 self.load_transactions_from_db() # İşlemler tablosunu güncelle
@@ -2184,6 +2208,8 @@ class ISBNApp(QWidget):
                     (row["isbn"].strip(), row["member_id"].strip(), row["borrow_date"].strip(),
                      row["due_date"].strip(), row["return_date"].strip() or None)
                 )
+                if not row["return_date"].strip():
+                    self.adjust_borrowed_count(cursor, row["isbn"].strip(), 1)
             self.conn.commit()
             QMessageBox.information(self, "Başarılı", "İşlemler başarıyla yüklendi.")
             self.load_transactions_from_db()
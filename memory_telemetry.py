@@ -0,0 +1,226 @@
+"""
+Bellek Telemetrisi (tracemalloc + RSS/USS)
+Her worker'ın RSS (yerleşik) ve USS (yalnızca bu sürece ait, fork sonrası kopyalanmış)
+belleği /proc üzerinden okunur ve Prometheus'a işlenir (bkz. metrics.update_process_memory).
+Yöneticiler tracemalloc'u çalışırken açıp anlık görüntü alabilir ve iki görüntü
+arasındaki farkı modül, dosya veya satır bazında görebilir. İçe aktarma (pandas,
+sklearn, reportlab) sırasındaki ayırmaları da görmek için uygulama
+PYTHONTRACEMALLOC=25 ortam değişkeniyle başlatılmalı.
+
+Kullanım (yönetici API'si, istekler hangi worker'a düşerse onun verisi döner):
+    POST /api/admin/memory/tracemalloc  {"action": "start", "frames": 25}
+    POST /api/admin/memory/snapshot     {"label": "baseline"}
+    GET  /api/admin/memory/diff?base=1&group=module
+"""
+
+import os
+import sys
+import sysconfig
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+STDLIB_ROOT = sysconfig.get_paths()['stdlib']
+
+MAX_SNAPSHOTS = 5
+DEFAULT_FRAMES = 25
+GROUPS = ('module', 'filename', 'lineno', 'traceback')
+
+# tracemalloc'un kendi ve içe aktarma mekanizmasının ayırmaları sonuçtan çıkarılır
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+def process_memory():
+    """{'rss': bayt, 'uss': bayt}; /proc yoksa USS None, RSS tepe değerdir"""
+    try:
+        values = {}
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in ('Rss', 'Private_Clean', 'Private_Dirty'):
+                    values[name] = int(rest.split()[0]) * 1024
+        return {'rss': values['Rss'], 'uss': values['Private_Clean'] + values['Private_Dirty']}
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux'ta KiB, macOS'ta bayt
+        return {'rss': peak if sys.platform == 'darwin' else peak * 1024, 'uss': None}
+    except (ImportError, OSError):
+        return {'rss': None, 'uss': None}
+
+def module_name(filename):
+    """Ayırmanın sahibi: proje dosyası (routes.py), paket (pandas) veya stdlib:modül"""
+    filename = os.path.abspath(filename) if not filename.startswith('<') else filename
+    parts = filename.split(os.sep)
+    for marker in ('site-packages', 'dist-packages'):
+        if marker in parts:
+            index = parts.index(marker)
+            if index + 1 < len(parts):
+                return parts[index + 1].split('.')[0]
+    if filename.startswith(PROJECT_ROOT + os.sep):
+        return os.path.relpath(filename, PROJECT_ROOT)
+    if filename.startswith(STDLIB_ROOT + os.sep):
+        return 'stdlib:' + os.path.relpath(filename, STDLIB_ROOT).split(os.sep)[0]
+    return filename
+
+def group_stats(stats, group, limit):
+    """Statistic / StatisticDiff listesini JSON'a çevir; 'module' grubunda dosyalar birleştirilir"""
+    if group == 'module':
+        totals = {}
+        for stat in stats:
+            name = module_name(stat.traceback[0].filename)
+            entry = totals.setdefault(name, {'name': name, 'size': 0, 'count': 0, 'size_diff': 0, 'count_diff': 0})
+            entry['size'] += stat.size
+            entry['count'] += stat.count
+            entry['size_diff'] += getattr(stat, 'size_diff', 0)
+            entry['count_diff'] += getattr(stat, 'count_diff', 0)
+        if stats and hasattr(stats[0], 'size_diff'):
+            return sorted(totals.values(), key=lambda e: abs(e['size_diff']), reverse=True)[:limit]
+        rows = [{'name': e['name'], 'size': e['size'], 'count': e['count']} for e in totals.values()]
+        return sorted(rows, key=lambda e: e['size'], reverse=True)[:limit]
+
+    rows = []
+    for stat in stats[:limit]:
+        frames = stat.traceback if group == 'traceback' else stat.traceback[:1]
+        row = {
+            'name': ' <- '.join(f'{module_name(frame.filename)}:{frame.lineno}' for frame in reversed(frames))
+            if group != 'filename' else module_name(stat.traceback[0].filename),
+            'size': stat.size,
+            'count': stat.count,
+        }
+        if hasattr(stat, 'size_diff'):
+            row.update(size_diff=stat.size_diff, count_diff=stat.count_diff)
+        rows.append(row)
+    return rows
+
+class MemoryTracer:
+    """Worker başına tracemalloc denetimi ve son anlık görüntüler"""
+
+    def __init__(self, dump_dir=None):
+        self.dump_dir = dump_dir
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self.snapshots = deque(maxlen=MAX_SNAPSHOTS)   # [{'id', 'label', 'time', 'memory', 'snapshot'}]
+
+    def start(self, frames=DEFAULT_FRAMES):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(max(1, min(int(frames), 100)))
+            print(f"📊 tracemalloc başlatıldı (pid {os.getpid()})")
+        return self.status()
+
+    def stop(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        with self._lock:
+            self.snapshots.clear()
+        return self.status()
+
+    def status(self):
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            'tracing': tracing,
+            'frames': tracemalloc.get_traceback_limit() if tracing else 0,
+            'traced_bytes': current,
+            'traced_peak_bytes': peak,
+            'overhead_bytes': tracemalloc.get_tracemalloc_memory() if tracing else 0,
+        }
+
+    def _capture(self, label=None):
+        if not tracemalloc.is_tracing():
+            raise RuntimeError('tracemalloc çalışmıyor')
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        return {
+            'id': sequence,
+            'label': label or f'snapshot-{sequence}',
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'memory': process_memory(),
+            'snapshot': snapshot,
+        }
+
+    def take(self, label=None):
+        """Anlık görüntü al ve sakla; dump_dir tanımlıysa .tracemalloc dosyası da yazılır"""
+        entry = self._capture(label)
+        with self._lock:
+            self.snapshots.append(entry)
+        if self.dump_dir:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            entry['snapshot'].dump(os.path.join(self.dump_dir, f'{os.getpid()}-{entry["id"]}.tracemalloc'))
+        return entry
+
+    def get(self, snapshot_id):
+        with self._lock:
+            for entry in self.snapshots:
+                if entry['id'] == snapshot_id:
+                    return entry
+        return None
+
+    def top(self, group='module', limit=25):
+        """Şu anki ayırmaların en büyükleri"""
+        snapshot = self._capture()['snapshot']
+        return group_stats(snapshot.statistics(_key_type(group)), group, limit)
+
+    def diff(self, base_id=None, group='module', limit=25):
+        """Saklanan görüntüden (varsayılan en eskisi) bu yana büyüyen/küçülen ayırmalar"""
+        if base_id:
+            base = self.get(base_id)
+        else:
+            with self._lock:
+                base = self.snapshots[0] if self.snapshots else None
+        if base is None:
+            raise LookupError('karşılaştırılacak anlık görüntü yok')
+        current = self._capture('current')
+        key_type = _key_type(group)
+        stats = current['snapshot'].compare_to(base['snapshot'], key_type)
+        return {
+            'base': self.describe(base),
+            'current': self.describe(current),
+            'rss_diff': _difference(current['memory']['rss'], base['memory']['rss']),
+            'uss_diff': _difference(current['memory']['uss'], base['memory']['uss']),
+            'stats': group_stats(stats, group, limit),
+        }
+
+    @staticmethod
+    def describe(entry):
+        return {key: value for key, value in entry.items() if key != 'snapshot'}
+
+    def report(self, extra=None):
+        """Worker belleği, tracemalloc durumu ve saklanan görüntüler"""
+        with self._lock:
+            snapshots = [self.describe(entry) for entry in self.snapshots]
+        return {
+            'pid': os.getpid(),
+            'memory': process_memory(),
+            'tracemalloc': self.status(),
+            'snapshots': snapshots,
+            'objects': extra or {},
+        }
+
+def _key_type(group):
+    if group in ('module', 'filename'):
+        return 'filename'
+    return 'traceback' if group == 'traceback' else 'lineno'
+
+def _difference(current, base):
+    return current - base if current is not None and base is not None else None
+
+def large_objects():
+    """Bilinen büyük bellek tutucularının yaklaşık boyutları (yüklenmişlerse)"""
+    sizes = {}
+    engine_module = sys.modules.get('ai_engine')
+    if engine_module is not None:
+        matrix = getattr(engine_module.ai_engine.get('recommendation'), 'similarity_matrix', None)
+        sizes['similarity_matrix_bytes'] = getattr(matrix, 'nbytes', 0)
+    sizes['loaded_modules'] = len(sys.modules)
+    return sizes
@@ -0,0 +1,234 @@
+"""
+Uygulama Metrikleri (Prometheus)
+Route başına istek süresi histogramı (p50/p95/p99 histogram_quantile ile), durum
+kodu sayıları, süren istekler, istek başına SQL sorgu sayısı/süresi, yanıt önbelleği
+sonuçları (X-Cache), Celery görev süreleri ve worker başına RSS/USS bellek. /metrics Prometheus metin biçiminde
+sunulur; PROMETHEUS_MULTIPROC_DIR tanımlıysa tüm gunicorn worker'larının (ve aynı
+makinedeki Celery worker'larının) değerleri toplanır (bkz. gunicorn.conf.py).
+Flask (init_metrics) ve Django (library.middleware.MetricsMiddleware) aynı metrikleri kullanır.
+prometheus_client kurulu değilse kayıt fonksiyonları hiçbir şey yapmaz
+"""
+
+import hmac
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from memory_telemetry import process_memory
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry,
+                                   Counter, Gauge, Histogram, generate_latest, multiprocess)
+except ImportError:
+    Histogram = None
+
+ENABLED = Histogram is not None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+TASK_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+# Worker bellek göstergeleri en fazla bu aralıkla (sn) /proc'tan yenilenir
+MEMORY_REFRESH_SECONDS = 15
+
+# Eşleşmeyen URL'ler tek etikette toplanır; etiket sayısı route sayısıyla sınırlı kalır
+UNMATCHED = '<unmatched>'
+
+if ENABLED:
+    REQUEST_LATENCY = Histogram(
+        'http_request_duration_seconds', 'İstek süresi (sn)',
+        ('method', 'endpoint'), buckets=LATENCY_BUCKETS
+    )
+    REQUESTS = Counter(
+        'http_requests', 'Durum koduna göre tamamlanan istekler',
+        ('method', 'endpoint', 'status')
+    )
+    IN_PROGRESS = Gauge(
+        'http_requests_in_progress', 'Süren istekler', multiprocess_mode='livesum'
+    )
+    DB_QUERIES = Histogram(
+        'http_request_db_queries', 'İstek başına SQL sorgu sayısı',
+        ('endpoint',), buckets=QUERY_COUNT_BUCKETS
+    )
+    DB_SECONDS = Histogram(
+        'http_request_db_seconds', 'İstek başına toplam SQL süresi (sn)',
+        ('endpoint',), buckets=LATENCY_BUCKETS
+    )
+    CACHE_LOOKUPS = Counter(
+        'http_cache_lookups', 'Yanıt önbelleği sonuçları (HIT/STALE/MISS)',
+        ('endpoint', 'result')
+    )
+    TASK_LATENCY = Histogram(
+        'celery_task_duration_seconds', 'Celery görev süresi (sn)',
+        ('task', 'state'), buckets=TASK_BUCKETS
+    )
+    # liveall: her worker pid etiketiyle ayrı görünür, ölen worker'ların değerleri atılır
+    PROCESS_MEMORY = Gauge(
+        'worker_memory_bytes', 'Worker belleği (rss: yerleşik, uss: yalnızca bu sürece ait)',
+        ('kind',), multiprocess_mode='liveall'
+    )
+    ACTIVITY_LOG_EVENTS = Counter(
+        'activity_log_events', 'Aktivite günlüğü kayıtları (written/dropped/failed)', ('result',)
+    )
+    ACTIVITY_LOG_QUEUE = Gauge(
+        'activity_log_queue_depth', 'Yazılmayı bekleyen aktivite kayıtları', multiprocess_mode='liveall'
+    )
+    WORKER_REQUESTS = Gauge(
+        'worker_requests_served', 'Worker başlatıldığından beri tamamlanan istekler',
+        multiprocess_mode='liveall'
+    )
+
+_local = threading.local()
+_memory = {'refreshed': 0.0, 'requests': 0}
+
+# --- Kayıt ---
+
+def begin_request():
+    """İstek başında çağrılır; SQL sayaçlarını sıfırlar, başlangıç zamanını döndürür"""
+    _local.queries = 0
+    _local.db_seconds = 0.0
+    _local.active = True
+    if ENABLED:
+        IN_PROGRESS.inc()
+    return time.perf_counter()
+
+def end_request(started, method, endpoint, status, cache_result=None):
+    elapsed = time.perf_counter() - started
+    _local.active = False
+    if not ENABLED:
+        return elapsed
+    endpoint = endpoint or UNMATCHED
+    IN_PROGRESS.dec()
+    REQUEST_LATENCY.labels(method, endpoint).observe(elapsed)
+    REQUESTS.labels(method, endpoint, str(status)).inc()
+    DB_QUERIES.labels(endpoint).observe(_local.queries)
+    DB_SECONDS.labels(endpoint).observe(_local.db_seconds)
+    if cache_result:
+        CACHE_LOOKUPS.labels(endpoint, cache_result).inc()
+    _memory['requests'] += 1
+    update_process_memory()
+    return elapsed
+
+def update_process_memory(force=False):
+    """RSS/USS göstergelerini yenile; istek sonunda en fazla MEMORY_REFRESH_SECONDS'ta bir okunur"""
+    now = time.monotonic()
+    if not ENABLED or (not force and now - _memory['refreshed'] < MEMORY_REFRESH_SECONDS):
+        return
+    _memory['refreshed'] = now
+    for kind, value in process_memory().items():
+        if value is not None:
+            PROCESS_MEMORY.labels(kind).set(value)
+    WORKER_REQUESTS.set(_memory['requests'])
+
+def requests_served():
+    return _memory['requests']
+
+def track_query(seconds):
+    if getattr(_local, 'active', False):
+        _local.queries += 1
+        _local.db_seconds += seconds
+
+def track_activity_log(result, amount=1):
+    if ENABLED:
+        ACTIVITY_LOG_EVENTS.labels(result).inc(amount)
+
+def set_activity_log_depth(depth):
+    if ENABLED:
+        ACTIVITY_LOG_QUEUE.set(depth)
+
+def request_db_stats():
+    """Süren isteğin (sorgu sayısı, SQL süresi) değerleri"""
+    return getattr(_local, 'queries', 0), getattr(_local, 'db_seconds', 0.0)
+
+@contextmanager
+def task_timer(name):
+    """Celery görevinin süresini başarı/hata durumuyla kaydet"""
+    started = time.perf_counter()
+    state = 'failure'
+    try:
+        yield
+        state = 'success'
+    finally:
+        if ENABLED:
+            TASK_LATENCY.labels(name, state).observe(time.perf_counter() - started)
+
+def install_sqlalchemy_metrics(engine):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['metrics_query_started'].pop()
+        track_query(time.perf_counter() - started)
+
+    @event.listens_for(engine, 'handle_error')
+    def drop_query_timer(exception_context):
+        timers = exception_context.connection.info.get('metrics_query_started') \
+            if exception_context.connection is not None else None
+        if timers:
+            timers.pop()
+
+# --- Sunum ---
+
+def render_metrics():
+    """(gövde, içerik tipi); multiprocess modunda tüm süreçlerin değerleri birleştirilir"""
+    if not ENABLED:
+        return b'# prometheus_client kurulu degil\n', 'text/plain; charset=utf-8'
+    update_process_memory(force=True)
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def metrics_authorized(authorization):
+    """METRICS_TOKEN tanımlıysa 'Bearer <token>' başlığı gerekir"""
+    token = os.environ.get('METRICS_TOKEN')
+    if not token:
+        return True
+    return hmac.compare_digest(authorization or '', f'Bearer {token}')
+
+def mark_process_dead(pid):
+    """gunicorn child_exit kancası: ölen worker'ın canlı gauge değerlerini at"""
+    if ENABLED and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
+
+# --- Flask ---
+
+def init_metrics(app, engine):
+    """Flask istek kancaları, SQL sayaçları ve /metrics"""
+    from flask import Response, g, request
+
+    install_sqlalchemy_metrics(engine)
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = begin_request()
+
+    def finish(status, cache_result=None):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            endpoint = request.url_rule.rule if request.url_rule is not None else UNMATCHED
+            end_request(started, request.method, endpoint, status, cache_result)
+
+    @app.after_request
+    def record_request_metrics(response):
+        finish(response.status_code, response.headers.get('X-Cache'))
+        return response
+
+    @app.teardown_request
+    def record_failed_request(exc):
+        # after_request çalışmadan biten istekler (yakalanmamış hata)
+        finish(500)
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        if not metrics_authorized(request.headers.get('Authorization')):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        body, content_type = render_metrics()
+        return Response(body, content_type=content_type, headers={'Cache-Control': 'no-store'})
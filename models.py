@@ -2,6 +2,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from sqlalchemy.orm import validates
+
+from isbn_utils import to_isbn13
 
 # Create db instance here to avoid circular imports
 db = SQLAlchemy()
@@ -36,7 +39,11 @@ class User(UserMixin, db.Model):
 
 class Book(db.Model):
     __tablename__ = 'books'
+    __table_args__ = (
+        db.Index('ux_books_isbn13', 'isbn13', unique=True),
+    )
     isbn = db.Column(db.String(20), primary_key=True)
+    isbn13 = db.Column(db.String(13))  # Kanonik ISBN-13 (tiresiz); ISBN olmayan kodlarda NULL
     title = db.Column(db.Text)
     authors = db.Column(db.Text)
     publish_date = db.Column(db.Text)
@@ -44,10 +51,12 @@ class Book(db.Model):
     publishers = db.Column(db.Text)
     languages = db.Column(db.Text)
     quantity = db.Column(db.Integer, default=1)
+    borrowed_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # İade edilmemiş ödünç sayısı
     shelf = db.Column(db.Text)
     cupboard = db.Column(db.Text)
     image_path = db.Column(db.Text)
-    cover_image = db.Column(db.LargeBinary)
+    cover_image = db.deferred(db.Column(db.LargeBinary))  # Eski kapak verisi; migrate-covers ile book_covers'a taşınır
+    cover_hash = db.Column(db.String(64), db.ForeignKey('book_covers.sha256'))
     last_borrowed_date = db.Column(db.Text)
     total_borrow_count = db.Column(db.Integer, default=0)
     qr_code = db.Column(db.Text)  # QR code path
@@ -60,9 +69,42 @@ class Book(db.Model):
     # Relationships
     reviews = db.relationship('Review', backref='book', lazy='dynamic')
     reservations = db.relationship('Reservation', backref='book', lazy='dynamic')
+    cover = db.relationship('BookCover', lazy='select')
+    
+    @property
+    def available_quantity(self):
+        return (self.quantity or 0) - (self.borrowed_count or 0)
+    
+    @property
+    def cover_url(self):
+        """Kapak resminin adresi: saklanan kapak varsa içerik adresli URL, yoksa image_path"""
+        if self.cover_hash:
+            return f'/covers/{self.cover_hash}'
+        return self.image_path or None
+    
+    @validates('isbn')
+    def _set_isbn13(self, key, isbn):
+        self.isbn13 = to_isbn13(isbn)
+        return isbn
+    
+    @classmethod
+    def find_by_isbn(cls, code):
+        """Tireli/tiresiz ISBN-10 veya ISBN-13 ile kitabı bul (indeksli eşitlik araması)"""
+        if not code:
+            return None
+        isbn13 = to_isbn13(code)
+        if isbn13:
+            book = cls.query.filter_by(isbn13=isbn13).first()
+            if book:
+                return book
+        return db.session.get(cls, str(code).strip())
 
 class Member(db.Model):
     __tablename__ = 'members'
+    __table_args__ = (
+        db.Index('ix_members_numara', 'numara'),
+        db.Index('ix_members_user_id', 'user_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     ad_soyad = db.Column(db.Text)
     sinif = db.Column(db.Text)
@@ -85,12 +127,18 @@ class Member(db.Model):
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        db.Index('ix_transactions_return_due', 'return_date', 'due_date'),
+        db.Index('ix_transactions_member_return', 'member_id', 'return_date'),
+        db.Index('ix_transactions_isbn_return', 'isbn', 'return_date'),
+        db.Index('ix_transactions_borrow_date', 'borrow_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     isbn = db.Column(db.String(20), db.ForeignKey('books.isbn'))
     member_id = db.Column(db.Integer, db.ForeignKey('members.id'))
-    borrow_date = db.Column(db.Text)
-    due_date = db.Column(db.Text)
-    return_date = db.Column(db.Text)
+    borrow_date = db.Column(db.Date)
+    due_date = db.Column(db.Date)
+    return_date = db.Column(db.Date)
     renew_count = db.Column(db.Integer, default=0)
     fine_amount = db.Column(db.Float, default=0.0)
     condition_on_borrow = db.Column(db.String(50), default='good')  # good, fair, poor
@@ -110,18 +158,27 @@ class BookCategory(db.Model):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_created_date', 'created_date'),
+        db.Index('ix_notifications_related_isbn', 'related_isbn'),
+        db.Index('ix_notifications_read_created', 'is_read', 'created_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.Text)
     message = db.Column(db.Text)
-    created_date = db.Column(db.Text)
+    created_date = db.Column(db.DateTime)
     is_read = db.Column(db.Integer, default=0)
     related_isbn = db.Column(db.String(20), db.ForeignKey('books.isbn'))
 
 class SearchHistory(db.Model):
     __tablename__ = 'search_history'
+    __table_args__ = (
+        db.Index('ix_search_history_search_date', 'search_date'),
+        db.Index('ix_search_history_user_date', 'user_id', 'search_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     search_term = db.Column(db.Text)
-    search_date = db.Column(db.Text)
+    search_date = db.Column(db.DateTime)
     result_count = db.Column(db.Integer)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
 
@@ -138,6 +195,10 @@ class Review(db.Model):
     
 class Reservation(db.Model):
     __tablename__ = 'reservations'
+    __table_args__ = (
+        db.Index('ix_reservations_status_isbn', 'status', 'isbn', 'queue_position'),
+        db.Index('ix_reservations_user_status', 'user_id', 'status'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     isbn = db.Column(db.String(20), db.ForeignKey('books.isbn'))
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -150,6 +211,11 @@ class Reservation(db.Model):
     
 class Fine(db.Model):
     __tablename__ = 'fines'
+    __table_args__ = (
+        db.Index('ix_fines_member_status', 'member_id', 'status'),
+        db.Index('ix_fines_user_status', 'user_id', 'status'),
+        db.Index('ix_fines_transaction_id', 'transaction_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     member_id = db.Column(db.Integer, db.ForeignKey('members.id'))
@@ -162,6 +228,10 @@ class Fine(db.Model):
     
 class ActivityLog(db.Model):
     __tablename__ = 'activity_logs'
+    __table_args__ = (
+        db.Index('ix_activity_logs_timestamp', 'timestamp'),
+        db.Index('ix_activity_logs_user_timestamp', 'user_id', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     action = db.Column(db.String(100))
@@ -178,6 +248,20 @@ class Settings(db.Model):
     description = db.Column(db.Text)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class BookCover(db.Model):
+    __tablename__ = 'book_covers'
+    sha256 = db.Column(db.String(64), primary_key=True)  # İçerik adresi; aynı resim bir kez saklanır
+    content_type = db.Column(db.String(50), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    data = db.deferred(db.Column(db.LargeBinary, nullable=False))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SchemaVersion(db.Model):
+    __tablename__ = 'schema_versions'
+    name = db.Column(db.String(50), primary_key=True)  # indexes, ...
+    version = db.Column(db.String(64))
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class EmailTemplate(db.Model):
     __tablename__ = 'email_templates'
     id = db.Column(db.Integer, primary_key=True)
@@ -187,6 +271,40 @@ class EmailTemplate(db.Model):
     variables = db.Column(db.Text)  # JSON list of available variables
     is_active = db.Column(db.Boolean, default=True)
 
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(120), nullable=False)
+    template_name = db.Column(db.String(50))
+    subject = db.Column(db.String(200))
+    body = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, dead (bkz. email_outbox.py)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+class ReminderLog(db.Model):
+    __tablename__ = 'reminder_log'
+    # Aynı ödünç için aynı gün (overdue) veya aynı teslim tarihi (due_soon) ikinci kez e-posta gitmez
+    kind = db.Column(db.String(20), primary_key=True)  # overdue, due_soon
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), primary_key=True)
+    reminder_date = db.Column(db.Date, primary_key=True)
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class LoanNotificationState(db.Model):
+    __tablename__ = 'loan_notification_state'
+    # Ödünç başına uygulama içi bildirim durumu (bkz. overdue_scanner.py); teslim tarihi değişirse sıfırlanır
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), primary_key=True)
+    due_date = db.Column(db.Date)
+    reminded_at = db.Column(db.DateTime)
+    overdue_notified_at = db.Column(db.DateTime)
+
 class OnlineBorrowRequest(db.Model):
     __tablename__ = 'online_borrow_requests'
     id = db.Column(db.Integer, primary_key=True)
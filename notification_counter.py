@@ -0,0 +1,76 @@
+"""
+Okunmamış Bildirim Sayacı
+Okunmamış bildirim sayısı notification_counters tablosunda SQLite tetikleyicileriyle
+güncel tutulur; masaüstü uygulamasının ve tarama görevinin eklediği bildirimler de
+sayılır. Her sekmenin dakikalık rozet sorgusu böylece tablo taramak yerine tek
+satırlık bir birincil anahtar okuması olur. SQLite dışında (is_read, created_date)
+indeksi üzerinden COUNT'a düşülür
+"""
+
+import hashlib
+
+from conditional_requests import missing_triggers
+from models import db, Notification, SchemaVersion
+
+COUNTER_TABLE = 'notification_counters'
+UNREAD = 'unread'
+TRIGGERS = ('notifications_unread_insert', 'notifications_unread_delete', 'notifications_unread_update')
+
+def counter_statements():
+    """Okunmamış sayısını ekleme, silme ve is_read değişiminde güncelleyen tetikleyiciler"""
+    return [
+        f"CREATE TABLE IF NOT EXISTS {COUNTER_TABLE} "
+        f"(name TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID",
+        "CREATE TRIGGER IF NOT EXISTS notifications_unread_insert AFTER INSERT ON notifications "
+        f"WHEN NEW.is_read = 0 BEGIN "
+        f"UPDATE {COUNTER_TABLE} SET value = value + 1 WHERE name = '{UNREAD}'; END",
+        "CREATE TRIGGER IF NOT EXISTS notifications_unread_delete AFTER DELETE ON notifications "
+        f"WHEN OLD.is_read = 0 BEGIN "
+        f"UPDATE {COUNTER_TABLE} SET value = value - 1 WHERE name = '{UNREAD}'; END",
+        "CREATE TRIGGER IF NOT EXISTS notifications_unread_update AFTER UPDATE OF is_read ON notifications "
+        f"WHEN (OLD.is_read IS 0) != (NEW.is_read IS 0) BEGIN "
+        f"UPDATE {COUNTER_TABLE} SET value = value + (CASE WHEN NEW.is_read IS 0 THEN 1 ELSE -1 END) "
+        f"WHERE name = '{UNREAD}'; END",
+    ]
+
+NOTIFICATION_COUNTER_VERSION = hashlib.sha1('\n'.join(counter_statements()).encode()).hexdigest()
+
+def ensure_notification_counter(recount=False):
+    """Sayaç tablosunu ve tetikleyicilerini kur, sayacı gerçek sayıyla başlat (yalnızca SQLite)"""
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    applied = db.session.get(SchemaVersion, COUNTER_TABLE)
+    if (applied is not None and applied.version == NOTIFICATION_COUNTER_VERSION and not recount
+            and not missing_triggers(TRIGGERS)):
+        return True
+
+    for statement in counter_statements():
+        db.session.execute(db.text(statement))
+    # Tetikleyicilerle aynı işlemde sayılır; arada eklenen bildirim kaçmaz
+    db.session.execute(
+        db.text(f"INSERT OR REPLACE INTO {COUNTER_TABLE} (name, value) "
+                f"SELECT :name, COUNT(*) FROM notifications WHERE is_read = 0"),
+        {'name': UNREAD},
+    )
+    if applied is None:
+        applied = SchemaVersion(name=COUNTER_TABLE)
+        db.session.add(applied)
+    applied.version = NOTIFICATION_COUNTER_VERSION
+    db.session.commit()
+    print("✅ Okunmamış bildirim sayacı kuruldu")
+    return True
+
+def unread_count():
+    """Okunmamış bildirim sayısı; sayaç yoksa indeksli COUNT"""
+    try:
+        value = db.session.execute(
+            db.text(f"SELECT value FROM {COUNTER_TABLE} WHERE name = :name"), {'name': UNREAD}
+        ).scalar()
+        if value is not None:
+            return max(value, 0)
+    except Exception:
+        db.session.rollback()
+    return db.session.scalar(
+        db.select(db.func.count()).select_from(Notification).where(Notification.is_read == 0)
+    )
@@ -0,0 +1,160 @@
+"""
+Artımlı Gecikme Taraması
+Uygulama içi iade hatırlatması ve gecikme bildirimlerini üretir. Her ödünç için
+loan_notification_state'te hangi bildirimin ne zaman üretildiği tutulur; böylece
+tarama her çalıştığında aynı ödünç için yeni Notification satırı oluşmaz.
+Son tarama günü ve son görülen ödünç kimliği schema_versions'ta filigran olarak
+saklanır; yalnızca o günden bu yana hatırlatma penceresine giren, gecikmeye düşen,
+yeni eklenen veya teslim tarihi değişen ödünçler okunur. Yeni bildirimler ve
+durumlar tek işlemde toplu yazılır.
+
+Kullanım:
+    flask --app app scan-overdue
+    flask --app app compact-notifications
+"""
+
+import time
+from datetime import date, datetime, timedelta
+
+from models import db, Book, LoanNotificationState, Member, Notification, SchemaVersion, Transaction
+
+WATERMARK = 'overdue_scan'
+REMINDER_DAYS = 3
+
+def read_watermark():
+    """(son tarama günü, son ödünç kimliği) veya ilk taramada None"""
+    row = db.session.get(SchemaVersion, WATERMARK)
+    if row is None or not row.version:
+        return None
+    scanned_on, _, last_id = row.version.partition(':')
+    try:
+        return date.fromisoformat(scanned_on), int(last_id)
+    except ValueError:
+        return None
+
+def write_watermark(scanned_on, last_id):
+    row = db.session.get(SchemaVersion, WATERMARK)
+    if row is None:
+        row = SchemaVersion(name=WATERMARK)
+        db.session.add(row)
+    row.version = f'{scanned_on.isoformat()}:{last_id}'
+
+def changed_loans_condition(watermark, today, reminder_days):
+    """Filigrandan bu yana durumu değişmiş olabilecek açık ödünçler"""
+    horizon = today + timedelta(days=reminder_days)
+    in_window = Transaction.due_date <= horizon
+    if watermark is None:
+        return in_window
+    scanned_on, last_id = watermark
+    renewed = db.select(LoanNotificationState.transaction_id).join(
+        Transaction, LoanNotificationState.transaction_id == Transaction.id
+    ).where(Transaction.return_date.is_(None), LoanNotificationState.due_date != Transaction.due_date)
+    return db.and_(in_window, db.or_(
+        Transaction.id > last_id,
+        Transaction.due_date > scanned_on + timedelta(days=reminder_days),   # hatırlatma penceresine girdi
+        db.and_(Transaction.due_date >= scanned_on, Transaction.due_date < today),   # gecikmeye düştü
+        Transaction.id.in_(renewed),
+    ))
+
+def reminder_message(title, member_name, due_date):
+    return f"'{title}' kitabı {member_name} tarafından {due_date} tarihine kadar iade edilmelidir."
+
+def overdue_message(title, member_name, due_date):
+    return f"'{title}' kitabı {member_name} tarafından {due_date} tarihinden beri gecikmiştir."
+
+def existing_messages():
+    """Eski taramaların ürettiği (tür, mesaj) çiftleri; ilk taramada tekrar üretilmez"""
+    rows = db.session.execute(
+        db.select(Notification.type, Notification.message).distinct()
+        .where(Notification.type.in_(('return_reminder', 'overdue')))
+    )
+    return set(rows)
+
+def scan_loan_notifications(today=None, reminder_days=REMINDER_DAYS):
+    """Değişen ödünçler için bildirim üret; istatistik sözlüğü döndürür"""
+    today = today or date.today()
+    started = time.perf_counter()
+    watermark = read_watermark()
+    last_id = db.session.scalar(db.select(db.func.max(Transaction.id))) or 0
+    stats = {'candidates': 0, 'return_reminder': 0, 'overdue': 0, 'adopted': 0, 'pruned': 0}
+
+    rows = db.session.execute(
+        db.select(Transaction.id, Transaction.isbn, Transaction.due_date, Book.title, Member.ad_soyad,
+                  LoanNotificationState)
+        .join(Book, Transaction.isbn == Book.isbn)
+        .join(Member, Transaction.member_id == Member.id)
+        .outerjoin(LoanNotificationState, LoanNotificationState.transaction_id == Transaction.id)
+        .where(Transaction.return_date.is_(None),
+               changed_loans_condition(watermark, today, reminder_days))
+    ).all()
+    adopt = existing_messages() if watermark is None and rows else set()
+
+    now = datetime.now()
+    notifications = []
+    for transaction_id, isbn, due_date, title, member_name, state in rows:
+        stats['candidates'] += 1
+        if state is None:
+            state = LoanNotificationState(transaction_id=transaction_id)
+            db.session.add(state)
+        if state.due_date != due_date:
+            # Yeni ödünç veya uzatılmış teslim tarihi: bildirimler yeni tarih için baştan
+            state.due_date = due_date
+            state.reminded_at = state.overdue_notified_at = None
+
+        if due_date < today:
+            if state.overdue_notified_at is not None:
+                continue
+            kind, message = 'overdue', overdue_message(title, member_name, due_date)
+            state.overdue_notified_at = now
+        else:
+            if state.reminded_at is not None:
+                continue
+            kind, message = 'return_reminder', reminder_message(title, member_name, due_date)
+            state.reminded_at = now
+
+        if (kind, message) in adopt:
+            stats['adopted'] += 1
+            continue
+        notifications.append({'type': kind, 'message': message, 'created_date': now,
+                              'is_read': 0, 'related_isbn': isbn})
+        stats[kind] += 1
+
+    if watermark is None or watermark[0] < today:
+        stats['pruned'] = prune_returned_states()
+    if notifications:
+        db.session.execute(db.insert(Notification), notifications)
+    write_watermark(today, last_id)
+    db.session.commit()
+
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    return stats
+
+def prune_returned_states():
+    """İade edilmiş ödünçlerin durum satırlarını sil"""
+    returned = db.select(Transaction.id).where(Transaction.return_date.is_not(None))
+    result = db.session.execute(
+        db.delete(LoanNotificationState).where(LoanNotificationState.transaction_id.in_(returned))
+    )
+    return result.rowcount
+
+def compact_notifications():
+    """Aynı (tür, mesaj, kitap) bildirimlerinden en eskisini bırak, diğerlerini sil.
+    Kopyalardan biri okunduysa kalan satır okunmuş sayılır"""
+    groups = (Notification.type, Notification.message, Notification.related_isbn)
+    survivors = db.select(db.func.min(Notification.id)).group_by(*groups)
+    read_groups = (
+        db.select(db.func.min(Notification.id)).group_by(*groups)
+        .having(db.func.max(Notification.is_read) > 0)
+    )
+    before = db.session.scalar(db.select(db.func.count(Notification.id)))
+    db.session.execute(
+        db.update(Notification).where(Notification.id.in_(read_groups)).values(is_read=1)
+    )
+    deleted = db.session.execute(
+        db.delete(Notification).where(Notification.id.not_in(survivors))
+    ).rowcount
+    pruned = prune_returned_states()
+    db.session.commit()
+    print(f"✅ Bildirimler sıkıştırıldı: {before} satırdan {deleted} kopya silindi, "
+          f"{before - deleted} kaldı ({pruned} eski durum satırı temizlendi)")
+    return deleted
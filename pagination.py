@@ -0,0 +1,137 @@
+"""
+Anahtar Kümesi (Cursor) Sayfalama
+OFFSET ve COUNT(*) yerine son satırın sıralama anahtarından devam eden sayfalama;
+derin sayfalar da ilk sayfa kadar hızlıdır
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+from flask import jsonify
+
+from models import db
+
+MAX_PER_PAGE = 200
+
+class InvalidCursor(ValueError):
+    pass
+
+class StoredText(str):
+    """Tarih kolonunun veritabanında saklandığı haliyle metin değeri"""
+
+def _encode_value(value):
+    if isinstance(value, StoredText):
+        return {'raw': str(value)}
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if isinstance(value.get('raw'), str):
+            return StoredText(value['raw'])
+        raise InvalidCursor('Geçersiz cursor')
+    return value
+
+def encode_cursor(values):
+    """Sıralama anahtarı değerlerini opak, URL'de taşınabilir bir metne çevir"""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(token, size):
+    """encode_cursor çıktısını çöz; bozuk veya başka bir sıralamaya ait cursor'da InvalidCursor"""
+    try:
+        payload = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = [_decode_value(value) for value in json.loads(payload)]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('Geçersiz cursor') from e
+    if len(values) != size:
+        raise InvalidCursor('Geçersiz cursor')
+    return values
+
+class CursorPage:
+    """Cursor ile alınmış tek sayfa"""
+
+    def __init__(self, items, next_cursor, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.has_more = next_cursor is not None
+        self.total = total
+
+    def meta(self):
+        """API yanıtına eklenecek sayfalama alanları"""
+        meta = {'next_cursor': self.next_cursor, 'has_more': self.has_more}
+        if self.total is not None:
+            meta['total'] = self.total
+        return meta
+
+def positive_int(value, default, maximum=None):
+    """JSON gövdesinden gelen sayfa değerini çöz; geçersizse varsayılan, üst sınır varsa kırpılır"""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = default
+    number = max(1, number)
+    return min(number, maximum) if maximum else number
+
+def _is_temporal(column):
+    return isinstance(column.type, (db.Date, db.DateTime))
+
+def _bind(value, column):
+    if isinstance(value, StoredText):
+        return db.literal(str(value), db.String)
+    # Değerler kolon tipiyle bağlanır (ör. DateTime'ın SQLite'taki metin biçimi)
+    return db.literal(value, column.type)
+
+def _stored_key(order_by, values):
+    """SQLite'ta tarih kolonlarının saklanan metnini oku (son kolon benzersiz olmalı)
+
+    Masaüstü uygulaması tarihleri mikro saniyesiz yazar; ORDER BY saklanan metni
+    karşılaştırdığından sınır da aynı metinle karşılaştırılmalıdır, yoksa sınır
+    satırı bir sonraki sayfada tekrar gelir.
+    """
+    if db.engine.dialect.name != 'sqlite' or not any(_is_temporal(column) for column in order_by):
+        return values
+    stored = db.session.execute(
+        db.select(*[db.cast(column, db.Text) if _is_temporal(column) else column for column in order_by])
+        .where(order_by[-1] == values[-1])
+    ).first()
+    if stored is None:
+        return values
+    return [StoredText(raw) if _is_temporal(column) and raw is not None else value
+            for column, raw, value in zip(order_by, stored, values)]
+
+def cursor_paginate(query, order_by, key, cursor=None, per_page=20, descending=True, with_total=False):
+    """Sorguyu (sıralama kolonları..., id) anahtarına göre sayfala
+
+    order_by: sıralama kolonları, sonuncusu benzersiz olmalı (genellikle id).
+    key: sonuç satırından aynı sıradaki değerleri döndüren fonksiyon.
+    Toplam sayı yalnızca with_total istenirse hesaplanır.
+    """
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    total = query.order_by(None).count() if with_total else None
+
+    if cursor:
+        values = decode_cursor(cursor, len(order_by))
+        boundary = db.tuple_(*order_by)
+        position = db.tuple_(*[_bind(value, column) for value, column in zip(values, order_by)])
+        query = query.filter(boundary < position if descending else boundary > position)
+
+    ordering = [column.desc() if descending else column.asc() for column in order_by]
+    rows = query.order_by(None).order_by(*ordering).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(_stored_key(order_by, key(rows[-1])))
+    return CursorPage(rows, next_cursor, total)
+
+def invalid_cursor_response():
+    return jsonify({'success': False, 'message': 'Geçersiz cursor'}), 400
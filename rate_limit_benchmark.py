@@ -0,0 +1,105 @@
+"""
+İstek Sınırlama Ek Yük Testi
+Arka uç başına tek bir sınır kontrolünün süresini (µs) ve aynı SQLite dosyasını
+paylaşan süreçlerin toplam kontrol hızını ölçer; ayrıca dekoratörlü ve dekoratörsüz
+bir Flask görünümü arasındaki istek başı farkı gösterir
+
+Kullanım:
+    python rate_limit_benchmark.py [--hits 20000] [--processes 3] [--redis redis://localhost:6379/1]
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from flask import Flask
+from flask_login import LoginManager
+
+from rate_limiting import Limit, RateLimiter, backend_from_url
+
+# Kontroller reddedilmesin diye yüksek tutulur; ölçülen şey yalnızca kontrol maliyeti
+LIMIT = Limit(10 ** 9, 1)
+KEYS = 1000
+
+def time_backend(url, hits):
+    """Tek süreçte hit başına ortalama süre (µs)"""
+    backend = backend_from_url(url)
+    started = time.perf_counter()
+    for i in range(hits):
+        backend.hit(f'bench:{i % KEYS}', LIMIT.interval, LIMIT.tolerance)
+    return (time.perf_counter() - started) / hits * 1e6
+
+def _worker(url, hits, results):
+    results.put(time_backend(url, hits))
+
+def shared_throughput(url, hits, processes):
+    """Aynı arka ucu paylaşan süreçlerin toplam kontrol/sn değeri"""
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_worker, args=(url, hits, results)) for _ in range(processes)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    per_hit = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    return hits * processes / elapsed, sum(per_hit) / len(per_hit)
+
+def request_overhead(url, requests):
+    """Flask test istemcisiyle dekoratörlü/dekoratörsüz görünüm arasındaki fark (µs/istek)"""
+    app = Flask(__name__)
+    app.config['RATELIMIT_STORAGE_URL'] = url
+    LoginManager(app).user_loader(lambda user_id: None)
+    limiter = RateLimiter()
+
+    @app.route('/plain')
+    def plain():
+        return 'ok'
+
+    @app.route('/limited')
+    @limiter.limit(LIMIT.max_requests, LIMIT.window)
+    def limited():
+        return 'ok'
+
+    client = app.test_client()
+    timings = {}
+    for path in ('/plain', '/limited'):
+        client.get(path)
+        started = time.perf_counter()
+        for _ in range(requests):
+            client.get(path)
+        timings[path] = (time.perf_counter() - started) / requests * 1e6
+    return timings['/plain'], timings['/limited']
+
+def main():
+    parser = argparse.ArgumentParser(description='İstek sınırlama ek yükü')
+    parser.add_argument('--hits', type=int, default=20000, help='Arka uç başına kontrol sayısı')
+    parser.add_argument('--processes', type=int, default=3, help='SQLite paylaşım testindeki süreç sayısı')
+    parser.add_argument('--requests', type=int, default=3000, help='Flask istek ek yükü testi istek sayısı')
+    parser.add_argument('--redis', help='Redis arka ucunu da ölç (ör. redis://localhost:6379/1)')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='ratelimit-bench-')
+    sqlite_url = 'sqlite:///' + os.path.join(work_dir, 'ratelimit.db')
+    backends = {'bellek': 'memory://', 'sqlite': sqlite_url}
+    if args.redis:
+        backends['redis'] = args.redis
+
+    print(f"📊 Kontrol başına süre ({args.hits} kontrol, {KEYS} anahtar)")
+    for name, url in backends.items():
+        print(f"   {name:<8}{time_backend(url, args.hits):>9.1f} µs")
+
+    throughput, per_hit = shared_throughput(sqlite_url, args.hits // args.processes, args.processes)
+    print(f"📊 SQLite, {args.processes} süreç: toplam {throughput:,.0f} kontrol/sn ({per_hit:.1f} µs/kontrol)")
+
+    for name, url in backends.items():
+        plain, limited = request_overhead(url, args.requests)
+        print(f"📊 Flask isteği ({name}): {plain:.0f} µs → {limited:.0f} µs (+{limited - plain:.0f} µs)")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
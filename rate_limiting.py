@@ -0,0 +1,268 @@
+"""
+İstek Sınırlama (Rate Limiting)
+GCRA (Generic Cell Rate Algorithm) ile anahtar başına tek bir sayı tutan token bucket;
+her istek O(1). Durum bir arka uçta saklanır: aynı sunucudaki worker'lar için SQLite
+dosyası, birden çok sunucu için Redis (RATELIMIT_STORAGE_URL), testler için bellek.
+Yanıtlara RateLimit-* başlıkları, reddedilen isteklere Retry-After eklenir
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from flask_login import current_user
+
+# Süresi dolmuş kovaların temizlenme sıklığı (istek sayısı)
+CLEANUP_EVERY = 1000
+
+UNIT_SECONDS = {
+    'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400,
+}
+
+def gcra(tat, now, interval, tolerance, cost=1):
+    """GCRA adımı: (izin, yeni_tat). tat: kovanın 'teorik varış zamanı' (boş kova = now)"""
+    tat = max(tat if tat is not None else now, now)
+    new_tat = tat + interval * cost
+    if new_tat - tolerance > now:
+        return False, tat
+    return True, new_tat
+
+class MemoryBackend:
+    """Süreç içi arka uç; her worker kendi sınırını uygular (testler ve masaüstü için)"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+
+    def hit(self, key, interval, tolerance, cost=1):
+        now = time.time()
+        with self._lock:
+            allowed, tat = gcra(self._buckets.get(key), now, interval, tolerance, cost)
+            if allowed:
+                self._buckets[key] = tat
+            self._hits += 1
+            if self._hits % CLEANUP_EVERY == 0:
+                self._buckets = {k: v for k, v in self._buckets.items() if v > now}
+        return allowed, tat, now
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+class SQLiteBackend:
+    """Aynı sunucudaki tüm worker'ların paylaştığı SQLite dosyası
+
+    Sınır durumu kaybedilebilir olduğu için synchronous=OFF; ana veritabanından ayrı
+    dosyada tutulur, kütüphane işlemlerinin yazma kilidiyle yarışmaz.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._hits = 0
+
+    def _connection(self):
+        local = self._local
+        # gunicorn fork'u sonrası ebeveynin bağlantısı kullanılmaz
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS ratelimit_buckets '
+                '(key TEXT PRIMARY KEY, tat REAL NOT NULL) WITHOUT ROWID'
+            )
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def hit(self, key, interval, tolerance, cost=1):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = connection.execute('SELECT tat FROM ratelimit_buckets WHERE key = ?', (key,)).fetchone()
+            allowed, tat = gcra(row[0] if row else None, now, interval, tolerance, cost)
+            if allowed:
+                connection.execute(
+                    'INSERT INTO ratelimit_buckets (key, tat) VALUES (?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET tat = excluded.tat',
+                    (key, tat)
+                )
+            self._hits += 1
+            if self._hits % CLEANUP_EVERY == 0:
+                connection.execute('DELETE FROM ratelimit_buckets WHERE tat < ?', (now,))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return allowed, tat, now
+
+    def reset(self):
+        self._connection().execute('DELETE FROM ratelimit_buckets')
+
+# Saat Redis'ten alınır; birden çok sunucunun saat farkı sınırı bozmaz
+REDIS_GCRA_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval * cost
+if new_tat - tolerance > now then
+    return {0, tostring(tat), tostring(now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, tostring(new_tat), tostring(now)}
+"""
+
+class RedisBackend:
+    """Birden çok sunucu için Redis arka ucu; GCRA adımı tek bir Lua betiğinde atomik çalışır"""
+
+    def __init__(self, url, prefix='ratelimit:'):
+        import redis
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(REDIS_GCRA_SCRIPT)
+
+    def hit(self, key, interval, tolerance, cost=1):
+        allowed, tat, now = self._script(keys=[self.prefix + key], args=[interval, tolerance, cost])
+        return bool(allowed), float(tat), float(now)
+
+    def reset(self):
+        for key in self._client.scan_iter(f'{self.prefix}*'):
+            self._client.delete(key)
+
+def backend_from_url(url):
+    """memory://, sqlite:///yol/dosya.db veya redis://sunucu:port/db"""
+    if url.startswith('memory://'):
+        return MemoryBackend()
+    if url.startswith('sqlite:///'):
+        return SQLiteBackend(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    raise ValueError(f'Desteklenmeyen RATELIMIT_STORAGE_URL: {url}')
+
+class Limit:
+    """'50 per hour', '10/minute' veya (istek, saniye) biçiminde tek bir sınır"""
+
+    def __init__(self, max_requests, window):
+        self.max_requests = max_requests
+        self.window = window
+        self.interval = window / max_requests
+        # Boş kovada art arda max_requests isteğe izin verilir
+        self.tolerance = window
+
+    @classmethod
+    def parse(cls, value):
+        if isinstance(value, Limit):
+            return value
+        if isinstance(value, (tuple, list)):
+            return cls(*value)
+        match = re.fullmatch(r'\s*(\d+)\s*(?:/|per)\s*(\d*)\s*(second|minute|hour|day)s?\s*', value)
+        if not match:
+            raise ValueError(f'Geçersiz sınır: {value}')
+        count, multiplier, unit = match.groups()
+        return cls(int(count), int(multiplier or 1) * UNIT_SECONDS[unit])
+
+    def policy(self):
+        return f'{self.max_requests};w={self.window:g}'
+
+class RateLimitResult:
+    def __init__(self, limit, allowed, tat, now, cost=1):
+        self.limit = limit
+        self.allowed = allowed
+        if allowed:
+            self.remaining = max(0, int((limit.tolerance - (tat - now)) / limit.interval))
+            self.retry_after = 0
+        else:
+            self.remaining = 0
+            self.retry_after = max(1, math.ceil(tat + limit.interval * cost - limit.tolerance - now))
+        # Kovanın tamamen dolmasına kalan süre
+        self.reset = max(0, math.ceil(tat - now))
+
+    def headers(self):
+        headers = {
+            'RateLimit-Limit': str(self.limit.max_requests),
+            'RateLimit-Remaining': str(self.remaining),
+            'RateLimit-Reset': str(self.reset),
+            'RateLimit-Policy': self.limit.policy(),
+        }
+        if not self.allowed:
+            headers['Retry-After'] = str(self.retry_after)
+        return headers
+
+class RateLimiter:
+    """Arka ucu uygulama ayarından (RATELIMIT_STORAGE_URL) tembel oluşturan sınırlayıcı"""
+
+    def __init__(self):
+        self._backends = {}
+        self._lock = threading.Lock()
+
+    def backend(self):
+        url = current_app.config.get('RATELIMIT_STORAGE_URL', 'memory://')
+        backend = self._backends.get(url)
+        if backend is None:
+            with self._lock:
+                backend = self._backends.get(url)
+                if backend is None:
+                    backend = self._backends[url] = backend_from_url(url)
+        return backend
+
+    def check(self, key, limit, cost=1):
+        allowed, tat, now = self.backend().hit(key, limit.interval, limit.tolerance, cost)
+        return RateLimitResult(limit, allowed, tat, now, cost)
+
+    def limit(self, max_requests=100, window=3600, user_limit=None, scope=None,
+              methods=None, exempt_roles=('admin',), cost=1):
+        """Görünüm dekoratörü
+
+        Anonim istekler IP adresine, giriş yapmış kullanıcılar kullanıcı kimliğine göre
+        sayılır; user_limit verilirse giriş yapmış kullanıcılara o sınır uygulanır
+        (ör. '300 per hour'). scope verilmezse her route kendi kovasını kullanır.
+        """
+        anonymous_limit = Limit(max_requests, window)
+        authenticated_limit = Limit.parse(user_limit) if user_limit else anonymous_limit
+
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if not current_app.config.get('RATELIMIT_ENABLED', True) or \
+                        (methods and request.method not in methods):
+                    return f(*args, **kwargs)
+
+                if current_user.is_authenticated:
+                    if getattr(current_user, 'role', None) in exempt_roles:
+                        return f(*args, **kwargs)
+                    identity, limit = f'user:{current_user.get_id()}', authenticated_limit
+                else:
+                    identity, limit = f'ip:{request.remote_addr}', anonymous_limit
+
+                result = self.check(f'{scope or request.endpoint}:{identity}', limit, cost)
+                if not result.allowed:
+                    response = jsonify({
+                        'error': 'Rate limit exceeded',
+                        'message': f'En fazla {limit.max_requests} istek / {limit.window:g} sn',
+                        'retry_after': result.retry_after
+                    })
+                    response.status_code = 429
+                else:
+                    response = current_app.make_response(f(*args, **kwargs))
+                for name, value in result.headers().items():
+                    response.headers[name] = value
+                return response
+            return decorated_function
+        return decorator
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,286 @@
+"""
+İstek Profili (cProfile + Örnekleme)
+Yönetici oturumunda ?_profile=1 parametresiyle veya imzalı X-Profile-Token başlığıyla
+gelen tek bir istek cProfile ve yığın örnekleyicisiyle profillenir; sonuç profiles/
+altına .pstats (snakeviz, pstats), .txt (en pahalı fonksiyonlar) ve .collapsed
+(speedscope/flamegraph.pl katlanmış yığınlar) olarak yazılır.
+PROFILE_SAMPLING_INTERVAL tanımlıysa her worker, istek işleyen iş parçacıklarını bu
+aralıkla örnekler ve birikmiş yığınları profiles/sampling/<pid>.collapsed dosyasına
+yazar; yönetici sayfası tüm worker'ları birleştirip en sıcak fonksiyonları gösterir
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+MAX_PROFILES = 200
+TOKEN_MAX_AGE = 3600
+TOKEN_SALT = 'request-profile'
+
+# Tek istek örneklemesi (5 ms) ve sürekli düşük hızlı örnekleme varsayılanları
+REQUEST_SAMPLE_INTERVAL = 0.005
+SAMPLING_FLUSH_SECONDS = 300
+MAX_STACKS = 20000
+MAX_DEPTH = 128
+
+PROFILE_SUFFIXES = ('.pstats', '.txt', '.collapsed')
+SAFE_NAME_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+def frame_stack(frame):
+    """Kökten yaprağa 'fonksiyon (dosya:satır)' listesi"""
+    stack = []
+    while frame is not None and len(stack) < MAX_DEPTH:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    stack.reverse()
+    return ';'.join(stack)
+
+def write_collapsed(path, stacks):
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            f.write(f'{stack} {count}\n')
+
+def read_collapsed(path):
+    stacks = Counter()
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack and count.isdigit():
+                    stacks[stack] += int(count)
+    except OSError:
+        pass
+    return stacks
+
+def hot_functions(stacks, limit=30):
+    """Katlanmış yığınlardan (fonksiyon, kendi örnekleri, kapsayıcı örnekleri)"""
+    own, inclusive = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for name in set(frames):
+            inclusive[name] += count
+    total = sum(stacks.values()) or 1
+    return [
+        {'function': name, 'self': count, 'self_pct': round(count * 100 / total, 1),
+         'inclusive_pct': round(inclusive[name] * 100 / total, 1)}
+        for name, count in own.most_common(limit)
+    ]
+
+class StackSampler:
+    """Belirli iş parçacıklarının yığınlarını aralıklarla örnekleyen arka plan iş parçacığı"""
+
+    def __init__(self, interval, thread_ids):
+        self.interval = interval
+        self.thread_ids = thread_ids   # canlı küme; örnekleme anındaki içerik kullanılır
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def sample(self):
+        frames = sys._current_frames()
+        for thread_id in list(self.thread_ids):
+            frame = frames.get(thread_id)
+            if frame is None:
+                continue
+            stack = frame_stack(frame)
+            if stack in self.stacks or len(self.stacks) < MAX_STACKS:
+                self.stacks[stack] += 1
+            self.samples += 1
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+class RequestProfiler:
+    def __init__(self, directory, secret_key, sampling_interval=0):
+        self.directory = directory
+        self.sampling_interval = sampling_interval
+        self._serializer = URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT)
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._pid = None
+        self.active_threads = set()
+        self.background = None
+
+    # --- Tetikleme ---
+
+    def make_token(self):
+        """X-Profile-Token başlığı için imzalı, TOKEN_MAX_AGE süreli belirteç"""
+        return self._serializer.dumps('profile')
+
+    def valid_token(self, token):
+        try:
+            return self._serializer.loads(token, max_age=TOKEN_MAX_AGE) == 'profile'
+        except BadSignature:
+            return False
+
+    # --- Tek istek ---
+
+    def begin(self):
+        profile = cProfile.Profile()
+        sampler = StackSampler(REQUEST_SAMPLE_INTERVAL, {threading.get_ident()}).start()
+        profile.enable()
+        return profile, sampler, time.perf_counter()
+
+    def finish(self, state, label):
+        """Profili durdur ve dosyalara yaz; dosya adının kökünü döndürür"""
+        profile, sampler, started = state
+        profile.disable()
+        stacks = sampler.stop()
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        stem = SAFE_NAME_RE.sub('_', f'{time.strftime("%Y%m%d-%H%M%S")}-{label}-{os.getpid()}-{sequence}')
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, stem)
+
+        profile.dump_stats(base + '.pstats')
+        summary = io.StringIO()
+        summary.write(f'{label}: {elapsed * 1000:.1f} ms, {sampler.samples} örnek\n\n')
+        pstats.Stats(profile, stream=summary).sort_stats('cumulative').print_stats(40)
+        with open(base + '.txt', 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
+        write_collapsed(base + '.collapsed', stacks)
+        self._prune()
+        return stem
+
+    def _prune(self):
+        profiles = self.list_profiles(limit=None)
+        for profile in profiles[MAX_PROFILES:]:
+            for suffix in PROFILE_SUFFIXES:
+                try:
+                    os.remove(os.path.join(self.directory, profile['name'] + suffix))
+                except OSError:
+                    pass
+
+    def list_profiles(self, limit=50):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        profiles = []
+        for name in names:
+            if not name.endswith('.pstats'):
+                continue
+            stem = name[:-len('.pstats')]
+            path = os.path.join(self.directory, name)
+            profiles.append({
+                'name': stem,
+                'created': os.path.getmtime(path),
+                'files': [stem + suffix for suffix in PROFILE_SUFFIXES
+                          if os.path.exists(os.path.join(self.directory, stem + suffix))],
+            })
+        profiles.sort(key=lambda p: p['created'], reverse=True)
+        return profiles if limit is None else profiles[:limit]
+
+    def profile_path(self, filename):
+        """İndirilebilir profil dosyasının yolu; geçersiz adlarda None"""
+        if SAFE_NAME_RE.search(filename) or not filename.endswith(PROFILE_SUFFIXES):
+            return None
+        path = os.path.join(self.directory, filename)
+        return path if os.path.isfile(path) else None
+
+    # --- Sürekli örnekleme ---
+
+    def start_background(self):
+        """Bu süreçte düşük hızlı örnekleyiciyi başlat (fork sonrası her worker kendi örnekleyicisini açar)"""
+        pid = os.getpid()
+        if not self.sampling_interval or self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            self.background = StackSampler(self.sampling_interval, self.active_threads).start()
+            threading.Thread(target=self._flush_loop, name='stack-sampler-flush', daemon=True).start()
+
+    def _sampling_path(self, pid):
+        return os.path.join(self.directory, 'sampling', f'{pid}.collapsed')
+
+    def flush_background(self):
+        if self.background is None:
+            return
+        os.makedirs(os.path.dirname(self._sampling_path(os.getpid())), exist_ok=True)
+        write_collapsed(self._sampling_path(os.getpid()), Counter(self.background.stacks))
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(SAMPLING_FLUSH_SECONDS)
+            try:
+                self.flush_background()
+            except OSError as e:
+                print(f"❌ Örnekleme profili yazılamadı: {e}")
+
+    def sampled_hot_functions(self, limit=30):
+        """Tüm worker'ların biriktirdiği yığınlar (bu worker'ınki güncel hâliyle)"""
+        self.flush_background()
+        directory = os.path.dirname(self._sampling_path(0))
+        stacks = Counter()
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            names = []
+        for name in names:
+            if name.endswith('.collapsed'):
+                stacks.update(read_collapsed(os.path.join(directory, name)))
+        return {'samples': sum(stacks.values()), 'functions': hot_functions(stacks, limit)}
+
+def init_request_profiler(app, profiler):
+    """?_profile=1 (yönetici) veya X-Profile-Token ile istek profili; sürekli örnekleme kancaları"""
+    from flask import g, request
+    from flask_login import current_user
+
+    def requested():
+        token = request.headers.get('X-Profile-Token')
+        if token:
+            return profiler.valid_token(token)
+        if request.args.get('_profile') != '1':
+            return False
+        return current_user.is_authenticated and getattr(current_user, 'role', None) == 'admin'
+
+    @app.before_request
+    def start_request_profile():
+        profiler.start_background()
+        profiler.active_threads.add(threading.get_ident())
+        if (request.args.get('_profile') or request.headers.get('X-Profile-Token')) and requested():
+            g.request_profile = profiler.begin()
+
+    @app.after_request
+    def save_request_profile(response):
+        state = g.pop('request_profile', None)
+        if state is not None:
+            stem = profiler.finish(state, request.endpoint or 'unmatched')
+            response.headers['X-Profile'] = stem
+        return response
+
+    @app.teardown_request
+    def stop_request_profile(exc):
+        profiler.active_threads.discard(threading.get_ident())
+        state = g.pop('request_profile', None)
+        if state is not None:
+            state[0].disable()
+            state[1].stop()
@@ -0,0 +1,386 @@
+"""
+API Yanıt Önbelleği
+Boyutu sınırlı LRU, kayıt başına TTL, süresi dolan kaydı arka planda yenilerken
+eskisini sunma (stale-while-revalidate), aynı anahtar için eşzamanlı isteklerin
+görünümü tek kez çalıştırması (single-flight), kullanıcı/rol/sorguya göre anahtar
+ve etiket tabanlı geçersizleştirme. Etiketler commit edilen ORM değişikliklerinden
+otomatik üretilir; geçersizleştirmeler bir günlük dosyasıyla diğer worker'lara iletilir.
+anonymous=True ile anonim ziyaretçilerin HTML sayfaları da (dil/temaya göre) saklanır
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from itertools import chain
+
+from flask import Response, copy_current_request_context, current_app, g, request, session
+from flask_login import current_user
+
+from isbn_utils import to_isbn13
+
+MAX_ENTRIES = 2048
+MAX_BYTES = 32 * 1024 * 1024
+
+# Bekleyen istek, lider isteğin görünümü en fazla bu kadar bekler; sonra kendisi çalıştırır
+FLIGHT_WAIT_SECONDS = 30
+
+# Geçersizleştirme günlüğü bu boyutu aşınca yenisiyle değiştirilir (worker'lar önbelleği boşaltır)
+INVALIDATION_LOG_MAX_BYTES = 1024 * 1024
+
+# Tablo etiketine ek olarak satır bazlı etiketler; format() satır nesnesiyle çağrılır
+# books:{isbn} etiketi kitap sayfasını da geçersiz kılar (ödünç/iade, yorum, kategori);
+# kayıttaki ISBN tireli olabildiği için ISBN-13 biçimi de eklenir (bkz. routes.book_page_tags)
+ROW_TAGS = {
+    'books': ('books:{0.isbn}',),
+    'members': ('members:{0.id}',),
+    'transactions': ('transactions:member:{0.member_id}', 'books:{0.isbn}'),
+    'reviews': ('books:{0.isbn}',),
+    'book_categories': ('books:{0.book_isbn}',),
+}
+
+# vary=('locale',) için desteklenen diller; ilki varsayılan
+SUPPORTED_LANGUAGES = ('tr', 'en')
+
+VARY_NAMES = ('query', 'user', 'role', 'locale', 'theme')
+
+# Önbellek kopyasına alınmayan başlıklar
+SKIPPED_HEADERS = ('Set-Cookie', 'Date', 'X-Cache')
+
+def row_tags(tag):
+    """Satır etiketi ve kitap etiketleri için kanonik ISBN-13 karşılığı"""
+    if tag.startswith('books:'):
+        isbn13 = to_isbn13(tag[len('books:'):])
+        if isbn13:
+            return (tag, f'books:{isbn13}')
+    return (tag,)
+
+class _Entry:
+    __slots__ = ('body', 'status', 'headers', 'tags', 'fresh_until', 'stale_until', 'size')
+
+    def __init__(self, response, tags, ttl, stale_ttl):
+        now = time.monotonic()
+        self.body = response.get_data()
+        self.status = response.status_code
+        self.headers = [(name, value) for name, value in response.headers.items()
+                        if name not in SKIPPED_HEADERS]
+        self.tags = tags
+        self.fresh_until = now + ttl
+        self.stale_until = self.fresh_until + stale_ttl
+        self.size = len(self.body)
+
+    def response(self, state):
+        response = Response(self.body, status=self.status, headers=self.headers)
+        response.headers['X-Cache'] = state
+        return response
+
+class _Flight:
+    """Bir anahtar için süren tek hesaplama; bekleyenler done ile uyandırılır"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+class _InvalidationLog:
+    """Worker'lar arası geçersizleştirme: etiketler ortak bir dosyaya satır satır eklenir"""
+
+    def __init__(self, path):
+        self.path = path
+        self._inode = None
+        self._offset = None
+
+    def publish(self, tags):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as log_file:
+            log_file.write(''.join(f'{tag}\n' for tag in tags))
+            size = log_file.tell()
+        if size > INVALIDATION_LOG_MAX_BYTES:
+            temp_path = f'{self.path}.{os.getpid()}.tmp'
+            open(temp_path, 'w').close()
+            os.replace(temp_path, self.path)
+
+    def poll(self):
+        """Son okumadan beri eklenen etiketler; dosya değiştirildiyse None (tümü geçersiz)"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return []
+        if self._inode is None:
+            self._inode, self._offset = stat.st_ino, stat.st_size
+            return []
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._inode, self._offset = stat.st_ino, stat.st_size
+            return None
+        if stat.st_size == self._offset:
+            return []
+
+        with open(self.path, 'rb') as log_file:
+            log_file.seek(self._offset)
+            data = log_file.read(stat.st_size - self._offset)
+        # Yarım yazılmış son satır bir sonraki okumaya kalır
+        complete = data[:data.rfind(b'\n') + 1]
+        self._offset += len(complete)
+        return complete.decode('utf-8').split()
+
+class ResponseCache:
+    """Süreç içi yanıt önbelleği; yanıtlar Response nesnesi değil gövde+başlık olarak saklanır"""
+
+    def __init__(self, log_path, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._log = _InvalidationLog(log_path)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._entries = OrderedDict()   # anahtar -> _Entry, en son kullanılan sonda
+        self._tag_keys = {}             # etiket -> anahtar kümesi
+        self._tag_versions = {}         # etiket -> geçersizleştirme sayısı (yarış kontrolü)
+        self._flights = {}              # anahtar -> _Flight
+        self._generation = 0            # clear() sayacı
+        self._bytes = 0
+        self.counters = dict.fromkeys(
+            ('hits', 'stale_hits', 'misses', 'coalesced', 'revalidations', 'stores',
+             'evictions', 'invalidations'), 0
+        )
+
+    # --- Depolama ---
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+    def _store(self, key, response, tags, ttl, stale_ttl, snapshot):
+        """Başarılı ve çerez içermeyen yanıtı sakla; hesaplama sürerken etiketi geçersizleşmişse saklama"""
+        if response.status_code != 200 or response.direct_passthrough or 'Set-Cookie' in response.headers:
+            return
+        entry = _Entry(response, tags, ttl, stale_ttl)
+        if entry.size > self.max_bytes // 8:
+            return
+        with self._lock:
+            if snapshot != self._snapshot(tags):
+                return
+            self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            for tag in tags:
+                self._tag_keys.setdefault(tag, set()).add(key)
+            self.counters['stores'] += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.counters['evictions'] += 1
+
+    # --- Geçersizleştirme ---
+
+    def _invalidate_local(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+                for key in list(self._tag_keys.get(tag, ())):
+                    self._remove(key)
+                    self.counters['invalidations'] += 1
+
+    def _sync(self):
+        """Diğer worker'ların yayımladığı geçersizleştirmeleri uygula"""
+        with self._sync_lock:
+            tags = self._log.poll()
+        if tags is None:
+            self.clear()
+        elif tags:
+            self._invalidate_local(set(tags))
+
+    def invalidate(self, *tags):
+        """Etiketli kayıtları bu süreçte sil ve diğer worker'lara bildir"""
+        tags = {tag for tag in tags if tag}
+        if not tags:
+            return
+        self._invalidate_local(tags)
+        self._log.publish(sorted(tags))
+
+    def clear(self):
+        with self._lock:
+            # Süren hesaplamaların sonuçları da saklanmasın
+            self._generation += 1
+            self._entries.clear()
+            self._tag_keys.clear()
+            self._bytes = 0
+
+    def install_invalidation_hooks(self, session):
+        """Commit edilen ORM değişikliklerinden etiket üret (tablo adı + ROW_TAGS)"""
+        from sqlalchemy import event
+
+        def pending_tags(session):
+            return session.info.setdefault('response_cache_tags', set())
+
+        @event.listens_for(session, 'after_flush')
+        def collect_flushed(session, flush_context):
+            tags = pending_tags(session)
+            for instance in chain(session.new, session.dirty, session.deleted):
+                table = getattr(instance, '__tablename__', None)
+                if table is None:
+                    continue
+                tags.add(table)
+                for template in ROW_TAGS.get(table, ()):
+                    tags.update(row_tags(template.format(instance)))
+
+        @event.listens_for(session, 'do_orm_execute')
+        def collect_bulk(orm_execute_state):
+            # Book.query.filter(...).update(...) gibi toplu yazılar session.dirty'de görünmez
+            if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper:
+                pending_tags(orm_execute_state.session).add(orm_execute_state.bind_mapper.local_table.name)
+
+        @event.listens_for(session, 'after_commit')
+        def invalidate_committed(session):
+            tags = session.info.pop('response_cache_tags', None)
+            if tags:
+                self.invalidate(*tags)
+
+    # --- Okuma ---
+
+    def _begin(self, key):
+        """Anahtarın durumu: ('hit'|'stale'|'lead'|'wait', entry, flight)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now >= entry.stale_until:
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if now < entry.fresh_until:
+                    self.counters['hits'] += 1
+                    return 'hit', entry, None
+                self.counters['stale_hits'] += 1
+                if key in self._flights:
+                    return 'stale', entry, None
+                flight = self._flights[key] = _Flight()
+                self.counters['revalidations'] += 1
+                return 'stale', entry, flight
+
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.counters['coalesced'] += 1
+                return 'wait', None, flight
+            flight = self._flights[key] = _Flight()
+            self.counters['misses'] += 1
+            return 'lead', None, flight
+
+    def _peek(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() < entry.stale_until:
+                return entry
+        return None
+
+    def _finish(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.done.set()
+
+    def _snapshot(self, tags):
+        return self._generation, tuple(self._tag_versions.get(tag, 0) for tag in sorted(tags))
+
+    def _compute(self, key, view, args, kwargs, tags, ttl, stale_ttl, flight):
+        with self._lock:
+            snapshot = self._snapshot(tags)
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+            self._store(key, response, tags, ttl, stale_ttl, snapshot)
+        finally:
+            self._finish(key, flight)
+        return response
+
+    def _revalidate(self, key, view, args, kwargs, tags, ttl, stale_ttl, flight):
+        """Eski kaydı sunarken görünümü istek bağlamının kopyasıyla arka planda yeniden çalıştır"""
+        @copy_current_request_context
+        def refresh():
+            try:
+                self._compute(key, view, args, kwargs, tags, ttl, stale_ttl, flight)
+            except Exception as e:
+                print(f"❌ Önbellek yenileme hatası ({request.endpoint}): {e}")
+
+        threading.Thread(target=refresh, name='response-cache-refresh', daemon=True).start()
+
+    def _key(self, vary, args, kwargs):
+        # conditional_requests ETag'i: yanıt, ETag'in ait olduğu tablo sürümlerinde hesaplanmış olmalı
+        parts = [request.endpoint, repr(args), repr(sorted(kwargs.items())), g.get('change_etag', '')]
+        for name in vary:
+            if name == 'query':
+                parts.append(repr(sorted(request.args.items(multi=True))))
+            elif name == 'user':
+                parts.append(current_user.get_id() if current_user.is_authenticated else '-')
+            elif name == 'role':
+                parts.append(getattr(current_user, 'role', '-') if current_user.is_authenticated else '-')
+            elif name == 'locale':
+                parts.append(request.cookies.get('language')
+                             or request.accept_languages.best_match(SUPPORTED_LANGUAGES)
+                             or SUPPORTED_LANGUAGES[0])
+            elif name == 'theme':
+                parts.append(request.cookies.get('theme', 'light'))
+            else:
+                parts.append(request.headers.get(name, ''))
+        return hashlib.sha1('\x1f'.join(map(str, parts)).encode()).hexdigest()
+
+    def cached(self, timeout=300, stale=60, vary=('query', 'user'), tags=(), anonymous=False):
+        """Görünüm dekoratörü
+
+        timeout: taze kalma süresi (sn); stale: süre dolduktan sonra arka planda yenilenirken
+        eski yanıtın sunulabileceği ek süre. vary: 'query', 'user', 'role', 'locale', 'theme'
+        veya istek başlığı adları. tags: geçersizleştirme etiketleri; '{member_id}' gibi alanlar
+        URL parametreleriyle doldurulur, çağrılabilir etiket URL parametreleriyle çağrılır ve
+        etiket listesi döndürür. anonymous: yalnızca giriş yapmamış, bekleyen flash mesajı
+        olmayan istekler önbellekten sunulur (HTML sayfaları).
+        """
+        header_vary = [name for name in vary if name not in VARY_NAMES]
+
+        def decorator(view):
+            @wraps(view)
+            def decorated_function(*args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return view(*args, **kwargs)
+                if anonymous and (current_user.is_authenticated or session.get('_flashes')):
+                    return view(*args, **kwargs)
+
+                self._sync()
+                key = self._key(vary, args, kwargs)
+                entry_tags = frozenset(chain.from_iterable(
+                    tag(**kwargs) if callable(tag) else (tag.format(**kwargs),) for tag in tags
+                ))
+                state, entry, flight = self._begin(key)
+
+                if state == 'wait':
+                    flight.done.wait(FLIGHT_WAIT_SECONDS)
+                    entry = self._peek(key)
+                    if entry is None:
+                        # Liderin yanıtı saklanamadı (hata, 404...) veya zaman aşımı; kendimiz çalıştırırız
+                        return view(*args, **kwargs)
+                    response = entry.response('HIT')
+                elif state == 'lead':
+                    response = self._compute(key, view, args, kwargs, entry_tags, timeout, stale, flight)
+                    response.headers['X-Cache'] = 'MISS'
+                else:
+                    if flight is not None:
+                        self._revalidate(key, view, args, kwargs, entry_tags, timeout, stale, flight)
+                    response = entry.response('HIT' if state == 'hit' else 'STALE')
+
+                for name in header_vary:
+                    response.vary.add(name)
+                return response
+            return decorated_function
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+            counters.update(entries=len(self._entries), bytes=self._bytes, in_flight=len(self._flights))
+        lookups = counters['hits'] + counters['stale_hits'] + counters['misses'] + counters['coalesced']
+        counters['hit_ratio'] = round((counters['hits'] + counters['stale_hits']) / lookups, 4) if lookups else 0.0
+        return counters
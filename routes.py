@@ -1,13 +1,16 @@
-from flask import render_template, request, redirect, url_for, flash
+from flask import render_template, request, redirect, url_for, flash, abort
 from flask_login import login_user, logout_user, login_required, current_user
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import datetime, date, timedelta
 from functools import wraps
-import re
 import os
 
-from config import app, get_setting
+from config import app, get_setting, request_profiler
 from models import db, User, Book, Member, Transaction, Category, BookCategory, Notification, SearchHistory, Review, Reservation, Fine, ActivityLog, Settings, EmailTemplate, OnlineBorrowRequest, QRCode
-from utils import log_activity, save_qr_code, send_email
+from utils import log_activity, save_qr_code, queue_email
+from catalog_search import apply_search
+from api_performance import cache_page, rate_limit
+from isbn_utils import to_isbn10, to_isbn13
 
 # Role required decorator
 def role_required(role):
@@ -23,6 +26,7 @@ def role_required(role):
 
 # Authentication Routes
 @app.route('/login', methods=['GET', 'POST'])
+@rate_limit(max_requests=10, window=60, methods=('POST',))  # parola deneme saldırılarına karşı
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('index'))
@@ -83,24 +87,33 @@ def register():
             )
             user.set_password(password)
             db.session.add(user)
-            db.session.commit()
-            
-            log_activity('register', f'New user registered: {username}')
+            db.session.flush()
             
-            # Send welcome email
-            send_email(email, 'welcome', {
+            # Send welcome email (kullanıcı kaydıyla aynı işlemde giden kutusuna)
+            queue_email(email, 'welcome', {
                 'member_name': username,
                 'member_id': user.id,
                 'join_date': datetime.now().strftime('%d.%m.%Y')
             })
+            db.session.commit()
+            
+            log_activity('register', f'New user registered: {username}')
             
             flash('Kayıt başarılı! Giriş yapabilirsiniz.', 'success')
             return redirect(url_for('login'))
     
     return render_template('register.html')
 
+def book_page_tags(isbn):
+    """Kitap sayfası etiketleri; URL'deki ISBN biçimi kayıttakinden farklı olabilir.
+    Yazma tarafı kayıttaki ISBN'in ISBN-13 biçimini de etiketler (response_cache.row_tags),
+    bu yüzden tireli/tiresiz her iki istek de ortak books:<isbn13> etiketiyle eşleşir"""
+    forms = {isbn, to_isbn13(isbn), to_isbn10(isbn)}
+    return [f'books:{form}' for form in forms if form] + ['categories']
+
 # Main Routes
 @app.route('/')
+@cache_page(timeout=120, tags=('books', 'transactions', 'members', 'reservations', 'users'))
 def index():
     """Home page with statistics"""
     total_books = db.session.query(db.func.sum(Book.quantity)).scalar() or 0
@@ -111,12 +124,12 @@ def index():
     
     # Additional statistics
     today_transactions = Transaction.query.filter(
-        db.func.date(Transaction.borrow_date) == datetime.now().date()
+        Transaction.borrow_date == date.today()
     ).count()
     
     overdue_books = db.session.query(Transaction).filter(
         Transaction.return_date == None,
-        Transaction.due_date < datetime.now().strftime("%Y-%m-%d")
+        Transaction.due_date < date.today()
     ).count()
     
     active_reservations = Reservation.query.filter_by(status='active').count()
@@ -145,6 +158,7 @@ def index():
                          recent_activities=recent_activities)
 
 @app.route('/books')
+@cache_page(timeout=3600, tags=('categories',))
 def books():
     """Books page"""
     categories = Category.query.all()
@@ -156,9 +170,13 @@ def test():
     return render_template('test.html')
 
 @app.route('/book/<isbn>')
+@cache_page(timeout=600, tags=(book_page_tags,))
 def book_detail(isbn):
     """Book detail page with reviews and QR code"""
-    book = Book.query.get_or_404(isbn)
+    book = Book.find_by_isbn(isbn)
+    if not book:
+        abort(404)
+    isbn = book.isbn
     
     # Get book categories
     categories = db.session.query(Category.name).join(BookCategory)\
@@ -166,8 +184,8 @@ def book_detail(isbn):
     categories = [cat[0] for cat in categories]
     
     # Get availability info
-    borrowed_count = Transaction.query.filter_by(isbn=isbn, return_date=None).count()
-    available_count = book.quantity - borrowed_count
+    borrowed_count = book.borrowed_count
+    available_count = book.available_quantity
     
     # Get reviews
     reviews = Review.query.filter_by(isbn=isbn)\
@@ -194,7 +212,7 @@ def book_detail(isbn):
             active_borrows = Transaction.query.filter_by(
                 member_id=member.id, return_date=None
             ).count()
-            max_books = int(get_setting('max_books_per_member', '5'))
+            max_books = get_setting('max_books_per_member', 5, type=int)
             can_borrow = active_borrows < max_books and available_count > 0
     
     log_activity('view_book', f'Viewed book: {book.title}')
@@ -213,6 +231,8 @@ def book_detail(isbn):
 @role_required('admin')
 def dashboard():
     """Admin dashboard with statistics"""
+    today = date.today()
+    
     # Basic stats
     stats = {
         'total_books': db.session.query(db.func.sum(Book.quantity)).scalar() or 0,
@@ -224,31 +244,40 @@ def dashboard():
         'borrowed_books': Transaction.query.filter_by(return_date=None).count(),
         'overdue_books': Transaction.query.filter(
             Transaction.return_date == None,
-            Transaction.due_date < datetime.now().strftime("%Y-%m-%d")
+            Transaction.due_date < today
         ).count(),
         'monthly_transactions': Transaction.query.filter(
-            Transaction.borrow_date >= (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+            Transaction.borrow_date >= today - timedelta(days=30)
         ).count(),
         'daily_average': 0
     }
     
     stats['daily_average'] = round(stats['monthly_transactions'] / 30, 1)
     
-    # Monthly chart data
-    monthly_data = []
-    for i in range(11, -1, -1):
-        month_start = (datetime.now() - timedelta(days=i*30)).strftime("%Y-%m")
-        borrows = Transaction.query.filter(
-            Transaction.borrow_date.like(f"{month_start}%")
-        ).count()
-        returns = Transaction.query.filter(
-            Transaction.return_date.like(f"{month_start}%")
-        ).count()
-        monthly_data.append({
-            'month': month_start,
-            'borrows': borrows,
-            'returns': returns
-        })
+    # Monthly chart data: son 12 takvim ayı, her kolon için tek aralık sorgusu
+    months = []
+    year, month = today.year, today.month
+    for _ in range(12):
+        months.append((year, month))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    months.reverse()
+    range_start = date(months[0][0], months[0][1], 1)
+    
+    def count_by_month(column):
+        rows = db.session.query(column, db.func.count(Transaction.id))\
+            .filter(column >= range_start).group_by(column).all()
+        counts = Counter()
+        for day, count in rows:
+            counts[(day.year, day.month)] += count
+        return counts
+    
+    borrow_counts = count_by_month(Transaction.borrow_date)
+    return_counts = count_by_month(Transaction.return_date)
+    monthly_data = [{
+        'month': f"{year}-{month:02d}",
+        'borrows': borrow_counts[(year, month)],
+        'returns': return_counts[(year, month)]
+    } for year, month in months]
     
     monthly_labels = [d['month'] for d in monthly_data]
     monthly_borrows = [d['borrows'] for d in monthly_data]
@@ -267,7 +296,7 @@ def dashboard():
         Book.isbn, Book.title, Book.authors, Book.average_rating,
         db.func.count(Transaction.id).label('borrow_count')
     ).join(Transaction).filter(
-        Transaction.borrow_date >= (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+        Transaction.borrow_date >= today - timedelta(days=30)
     ).group_by(Book.isbn).order_by(db.text('borrow_count DESC')).limit(10).all()
     
     # None rating'leri 0'a çevir
@@ -287,7 +316,7 @@ def dashboard():
         Member.reliability_score.label('reliability'),
         db.func.count(Transaction.id).label('borrow_count')
     ).join(Transaction).filter(
-        Transaction.borrow_date >= (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+        Transaction.borrow_date >= today - timedelta(days=30)
     ).group_by(Member.id).order_by(db.text('borrow_count DESC')).limit(10).all()
     
     # Recent activities
@@ -390,12 +419,10 @@ def my_books():
     current_books_data = []
     for transaction, book in current_books_query:
         # Calculate days left
-        due_date = datetime.strptime(transaction.due_date, '%Y-%m-%d')
-        today = datetime.now()
-        days_left = (due_date.date() - today.date()).days
+        days_left = (transaction.due_date - date.today()).days
         
         # Check if can renew
-        max_renew = int(get_setting('max_renew_count', '2'))
+        max_renew = get_setting('max_renew_count', 2, type=int)
         can_renew = transaction.renew_count < max_renew and not transaction.return_date
         
         current_books_data.append({
@@ -448,9 +475,6 @@ def search():
     search_type = request.args.get('type', 'all')
     page = request.args.get('page', 1, type=int)
     
-    def normalize_isbn(isbn):
-        return re.sub(r'[^0-9Xx]', '', isbn or '')
-    
     results = {
         'books': [],
         'members': [],
@@ -462,28 +486,20 @@ def search():
         if current_user.is_authenticated:
             search_log = SearchHistory(
                 search_term=query,
-                search_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                search_date=datetime.now(),
                 user_id=current_user.id
             )
             db.session.add(search_log)
         
         # Search books
         if search_type in ['all', 'books']:
-            norm_query = normalize_isbn(query)
-            books = Book.query.filter(
-                db.or_(
-                    db.func.replace(db.func.replace(Book.isbn, '-', ''), ' ', '').contains(norm_query),
-                    Book.title.contains(query),
-                    Book.authors.contains(query),
-                    Book.publishers.contains(query)
-                )
-            ).paginate(page=page, per_page=20, error_out=False)
+            books = apply_search(Book.query, query)\
+                .paginate(page=page, per_page=20, error_out=False)
             
             for book in books.items:
-                borrowed = Transaction.query.filter_by(isbn=book.isbn, return_date=None).count()
                 results['books'].append({
                     'book': book,
-                    'available': book.quantity - borrowed
+                    'available': book.available_quantity
                 })
             
             results['total'] += books.total
@@ -533,8 +549,8 @@ def notifications():
 def reports():
     """Reports page"""
     # Get date range from query params
-    start_date = request.args.get('start_date', (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
-    end_date = request.args.get('end_date', datetime.now().strftime('%Y-%m-%d'))
+    start_date = request.args.get('start_date', date.today() - timedelta(days=30), type=date.fromisoformat)
+    end_date = request.args.get('end_date', date.today(), type=date.fromisoformat)
     
     # Most borrowed books
     most_borrowed = db.session.query(
@@ -568,12 +584,12 @@ def reports():
     
     # Daily transactions
     daily_stats = db.session.query(
-        db.func.date(Transaction.borrow_date).label('date'),
+        Transaction.borrow_date.label('date'),
         db.func.count(Transaction.id).label('count')
     ).filter(
         Transaction.borrow_date >= start_date,
         Transaction.borrow_date <= end_date
-    ).group_by(db.func.date(Transaction.borrow_date)).all()
+    ).group_by(Transaction.borrow_date).all()
     
     return render_template('reports.html',
                          start_date=start_date,
@@ -621,6 +637,19 @@ def backup():
     backups.sort(key=lambda x: x['created'], reverse=True)
     return render_template('backup.html', backups=backups)
 
+@app.route('/admin/profiles')
+@login_required
+@role_required('admin')
+def profiles():
+    """Kaydedilen istek profilleri ve sürekli örneklemenin sıcak fonksiyonları"""
+    recent = request_profiler.list_profiles()
+    for profile in recent:
+        profile['created'] = datetime.fromtimestamp(profile['created'])
+    return render_template('profiles.html', profiles=recent,
+                           sampling=request_profiler.sampled_hot_functions(),
+                           sampling_interval=request_profiler.sampling_interval,
+                           profile_token=request_profiler.make_token())
+
 @app.route('/members/<int:id>')
 @login_required
 def member_detail(id):
@@ -634,6 +663,7 @@ def inventory():
     return render_template('inventory.html')
 
 @app.route('/shelf-map')
+@cache_page(timeout=3600)
 def shelf_map():
     return render_template('shelf_map.html')
 
@@ -7,7 +7,7 @@ from flask import render_template, request, jsonify, redirect, url_for, flash
 from flask_login import login_required, current_user
 from models import db, Book, Member, Transaction, User
 from ai_engine import get_ai_engine
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 import json
 
 def register_enhanced_routes(app):
@@ -108,7 +108,7 @@ def register_enhanced_routes(app):
         active_transactions = Transaction.query.filter_by(return_date=None).count()
         
         # Son 30 günlük veriler
-        thirty_days_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+        thirty_days_ago = date.today() - timedelta(days=30)
         recent_transactions = Transaction.query.filter(
             Transaction.borrow_date >= thirty_days_ago
         ).count()
@@ -181,9 +181,7 @@ def register_enhanced_routes(app):
                     'publishers': book.publishers,
                     'category': book.category,
                     'quantity': book.quantity,
-                    'available': book.quantity - Transaction.query.filter_by(
-                        isbn=book.isbn, return_date=None
-                    ).count()
+                    'available': book.available_quantity
                 })
             
             return jsonify({
@@ -0,0 +1,148 @@
+"""
+Katalog Arama İndeksi
+Flask ve Django tarafının ortak kullandığı SQLite FTS5 şeması, Türkçe harf
+katlama ve sorgu (MATCH) ifadesi üretimi
+"""
+
+import hashlib
+import re
+
+SEARCH_TABLE = 'books_fts'
+MAP_TABLE = 'books_search_map'
+
+# Aranan kolonlar ve BM25 ağırlıkları (başlık eşleşmesi en değerli)
+SEARCH_COLUMNS = ('title', 'authors', 'publishers', 'description')
+BM25_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+# unicode61 tokenizer'ı ç/ğ/ö/ş/ü/İ harflerini kendisi katlar, yalnızca ı harfini
+# i'ye çevirmez; sorgu tarafında aynı sonucu üretmek için hepsini katlıyoruz
+TURKISH_FOLD = str.maketrans('çğıöşüÇĞİIÖŞÜâîûÂÎÛ', 'cgiosucgiiosuaiuaiu')
+
+TOKEN_RE = re.compile(r'\w+')
+ISBN_QUERY_RE = re.compile(r'[0-9Xx\-\s]+')
+
+def fold_turkish(text):
+    """Türkçe karakterleri ASCII karşılıklarına katla ve küçük harfe çevir"""
+    return (text or '').translate(TURKISH_FOLD).lower()
+
+def normalize_isbn(text):
+    """ISBN/barkod teriminden tire ve boşlukları at"""
+    return re.sub(r'[^0-9Xx]', '', text or '').upper()
+
+def is_isbn_query(text):
+    """Terim tam bir ISBN gibi mi görünüyor (10 veya 13 hane, harf yok)"""
+    return bool(text and ISBN_QUERY_RE.fullmatch(text) and len(normalize_isbn(text)) in (10, 13))
+
+def is_numeric_query(text):
+    """Terim ISBN/barkod parçası olabilir mi (en az 4 rakam, harf yok); "1984" gibi
+    başlıklar da böyle göründüğü için metin aramasıyla birlikte kullanılmalı"""
+    return bool(text and ISBN_QUERY_RE.fullmatch(text) and sum(ch.isdigit() for ch in text) >= 4)
+
+def _terms(text):
+    tokens = TOKEN_RE.findall(fold_turkish(text))
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def match_expression(text=None, fields=None):
+    """Serbest metin ve kolon bazlı terimlerden FTS5 MATCH ifadesi üret
+
+    Her kelime önek olarak aranır ve tüm kelimeler eşleşmelidir; boş terimler
+    için None döner. fields: {'title': '...', 'authors': '...'}
+    """
+    parts = []
+    terms = _terms(text)
+    if terms:
+        parts.append(f'({terms})')
+
+    for column, value in (fields or {}).items():
+        if column not in SEARCH_COLUMNS:
+            raise ValueError(f'Aranamayan kolon: {column}')
+        terms = _terms(value)
+        if terms:
+            parts.append(f'{column} : ({terms})')
+
+    return ' AND '.join(parts) or None
+
+def ranked_isbns_sql(placeholder):
+    """Eşleşen ISBN'leri BM25 skoruyla döndüren sorgu (küçük skor daha iyi)"""
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    return (f"SELECT m.isbn AS isbn, bm25({SEARCH_TABLE}, {weights}) AS rank "
+            f"FROM {SEARCH_TABLE} JOIN {MAP_TABLE} m ON m.id = {SEARCH_TABLE}.rowid "
+            f"WHERE {SEARCH_TABLE} MATCH {placeholder}")
+
+def _folded(prefix):
+    return ', '.join(f"replace(coalesce({prefix}.{column}, ''), 'ı', 'i')" for column in SEARCH_COLUMNS)
+
+def schema_statements():
+    """FTS5 tablosu, ISBN -> rowid eşlemesi ve books tablosunu izleyen tetikleyiciler
+
+    books tablosunun tamsayı birincil anahtarı olmadığı için (rowid VACUUM ile
+    değişebilir) FTS satırları ayrı bir eşleme tablosunun kimliğini kullanır.
+    """
+    columns = ', '.join(SEARCH_COLUMNS)
+    fts_id = f"(SELECT id FROM {MAP_TABLE} WHERE isbn = {{}}.isbn)"
+    return [
+        f"CREATE TABLE IF NOT EXISTS {MAP_TABLE} (id INTEGER PRIMARY KEY, isbn TEXT NOT NULL UNIQUE)",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5({columns}, "
+        f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+        f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON books BEGIN
+            INSERT OR IGNORE INTO {MAP_TABLE} (isbn) VALUES (new.isbn);
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = {fts_id.format('new')};
+            INSERT INTO {SEARCH_TABLE} (rowid, {columns})
+                SELECT id, {_folded('new')} FROM {MAP_TABLE} WHERE isbn = new.isbn;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON books BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = {fts_id.format('old')};
+            DELETE FROM {MAP_TABLE} WHERE isbn = old.isbn;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF isbn, {columns} ON books BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = {fts_id.format('old')};
+            UPDATE {MAP_TABLE} SET isbn = new.isbn WHERE isbn = old.isbn;
+            INSERT INTO {SEARCH_TABLE} (rowid, {columns})
+                SELECT id, {_folded('new')} FROM {MAP_TABLE} WHERE isbn = new.isbn;
+        END""",
+    ]
+
+def drop_statements():
+    return [
+        f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_insert",
+        f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_delete",
+        f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_update",
+        f"DROP TABLE IF EXISTS {SEARCH_TABLE}",
+        f"DROP TABLE IF EXISTS {MAP_TABLE}",
+    ]
+
+def populate_statements():
+    """İndeksi books tablosundan baştan doldur"""
+    columns = ', '.join(SEARCH_COLUMNS)
+    return [
+        f"DELETE FROM {SEARCH_TABLE}",
+        f"DELETE FROM {MAP_TABLE}",
+        f"INSERT INTO {MAP_TABLE} (isbn) SELECT isbn FROM books",
+        f"INSERT INTO {SEARCH_TABLE} (rowid, {columns}) "
+        f"SELECT m.id, {_folded('b')} FROM {MAP_TABLE} m JOIN books b ON b.isbn = m.isbn",
+        f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')",
+    ]
+
+SCHEMA_VERSION = hashlib.sha1('\n'.join(schema_statements()).encode()).hexdigest()
+
+def install(cursor, rebuild=False):
+    """Şemayı DB-API cursor'ı ile kur; indeks boşsa (veya rebuild) doldur
+
+    İndekslenen kitap sayısını, doldurma gerekmediyse None döndürür.
+    """
+    if rebuild:
+        for statement in drop_statements():
+            cursor.execute(statement)
+    for statement in schema_statements():
+        cursor.execute(statement)
+
+    cursor.execute(f"SELECT count(*) FROM {MAP_TABLE}")
+    indexed = cursor.fetchone()[0]
+    cursor.execute("SELECT count(*) FROM books")
+    total = cursor.fetchone()[0]
+    if indexed == total and not rebuild:
+        return None
+
+    for statement in populate_statements():
+        cursor.execute(statement)
+    return total
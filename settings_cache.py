@@ -0,0 +1,97 @@
+"""
+Ayar Önbelleği
+settings tablosu süreç başına bir kez okunur ve değerler tipine çevrilmiş
+olarak bellekten verilir. Ayarlar değiştiğinde bir sürüm dosyası güncellenir;
+her gunicorn worker'ı bu dosyanın değişme zamanına bakarak önbelleğini yeniler
+"""
+
+import os
+import threading
+import time
+
+from models import db, Settings
+
+TRUE_VALUES = ('true', '1', 'yes', 'on', 'evet')
+
+# Sürüm dosyası güncellenmeden yapılan değişiklikler (masaüstü uygulaması,
+# elle SQL) için güvenlik ağı: önbellek en geç bu kadar saniyede yenilenir
+MAX_AGE_SECONDS = 300
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+class SettingsCache:
+    """Tüm ayarları tek sorguyla yükleyen, sürüm damgasıyla geçersizleşen önbellek"""
+
+    def __init__(self, stamp_path, max_age=MAX_AGE_SECONDS):
+        self.stamp_path = stamp_path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._values = None     # anahtar -> ham metin değer
+        self._typed = {}        # (anahtar, tip) -> çevrilmiş değer
+        self._stamp = None
+        self._loaded_at = 0.0
+        self.loads = 0
+
+    def _read_stamp(self):
+        # Dosya her seferinde yenisiyle değiştirildiği için inode, kaba zaman
+        # çözünürlüklü dosya sistemlerinde de değişikliği yakalar
+        try:
+            stat = os.stat(self.stamp_path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _load(self, stamp):
+        rows = db.session.execute(db.select(Settings.key, Settings.value)).all()
+        values = {key: value for key, value in rows}
+        with self._lock:
+            self._values = values
+            self._typed = {}
+            self._stamp = stamp
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+        return values
+
+    def _current(self):
+        """Geçerli ayar sözlüğü; sürüm damgası değiştiyse veya süre dolduysa yeniden yüklenir"""
+        stamp = self._read_stamp()
+        values = self._values
+        if values is None or stamp != self._stamp or \
+                time.monotonic() - self._loaded_at > self.max_age:
+            values = self._load(stamp)
+        return values
+
+    def get(self, key, default=None, type=None):
+        """Ayar değerini döndür; type verilirse (int, float, bool) çevrilmiş değer, çevrilemezse default"""
+        values = self._current()
+        if key not in values or values[key] is None:
+            return default
+        if type is None:
+            return values[key]
+
+        cache_key = (key, type)
+        typed = self._typed
+        if cache_key not in typed:
+            converter = _to_bool if type is bool else type
+            try:
+                typed[cache_key] = converter(values[key])
+            except (TypeError, ValueError):
+                typed[cache_key] = default
+        return typed[cache_key]
+
+    def all(self):
+        return dict(self._current())
+
+    def invalidate(self):
+        """Bu süreçte önbelleği boşalt ve sürüm dosyasını güncelleyerek diğer worker'ları uyar"""
+        os.makedirs(os.path.dirname(self.stamp_path), exist_ok=True)
+        temp_path = f'{self.stamp_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as stamp_file:
+            stamp_file.write(f'{time.time_ns()} {os.getpid()}\n')
+        os.replace(temp_path, self.stamp_path)
+        with self._lock:
+            self._values = None
+            self._typed = {}
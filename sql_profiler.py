@@ -0,0 +1,298 @@
+"""
+İstek Başına SQL Profili
+Her istekte (ve Celery görevinde) çalışan SQL ifadelerini şekillerine göre sayar;
+aynı şekil eşiği aşınca (N+1 döngüsü) çağrı yeriyle birlikte uyarır, süresi sınırı
+aşan ifadeleri EXPLAIN QUERY PLAN çıktısıyla yavaş sorgu günlüğüne (JSON satırları)
+yazar. Yanıta Server-Timing/X-Query-Count başlıkları eklenir; son isteklerin özeti
+yönetici API'sinde görülür. Flask (init_sql_profiler) ve Django
+(library.middleware.SqlProfilerMiddleware) aynı çekirdeği kullanır
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from functools import lru_cache
+
+# Aynı şekil bir istekte bu kadar çalışırsa N+1 şüphesi
+N_PLUS_ONE_THRESHOLD = 10
+SLOW_QUERY_MS = 200
+# İstek başına sorgu bütçesi; aşılırsa özet over_budget olarak işaretlenir
+QUERY_BUDGET = 30
+
+RECENT_REQUESTS = 200
+MAX_SHAPES = 500
+SLOW_LOG_MAX_BYTES = 5 * 1024 * 1024
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+THIS_FILE = os.path.abspath(__file__)
+
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)', re.IGNORECASE)
+SPACE_RE = re.compile(r'\s+')
+
+@lru_cache(maxsize=4096)
+def query_shape(statement):
+    """Parametre/sabit değerlerden bağımsız sorgu şekli; IN (?, ?, ?) listeleri tek ? olur"""
+    shape = LITERAL_RE.sub('?', statement)
+    shape = IN_LIST_RE.sub('IN (?)', shape)
+    return SPACE_RE.sub(' ', shape).strip()
+
+def call_site():
+    """Sorguyu tetikleyen ilk proje satırı (kütüphane çerçeveleri atlanır)"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith('<'):  # SQLAlchemy'nin ürettiği kod ('<string>')
+            frame = frame.f_back
+            continue
+        filename = os.path.abspath(filename)
+        if filename.startswith(PROJECT_ROOT) and filename != THIS_FILE and \
+                'site-packages' not in filename and os.sep + 'library' + os.sep + 'middleware' not in filename:
+            return f'{os.path.relpath(filename, PROJECT_ROOT)}:{frame.f_lineno} ({frame.f_code.co_name})'
+        frame = frame.f_back
+    return None
+
+class QueryRecorder:
+    """Tek bir istek veya görev boyunca çalışan ifadeler"""
+
+    def __init__(self, label):
+        self.label = label
+        self.started = time.perf_counter()
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self.repeated = []   # [{'shape', 'count', 'site'}]
+
+    def summary(self, budget):
+        return {
+            'label': self.label,
+            'queries': self.count,
+            'db_ms': round(self.seconds * 1000, 2),
+            'duration_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'over_budget': self.count > budget,
+            'repeated': [dict(item, count=self.shapes[item['shape']]) for item in self.repeated],
+        }
+
+class SqlProfiler:
+    def __init__(self, slow_log_path, slow_query_ms=SLOW_QUERY_MS,
+                 n_plus_one_threshold=N_PLUS_ONE_THRESHOLD, budget=QUERY_BUDGET):
+        self.slow_log_path = slow_log_path
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.budget = budget
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.recent = deque(maxlen=RECENT_REQUESTS)
+        self.shape_totals = {}   # şekil -> [çalışma, toplam sn]
+        self.counters = Counter()
+
+    # --- Kayıt ---
+
+    def start(self, label):
+        self._local.recorder = QueryRecorder(label)
+
+    def stop(self):
+        """Kaydı bitir ve özetini son istekler listesine ekle"""
+        recorder = getattr(self._local, 'recorder', None)
+        self._local.recorder = None
+        if recorder is None:
+            return None
+        summary = recorder.summary(self.budget)
+        with self._lock:
+            self.recent.append(summary)
+            self.counters['requests'] += 1
+            self.counters['over_budget'] += summary['over_budget']
+        return summary
+
+    @contextmanager
+    def profile(self, label):
+        """Celery görevleri ve betikler için: blok boyunca sorguları kaydet"""
+        self.start(label)
+        try:
+            yield
+        finally:
+            summary = self.stop()
+            if summary and (summary['repeated'] or summary['over_budget']):
+                print(f"⚠️ {label}: {summary['queries']} sorgu, {summary['db_ms']} ms")
+
+    def current(self):
+        return getattr(self._local, 'recorder', None)
+
+    def track(self, statement, parameters, seconds, explain=None):
+        """Bir ifadeyi kaydet; explain(statement, parameters) yavaş sorgularda plan döndürür"""
+        recorder = self.current()
+        shape = query_shape(statement)
+        with self._lock:
+            totals = self.shape_totals.get(shape)
+            if totals is None and len(self.shape_totals) < MAX_SHAPES:
+                totals = self.shape_totals[shape] = [0, 0.0]
+            if totals is not None:
+                totals[0] += 1
+                totals[1] += seconds
+
+        if recorder is not None:
+            recorder.count += 1
+            recorder.seconds += seconds
+            recorder.shapes[shape] += 1
+            if recorder.shapes[shape] == self.n_plus_one_threshold:
+                site = call_site()
+                recorder.repeated.append({'shape': shape, 'site': site})
+                with self._lock:
+                    self.counters['n_plus_one'] += 1
+                print(f"⚠️ N+1 şüphesi ({recorder.label}): {self.n_plus_one_threshold}+ kez "
+                      f"'{shape[:120]}' @ {site}")
+
+        if seconds * 1000 >= self.slow_query_ms:
+            with self._lock:
+                self.counters['slow_queries'] += 1
+            self._log_slow(statement, parameters, seconds, recorder, explain)
+
+    def _log_slow(self, statement, parameters, seconds, recorder, explain):
+        plan = None
+        if explain is not None:
+            try:
+                plan = explain(statement, parameters)
+            except Exception as e:
+                plan = f'EXPLAIN başarısız: {e}'
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'pid': os.getpid(),
+            'label': recorder.label if recorder else None,
+            'ms': round(seconds * 1000, 2),
+            'statement': statement,
+            'parameters': repr(parameters)[:500],
+            'site': call_site(),
+            'plan': plan,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.slow_log_path), exist_ok=True)
+            with self._lock, open(self.slow_log_path, 'a', encoding='utf-8') as log_file:
+                log_file.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+                size = log_file.tell()
+            if size > SLOW_LOG_MAX_BYTES:
+                os.replace(self.slow_log_path, self.slow_log_path + '.1')
+        except OSError as e:
+            print(f"❌ Yavaş sorgu günlüğü yazılamadı: {e}")
+
+    # --- Raporlama ---
+
+    def response_headers(self, summary):
+        """Sorgu bütçesi başlıkları (Server-Timing tarayıcı geliştirici araçlarında görünür)"""
+        headers = {
+            'Server-Timing': f'db;dur={summary["db_ms"]};desc="{summary["queries"]} queries"',
+            'X-Query-Count': str(summary['queries']),
+            'X-Query-Budget': str(self.budget),
+        }
+        if summary['repeated']:
+            headers['X-Query-Repeated'] = str(len(summary['repeated']))
+        return headers
+
+    def slow_log_tail(self, limit=20):
+        try:
+            with open(self.slow_log_path, encoding='utf-8') as log_file:
+                lines = deque(log_file, maxlen=limit)
+        except OSError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries
+
+    def report(self, limit=20):
+        """Bu worker'ın son istekleri, en pahalı sorgu şekilleri ve yavaş sorgu günlüğü"""
+        with self._lock:
+            recent = list(self.recent)
+            shapes = sorted(self.shape_totals.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+            counters = dict(self.counters)
+        return {
+            'pid': os.getpid(),
+            'settings': {
+                'slow_query_ms': self.slow_query_ms,
+                'n_plus_one_threshold': self.n_plus_one_threshold,
+                'query_budget': self.budget,
+            },
+            'counters': counters,
+            'worst_requests': sorted(recent, key=lambda s: s['queries'], reverse=True)[:limit],
+            'n_plus_one': [s for s in reversed(recent) if s['repeated']][:limit],
+            'top_shapes': [
+                {'shape': shape, 'executions': count, 'total_ms': round(total * 1000, 2)}
+                for shape, (count, total) in shapes
+            ],
+            'slow_queries': self.slow_log_tail(limit),
+        }
+
+def explain_sqlite(dbapi_connection):
+    def explain(statement, parameters):
+        if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters or ())
+            return [row[-1] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    return explain
+
+# --- Flask ---
+
+def install_sqlalchemy_profiler(profiler, engine):
+    from sqlalchemy import event
+
+    sqlite = engine.dialect.name == 'sqlite'
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profiler_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info['profiler_started'].pop()
+        explain = explain_sqlite(cursor.connection) if sqlite and not executemany else None
+        profiler.track(statement, parameters, seconds, explain)
+
+    @event.listens_for(engine, 'handle_error')
+    def drop_statement_timer(exception_context):
+        timers = exception_context.connection.info.get('profiler_started') \
+            if exception_context.connection is not None else None
+        if timers:
+            timers.pop()
+
+def init_sql_profiler(app, engine, profiler):
+    """İstek başına kayıt ve bütçe başlıkları
+
+    Başlıklar SQL_PROFILER_HEADERS açıksa veya debug modunda herkese, aksi halde
+    yalnızca yöneticilere eklenir.
+    """
+    from flask import request
+    from flask_login import current_user
+
+    install_sqlalchemy_profiler(profiler, engine)
+
+    @app.before_request
+    def start_sql_profile():
+        if request.endpoint != 'static':
+            profiler.start(f'{request.method} {request.url_rule.rule if request.url_rule else request.path}')
+
+    @app.after_request
+    def finish_sql_profile(response):
+        summary = profiler.stop()
+        if summary is None:
+            return response
+        show = app.debug or app.config.get('SQL_PROFILER_HEADERS', False) or \
+            (current_user.is_authenticated and getattr(current_user, 'role', None) == 'admin')
+        if show:
+            for name, value in profiler.response_headers(summary).items():
+                response.headers[name] = value
+        return response
+
+    @app.teardown_request
+    def discard_sql_profile(exc):
+        profiler.stop()
@@ -0,0 +1,208 @@
+"""
+SQLite Eşzamanlılık Testi
+Sürekli ödünç alma/iade yazıları devam ederken kitap listesi okuma hızını ölçer;
+Python'un varsayılan SQLite ayarları ile sqlite_profile profili karşılaştırılır.
+Her mod veritabanının geçici bir kopyası üzerinde çalışır, asıl veritabanı değişmez
+
+Kullanım:
+    python sqlite_benchmark.py [--seconds 10] [--readers 4] [--writers 2] [--books 20000] [--db instance/books_info.db]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from sqlite_profile import SQLITE_PRAGMAS, apply_pragmas, copy_database
+
+PAGE_SIZE = 20
+
+# Varsayılan: Python sqlite3 (rollback journal, synchronous=FULL, 5 sn kilit bekleme)
+MODES = {
+    'varsayılan': (('journal_mode', 'DELETE'),),
+    'profil': SQLITE_PRAGMAS,
+}
+
+SCHEMA = """
+CREATE TABLE books (
+    isbn VARCHAR(20) PRIMARY KEY, title TEXT, authors TEXT,
+    quantity INTEGER DEFAULT 1, borrowed_count INTEGER NOT NULL DEFAULT 0,
+    total_borrow_count INTEGER DEFAULT 0, last_borrowed_date TEXT
+);
+CREATE TABLE members (id INTEGER PRIMARY KEY, ad_soyad TEXT);
+CREATE TABLE transactions (
+    id INTEGER PRIMARY KEY, isbn VARCHAR(20) REFERENCES books (isbn),
+    member_id INTEGER REFERENCES members (id),
+    borrow_date DATE, due_date DATE, return_date DATE
+);
+CREATE INDEX ix_transactions_member_open ON transactions (member_id, return_date);
+CREATE INDEX ix_books_title ON books (title);
+"""
+
+def create_sample_database(path, books, members=500):
+    """Sentetik kitap/üye verisiyle test veritabanı oluştur"""
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    connection.executemany(
+        "INSERT INTO books (isbn, title, authors, quantity) VALUES (?, ?, ?, ?)",
+        ((f'978{i:010d}', f'Kitap {i:06d}', f'Yazar {i % 997}', 1 + i % 3) for i in range(books))
+    )
+    connection.executemany(
+        "INSERT INTO members (id, ad_soyad) VALUES (?, ?)",
+        ((i, f'Üye {i}') for i in range(1, members + 1))
+    )
+    connection.commit()
+    connection.close()
+
+def _connect(path, pragmas):
+    connection = sqlite3.connect(path, timeout=5.0)
+    apply_pragmas(connection, pragmas)
+    return connection
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def reader(path, pragmas, start, deadline, results):
+    """Kitap listesi sayfası + üyenin açık ödünçleri (api_get_books / my-books benzeri)"""
+    connection = _connect(path, pragmas)
+    isbns = [row[0] for row in connection.execute("SELECT isbn FROM books")]
+    member_count = connection.execute("SELECT COUNT(*) FROM members").fetchone()[0]
+    reads, errors, latencies = 0, 0, []
+    time.sleep(max(0.0, start - time.time()))
+
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.execute(
+                "SELECT isbn, title, authors, quantity - borrowed_count FROM books "
+                "WHERE isbn >= ? ORDER BY isbn LIMIT ?",
+                (random.choice(isbns), PAGE_SIZE)
+            ).fetchall()
+            connection.execute(
+                "SELECT COUNT(*) FROM transactions WHERE member_id = ? AND return_date IS NULL",
+                (random.randint(1, member_count),)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+        reads += 1
+
+    connection.close()
+    results.put(('read', reads, errors, latencies))
+
+def writer(path, pragmas, start, deadline, results):
+    """Ödünç alma ve iadeyi sırayla yapan yazıcı (checkout_book_copy/release_book_copy SQL'i)"""
+    connection = _connect(path, pragmas)
+    isbns = [row[0] for row in connection.execute("SELECT isbn FROM books")]
+    member_count = connection.execute("SELECT COUNT(*) FROM members").fetchone()[0]
+    open_loans = []
+    writes, errors, latencies = 0, 0, []
+    time.sleep(max(0.0, start - time.time()))
+
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            if open_loans and (len(open_loans) > 50 or random.random() < 0.5):
+                transaction_id, isbn = open_loans.pop(random.randrange(len(open_loans)))
+                connection.execute(
+                    "UPDATE transactions SET return_date = date('now') WHERE id = ? AND return_date IS NULL",
+                    (transaction_id,)
+                )
+                connection.execute(
+                    "UPDATE books SET borrowed_count = borrowed_count - 1 "
+                    "WHERE isbn = ? AND borrowed_count > 0", (isbn,)
+                )
+            else:
+                isbn = random.choice(isbns)
+                updated = connection.execute(
+                    "UPDATE books SET borrowed_count = borrowed_count + 1, "
+                    "total_borrow_count = total_borrow_count + 1, last_borrowed_date = date('now') "
+                    "WHERE isbn = ? AND borrowed_count < quantity", (isbn,)
+                ).rowcount
+                if updated:
+                    cursor = connection.execute(
+                        "INSERT INTO transactions (isbn, member_id, borrow_date, due_date) "
+                        "VALUES (?, ?, date('now'), date('now', '+14 days'))",
+                        (isbn, random.randint(1, member_count))
+                    )
+                    open_loans.append((cursor.lastrowid, isbn))
+            connection.commit()
+        except sqlite3.OperationalError:
+            connection.rollback()
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+        writes += 1
+
+    connection.close()
+    results.put(('write', writes, errors, latencies))
+
+def run_mode(seed_path, pragmas, seconds, readers, writers):
+    """Tek mod: veritabanı kopyası üzerinde okuyucu ve yazıcı süreçlerini çalıştır"""
+    work_dir = tempfile.mkdtemp(prefix='sqlite-bench-')
+    path = os.path.join(work_dir, 'bench.db')
+    copy_database(seed_path, path)
+    # journal_mode kalıcıdır; süreçler başlamadan dosyaya uygulanır
+    setup = _connect(path, pragmas)
+    setup.close()
+
+    results = multiprocessing.Queue()
+    # Süreçler hazırlığını bitirip aynı anda ölçüme başlar
+    start = time.time() + 2.0
+    deadline = start + seconds
+    processes = [multiprocessing.Process(target=writer, args=(path, pragmas, start, deadline, results))
+                 for _ in range(writers)]
+    processes += [multiprocessing.Process(target=reader, args=(path, pragmas, start, deadline, results))
+                  for _ in range(readers)]
+    for process in processes:
+        process.start()
+
+    totals = {'read': [0, 0, []], 'write': [0, 0, []]}
+    for _ in processes:
+        kind, count, errors, latencies = results.get()
+        totals[kind][0] += count
+        totals[kind][1] += errors
+        totals[kind][2].extend(latencies)
+    for process in processes:
+        process.join()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description='Yazı yükü altında SQLite okuma hızı')
+    parser.add_argument('--seconds', type=float, default=10.0, help='Her mod için ölçüm süresi')
+    parser.add_argument('--readers', type=int, default=4, help='Okuyucu süreç sayısı')
+    parser.add_argument('--writers', type=int, default=2, help='Ödünç/iade yazıcı süreç sayısı')
+    parser.add_argument('--books', type=int, default=20000, help='Sentetik veritabanındaki kitap sayısı')
+    parser.add_argument('--db', help='Sentetik veri yerine bu veritabanının kopyasını kullan')
+    args = parser.parse_args()
+
+    if args.db:
+        seed_path = args.db
+    else:
+        seed_path = os.path.join(tempfile.mkdtemp(prefix='sqlite-bench-'), 'seed.db')
+        create_sample_database(seed_path, args.books)
+
+    print(f"📊 {args.readers} okuyucu, {args.writers} yazıcı, mod başına {args.seconds:g} sn")
+    print(f"{'Mod':<12}{'okuma/sn':>10}{'p50 ms':>9}{'p99 ms':>9}{'yazma/sn':>10}{'p99 ms':>9}{'kilit hatası':>14}")
+    for name, pragmas in MODES.items():
+        totals = run_mode(seed_path, pragmas, args.seconds, args.readers, args.writers)
+        reads, read_errors, read_latencies = totals['read']
+        writes, write_errors, write_latencies = totals['write']
+        print(
+            f"{name:<12}{reads / args.seconds:>10.0f}"
+            f"{_percentile(read_latencies, 0.50) * 1000:>9.2f}{_percentile(read_latencies, 0.99) * 1000:>9.2f}"
+            f"{writes / args.seconds:>10.0f}{_percentile(write_latencies, 0.99) * 1000:>9.2f}"
+            f"{read_errors + write_errors:>14}"
+        )
+
+if __name__ == '__main__':
+    main()
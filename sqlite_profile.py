@@ -0,0 +1,154 @@
+"""
+SQLite Bağlantı Profili
+Her yeni SQLite bağlantısına WAL günlüğü, kilit bekleme süresi, senkronizasyon
+seviyesi ve önbellek/mmap boyutlarını uygular; WAL dosyasını periyodik olarak
+checkpoint edip PRAGMA optimize çalıştıran bakım işini içerir.
+Flask (SQLAlchemy connect olayı) ve Django (connection_created sinyali) aynı profili kullanır
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+# Sırası önemli: journal_mode ilk uygulanır, diğerleri bağlantıya özeldir.
+# WAL ağ dosya sistemlerinde çalışmadığı için SQLITE_JOURNAL_MODE ile değiştirilebilir
+SQLITE_PRAGMAS = (
+    ('journal_mode', os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')),
+    ('busy_timeout', 5000),          # ms; kilitli veritabanında hemen hata vermek yerine bekle
+    ('synchronous', 'NORMAL'),       # WAL'da güvenli; her commit'te fsync yapılmaz
+    ('cache_size', -20000),          # negatif değer KiB: bağlantı başına ~20 MB sayfa önbelleği
+    ('mmap_size', 268435456),        # 256 MB bellek eşlemeli okuma
+    ('temp_store', 'MEMORY'),
+    ('journal_size_limit', 67108864),  # checkpoint sonrası WAL dosyası 64 MB'a kırpılır
+)
+
+# Bakım işi: WAL checkpoint + PRAGMA optimize en fazla bu aralıkla çalışır
+MAINTENANCE_INTERVAL_SECONDS = 15 * 60
+
+def apply_pragmas(dbapi_connection, pragmas=SQLITE_PRAGMAS):
+    """DB-API (sqlite3) bağlantısına profil PRAGMA'larını uygula"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+def current_pragmas(dbapi_connection, pragmas=SQLITE_PRAGMAS):
+    """Bağlantıdaki geçerli PRAGMA değerleri (tanılama için)"""
+    cursor = dbapi_connection.cursor()
+    try:
+        return {name: cursor.execute(f'PRAGMA {name}').fetchone()[0] for name, _ in pragmas}
+    finally:
+        cursor.close()
+
+def install_sqlalchemy_profile(engine):
+    """SQLAlchemy motorunun her yeni bağlantısında profili uygula (SQLite değilse bir şey yapmaz)"""
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'connect')
+    def _apply_sqlite_profile(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection)
+
+    return True
+
+def checkpoint_and_optimize(dbapi_connection):
+    """WAL'ı ana dosyaya aktarıp kırp ve sorgu planlayıcı istatistiklerini güncelle
+
+    (busy, wal_pages, checkpointed_pages) döndürür; busy=1 ise okuyucular yüzünden
+    checkpoint tamamlanamamıştır, bir sonraki çalışmada tekrar denenir.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        result = tuple(cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone())
+        cursor.execute('PRAGMA optimize')
+    finally:
+        cursor.close()
+    return result
+
+def copy_database(source_path, target_path):
+    """Veritabanını SQLite yedekleme API'siyle kopyala
+
+    WAL modunda son commit'ler -wal dosyasında olabileceği için dosya kopyalamak
+    (shutil.copy) eksik veya tutarsız yedek üretir. Hedef canlı veritabanı ise
+    geri yükleme de aynı fonksiyonla, açık bağlantılara zarar vermeden yapılır.
+    """
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+class SqliteMaintenance:
+    """Checkpoint/optimize işini süreç başına bir arka plan iş parçacığında çalıştırır
+
+    connect: DB-API bağlantısı döndüren fonksiyon (close() ile bırakılır).
+    Worker'lar arası koordinasyon stamp_path dosyasının değişme zamanıyla yapılır;
+    iki worker'ın aynı anda çalıştırması zararsızdır, yalnızca gereksizdir.
+    """
+
+    def __init__(self, connect, stamp_path, interval=MAINTENANCE_INTERVAL_SECONDS):
+        self.connect = connect
+        self.stamp_path = stamp_path
+        self.interval = interval
+        self._pid = None
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.last_result = None
+
+    def _seconds_since_last_run(self):
+        try:
+            return time.time() - os.stat(self.stamp_path).st_mtime
+        except OSError:
+            return None
+
+    def _touch_stamp(self):
+        os.makedirs(os.path.dirname(self.stamp_path), exist_ok=True)
+        with open(self.stamp_path, 'a'):
+            pass
+        os.utime(self.stamp_path)
+
+    def run(self):
+        """İşi hemen çalıştır"""
+        self._touch_stamp()
+        connection = self.connect()
+        try:
+            self.last_result = checkpoint_and_optimize(connection)
+        finally:
+            connection.close()
+        self.runs += 1
+        return self.last_result
+
+    def run_if_due(self):
+        """Herhangi bir worker son interval içinde çalıştırmadıysa işi çalıştır"""
+        elapsed = self._seconds_since_last_run()
+        if elapsed is not None and elapsed < self.interval:
+            return None
+        return self.run()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                result = self.run_if_due()
+                if result and result[0]:
+                    print(f"⚠️ WAL checkpoint tamamlanamadı (okuyucular meşgul): {result}")
+            except Exception as e:
+                print(f"❌ SQLite bakım hatası: {e}")
+
+    def start(self):
+        """Bu süreçte arka plan iş parçacığını başlat (fork sonrası her worker kendi iş parçacığını açar)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            threading.Thread(target=self._loop, name='sqlite-maintenance', daemon=True).start()
@@ -601,68 +601,7 @@ function returnBook() {
 
 // ==================== BİLDİRİM YÖNETİMİ ====================
 
-// Bildirimleri yükle
-function loadNotifications() {
-    $.ajax({
-        url: '/api/notifications',
-        method: 'GET',
-        timeout: 2000,
-        success: function(data) {
-            displayNotifications(data.notifications);
-        },
-        error: function() {
-            $('#notificationsContainer').html('<div class="alert alert-danger">Bildirimler yüklenemedi</div>');
-        }
-    });
-}
-
-// Bildirimleri göster
-function displayNotifications(notifications) {
-    const container = $('#notificationsContainer');
-    container.empty();
-    
-    if (!notifications || notifications.length === 0) {
-        container.html('<div class="alert alert-info">Henüz bildirim yok</div>');
-        return;
-    }
-    
-    notifications.forEach(notif => {
-        const typeClass = {
-            'return_reminder': 'alert-warning',
-            'overdue': 'alert-danger',
-            'success': 'alert-success',
-            'info': 'alert-info'
-        }[notif.type] || 'alert-secondary';
-        
-        const readClass = notif.is_read ? 'opacity-75' : '';
-        
-        container.append(`
-            <div class="alert ${typeClass} ${readClass}" data-id="${notif.id}">
-                <div class="d-flex justify-content-between align-items-start">
-                    <div>
-                        <strong>${notif.message}</strong><br>
-                        <small class="text-muted">${formatDate(notif.created_date)}</small>
-                    </div>
-                    <button class="btn btn-sm btn-outline-secondary" onclick="markNotificationRead(${notif.id})">
-                        ${notif.is_read ? '✓' : 'Okundu işaretle'}
-                    </button>
-                </div>
-            </div>
-        `);
-    });
-}
-
-// Bildirimi okundu işaretle
-function markNotificationRead(id) {
-    $.ajax({
-        url: `/api/notifications/${id}/read`,
-        method: 'POST',
-        success: function() {
-            $(`[data-id="${id}"]`).addClass('opacity-75').find('button').text('✓');
-            checkNotifications(); // Badge'i güncelle
-        }
-    });
-}
+// Bildirim listesi (cursor ile sayfalı) templates/notifications.html'de yüklenir
 
 // ==================== YARDIMCI FONKSİYONLAR ====================
 
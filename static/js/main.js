@@ -251,15 +251,14 @@ function loadPageData() {
 
 // BİLDİRİM KONTROLÜ - OPTİMİZE
 function checkNotifications() {
-    if (!isUserAuthenticated()) return;
+    if (!isUserAuthenticated() || document.hidden) return;
     
     $.ajax({
-        url: '/api/notifications?unread_only=true',
+        url: '/api/notifications/unread-count',
         timeout: 2000,
         showLoading: false,
         success: function(data) {
-            const count = data.notifications ? data.notifications.length : 0;
-            updateNotificationBadge(count);
+            updateNotificationBadge(data.count || 0);
         },
         error: function() {
             // Sessizce başarısız ol
@@ -440,7 +439,10 @@ window.addEventListener('error', function(e) {
 // BİLDİRİM BAŞLATMA
 if (isUserAuthenticated()) {
     setTimeout(checkNotifications, 1000);
-    setInterval(checkNotifications, 60000); // 1 dakikada bir
+    setInterval(checkNotifications, 60000); // 1 dakikada bir (arka plandaki sekmeler sormaz)
+    document.addEventListener('visibilitychange', function() {
+        if (!document.hidden) checkNotifications();
+    });
 }
 
 // GLOBAL FONKSİYONLAR
@@ -3,6 +3,8 @@
  */
 
 // Service Worker for CAL Library Management System
+// precache:start
+// build-static (static_assets.py) bu bloğu sürüm ve özetli dosya adlarıyla yeniden üretir
 const CACHE_NAME = 'cal-library-v1.0.0';
 const urlsToCache = [
     '/',
@@ -19,6 +21,7 @@ const urlsToCache = [
     '/static/manifest.json',
     '/offline'
 ];
+// precache:end
 
 // Install event
 self.addEventListener('install', function(event) {
@@ -0,0 +1,281 @@
+"""
+Parmak İzli (Fingerprinted) Statik Dosyalar
+static/ altındaki css/js/görsel dosyalarının içerik özetli kopyalarını static/dist/
+altına yazar (js/main.js -> dist/js/main.3f2a9c1b7d0e.js) ve eşleme tablosunu
+assets-manifest.json dosyasında tutar. url_for('static', filename=...) çağrıları
+bu tabloya göre özetli adlara çevrilir; özetli dosyalar içerik değişmeden adı da
+değişmeyeceği için 'Cache-Control: immutable' ile bir yıl önbelleklenir.
+Service worker (sw.js) önbellek adı ve ön yükleme listesi her derlemede yeniden
+üretilir; PWA yeni sürüme tek seferde geçer. Django tarafında aynı işi WhiteNoise
+CompressedManifestStaticFilesStorage yapar
+
+Kullanım:
+    flask --app app build-static
+    python static_assets.py [static klasörü]
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'assets-manifest.json'
+SERVICE_WORKER = 'sw.js'
+
+FINGERPRINT_EXTENSIONS = (
+    '.css', '.js', '.json', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp',
+    '.woff', '.woff2', '.ttf',
+)
+
+# Çalışma anında üretilen veya sabit adla sunulması gereken dosyalar
+SKIP_DIRS = {DIST_DIR, 'qrcodes'}
+SKIP_FILES = {SERVICE_WORKER}
+
+# Service worker'ın kurulumda önbelleğe aldığı dosyalar (mantıksal adlar)
+PRECACHE_PAGES = ('/', '/offline')
+PRECACHE_ASSETS = (
+    'css/bootstrap.min.css',
+    'css/style.css',
+    'css/dark-mode.css',
+    'css/enhanced.css',
+    'js/jquery-3.6.0.min.js',
+    'js/bootstrap.bundle.min.js',
+    'js/main.js',
+    'js/books-and-transactions.js',
+    'js/pwa.js',
+    'img/icon-192x192.png',
+    'manifest.json',
+)
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# sw.js içinde derlemede değiştirilen blok
+PRECACHE_BLOCK_RE = re.compile(
+    r'// precache:start\n.*?// precache:end\n', re.DOTALL
+)
+
+HASH_LENGTH = 12
+RELOAD_CHECK_SECONDS = 2.0
+
+def content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+def hashed_name(filename, digest):
+    """css/style.css -> dist/css/style.<özet>.css"""
+    stem, ext = os.path.splitext(filename)
+    return f'{DIST_DIR}/{stem}.{digest}{ext}'
+
+def iter_static_files(root):
+    """Parmak izi alınacak dosyaların static/ köküne göre '/' ayraçlı yolları"""
+    for directory, dirs, files in os.walk(root):
+        relative_dir = os.path.relpath(directory, root)
+        if relative_dir == '.':
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in sorted(files):
+            if not name.endswith(FINGERPRINT_EXTENSIONS):
+                continue
+            relative = name if relative_dir == '.' else f'{relative_dir}/{name}'.replace(os.sep, '/')
+            if relative in SKIP_FILES:
+                continue
+            yield relative
+
+def read_manifest(root):
+    try:
+        with open(os.path.join(root, DIST_DIR, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'version': None, 'files': {}}
+
+def _write_atomic(path, data):
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def render_service_worker(source, version, urls):
+    """sw.js kaynağındaki precache bloğunu sürüm ve URL listesiyle değiştir"""
+    lines = ',\n'.join(f'    {json.dumps(url)}' for url in urls)
+    block = (
+        '// precache:start\n'
+        f"const CACHE_NAME = 'cal-library-{version}';\n"
+        f'const urlsToCache = [\n{lines}\n];\n'
+        '// precache:end\n'
+    )
+    rendered, count = PRECACHE_BLOCK_RE.subn(lambda _: block, source, count=1)
+    if not count:
+        raise ValueError('sw.js içinde "// precache:start" bloğu bulunamadı')
+    return rendered
+
+def build_static(root, static_url='/static/'):
+    """Özetli kopyaları, manifesti ve sw.js'yi üret
+
+    Bir önceki derlemenin dosyaları silinmez; dağıtım sırasında eski sayfalar eski
+    özetli adları istemeye devam edebilir. Daha eski derlemelerin kopyaları temizlenir.
+    (kopyalanan, mevcut, silinen) sayılarını döndürür.
+    """
+    dist_root = os.path.join(root, DIST_DIR)
+    previous = read_manifest(root)
+    files = {}
+    copied = existing = 0
+
+    for filename in iter_static_files(root):
+        source = os.path.join(root, filename)
+        target_name = hashed_name(filename, content_hash(source))
+        target = os.path.join(root, target_name)
+        files[filename] = target_name
+        if os.path.exists(target):
+            existing += 1
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(source, target)
+        copied += 1
+
+    # Sürüm, tüm dosya özetlerinden türetilir; içerik değişmediyse sürüm de değişmez
+    version = hashlib.sha256(
+        json.dumps(files, sort_keys=True).encode('utf-8')
+    ).hexdigest()[:HASH_LENGTH]
+
+    urls = list(PRECACHE_PAGES) + [
+        static_url + files.get(filename, filename) for filename in PRECACHE_ASSETS
+    ]
+    with open(os.path.join(root, SERVICE_WORKER), encoding='utf-8') as f:
+        service_worker = render_service_worker(f.read(), version, urls)
+
+    os.makedirs(dist_root, exist_ok=True)
+    _write_atomic(os.path.join(dist_root, SERVICE_WORKER), service_worker)
+    _write_atomic(
+        os.path.join(dist_root, MANIFEST_NAME),
+        json.dumps({'version': version, 'files': files}, indent=2, sort_keys=True)
+    )
+
+    keep = set(files.values()) | set(previous.get('files', {}).values())
+    keep |= {f'{DIST_DIR}/{SERVICE_WORKER}', f'{DIST_DIR}/{MANIFEST_NAME}'}
+    removed = 0
+    for directory, _, names in os.walk(dist_root):
+        for name in names:
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            # .gz/.br kopyaları kaynaklarıyla birlikte yaşar
+            base = re.sub(r'\.(gz|br)$', '', relative)
+            if base not in keep:
+                os.remove(path)
+                removed += 1
+    return copied, existing, removed
+
+class AssetManifest:
+    """Manifesti süreç içinde tutar; dosya değişince (yeni derleme) yeniden okur"""
+
+    def __init__(self, root):
+        self.root = root
+        self.path = os.path.join(root, DIST_DIR, MANIFEST_NAME)
+        self._files = {}
+        self._hashed = frozenset()
+        self.version = None
+        self._mtime = None
+        self._checked = float('-inf')
+        self._lock = threading.Lock()
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now - self._checked < RELOAD_CHECK_SECONDS:
+            return
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                mtime = None
+            if mtime == self._mtime:
+                return
+            manifest = read_manifest(self.root) if mtime else {'version': None, 'files': {}}
+            self._files = manifest.get('files', {})
+            self._hashed = frozenset(self._files.values())
+            self.version = manifest.get('version')
+            self._mtime = mtime
+
+    def lookup(self, filename):
+        self._reload_if_changed()
+        return self._files.get(filename, filename)
+
+    def is_hashed(self, filename):
+        self._reload_if_changed()
+        return filename in self._hashed
+
+    def service_worker_path(self):
+        self._reload_if_changed()
+        if self.version:
+            return os.path.join(self.root, DIST_DIR, SERVICE_WORKER)
+        return os.path.join(self.root, SERVICE_WORKER)
+
+def init_static_assets(app):
+    """url_for('static') çevirisi, özetli dosyalara immutable önbellek, /sw.js ve /offline"""
+    from flask import render_template, send_file
+
+    assets = AssetManifest(app.static_folder)
+    app.extensions['static_assets'] = assets
+
+    @app.url_defaults
+    def fingerprint_static_url(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and \
+                app.config.get('STATIC_FINGERPRINTING', True):
+            values['filename'] = assets.lookup(values['filename'])
+
+    # http_compression'ın .br/.gz sunan görünümü de sarılır
+    serve_static = app.view_functions.get('static')
+    if serve_static is not None:
+        def static(filename):
+            response = serve_static(filename=filename)
+            if assets.is_hashed(filename):
+                response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+            return response
+
+        app.view_functions['static'] = static
+
+    @app.route('/sw.js')
+    def service_worker():
+        # Tarayıcı her gezinmede sw.js'yi yeniden doğrular; yeni sürüm buradan öğrenilir
+        response = send_file(
+            assets.service_worker_path(), mimetype='application/javascript',
+            conditional=True, etag=True, max_age=0
+        )
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Service-Worker-Allowed'] = '/'
+        return response
+
+    @app.route('/offline')
+    def offline():
+        return render_template('offline.html')
+
+    return assets
+
+def register_static_commands(app):
+    @app.cli.command('build-static')
+    def build_static_command():
+        """Özetli statik kopyaları, manifesti ve sw.js'yi üret; ardından .gz/.br kopyaları"""
+        from http_compression import brotli, precompress_static
+
+        copied, existing, removed = build_static(app.static_folder, app.static_url_path + '/')
+        version = read_manifest(app.static_folder)['version']
+        print(f"✅ Statik sürüm {version}: {copied} yeni, {existing} mevcut, {removed} eski kopya silindi")
+        written, skipped = precompress_static(app.static_folder)
+        print(f"✅ {written} sıkıştırılmış dosya yazıldı, {skipped} güncel")
+        if brotli is None:
+            print("💡 .br kopyaları için: pip install Brotli")
+
+def main(argv):
+    root = argv[1] if len(argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    copied, existing, removed = build_static(root)
+    print(f"✅ Statik sürüm {read_manifest(root)['version']}: {copied} yeni, {existing} mevcut, {removed} eski kopya silindi")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
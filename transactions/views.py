@@ -1,6 +1,6 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView, TemplateView
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, HttpResponse, Http404
 from django.urls import reverse
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import Sum
@@ -54,7 +54,9 @@ class BorrowView(LoginRequiredMixin, TemplateView):
 
     def post(self, request, *args, **kwargs):
         isbn = request.POST.get('isbn')
-        book = get_object_or_404(Book, isbn=isbn)
+        book = Book.find_by_isbn(isbn)
+        if book is None:
+            raise Http404('Kitap bulunamadı')
 
         # Basit kontrol: mevcut mu?
         if not book.is_available():
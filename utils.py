@@ -1,7 +1,6 @@
-from flask import request
+from flask import request, jsonify, has_request_context
 from flask_login import current_user
-from flask_mail import Message
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 import requests
 import qrcode
 import io
@@ -9,7 +8,6 @@ import base64
 import os
 import tempfile
 import pandas as pd
-import shutil
 import subprocess
 import sys
 import secrets
@@ -18,23 +16,25 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 
-from config import app, mail, get_setting
+from config import app, get_setting, activity_log, email_templates
 from models import db, User, Book, Member, Transaction, Category, BookCategory, Notification, SearchHistory, Review, Reservation, Fine, ActivityLog, Settings, EmailTemplate, OnlineBorrowRequest, QRCode
+from catalog_search import apply_search
+from sqlite_profile import copy_database
+import email_outbox
 
 def log_activity(action, details=None):
-    """Log user activity"""
-    try:
-        log = ActivityLog(
-            user_id=current_user.id if current_user.is_authenticated else None,
-            action=action,
-            details=details,
-            ip_address=request.remote_addr,
-            user_agent=request.user_agent.string
-        )
-        db.session.add(log)
-        db.session.commit()
-    except:
-        pass
+    """Log user activity (kuyruğa alınır, arka planda toplu yazılır; oturuma dokunmaz)"""
+    if not has_request_context():
+        # Celery görevleri ve CLI komutları
+        activity_log.log(user_id=None, action=action, details=details)
+        return
+    activity_log.log(
+        user_id=current_user.id if current_user.is_authenticated else None,
+        action=action,
+        details=details,
+        ip_address=request.remote_addr,
+        user_agent=request.user_agent.string
+    )
 
 def generate_qr_code(data):
     """Generate QR code and return base64 string"""
@@ -64,48 +64,45 @@ def save_qr_code(isbn):
 def calculate_fine(due_date, return_date=None):
     """Calculate fine amount for overdue books"""
     if return_date is None:
-        return_date = datetime.now()
-    else:
-        return_date = datetime.strptime(return_date, "%Y-%m-%d")
-    
-    due_date = datetime.strptime(due_date, "%Y-%m-%d")
+        return_date = date.today()
     
     if return_date <= due_date:
         return 0.0
     
     days_overdue = (return_date - due_date).days
-    fine_per_day = float(get_setting('fine_per_day', '1.0'))
+    fine_per_day = get_setting('fine_per_day', 1.0, type=float)
     
     return days_overdue * fine_per_day
 
+def checkout_book_copy(isbn):
+    """Ödünçteki kopya sayacını atomik olarak artır; boşta kopya yoksa False döndür"""
+    updated = Book.query.filter(Book.isbn == isbn, Book.borrowed_count < Book.quantity)\
+        .update({Book.borrowed_count: Book.borrowed_count + 1})
+    return updated == 1
+
+def close_transaction(transaction_id, return_date=None):
+    """Ödüncü yalnızca hâlâ açıksa kapat; eşzamanlı bir iade önce kapattıysa False döndür"""
+    updated = Transaction.query.filter(Transaction.id == transaction_id, Transaction.return_date.is_(None))\
+        .update({Transaction.return_date: return_date or date.today()})
+    return updated == 1
+
+def release_book_copy(isbn):
+    """İade edilen kopyayı ödünç sayacından düş"""
+    Book.query.filter(Book.isbn == isbn, Book.borrowed_count > 0)\
+        .update({Book.borrowed_count: Book.borrowed_count - 1})
+
+def queue_email(to_email, template_name, context):
+    """E-postayı giden kutusuna ekle; çağıranın COMMIT'iyle aynı işlemde yazılır"""
+    if not get_setting('email_notifications', True, type=bool):
+        return None
+    return email_outbox.queue_email(email_templates, to_email, template_name, context)
+
 def send_email(to_email, template_name, context):
-    """Send email using template"""
-    if get_setting('email_notifications', 'true') != 'true':
-        return False
-    
-    template = EmailTemplate.query.filter_by(name=template_name, is_active=True).first()
-    if not template:
-        return False
-    
-    try:
-        # Replace variables in template
-        subject = template.subject
-        body = template.body
-        
-        for key, value in context.items():
-            subject = subject.replace(f"{{{{{key}}}}}", str(value))
-            body = body.replace(f"{{{{{key}}}}}", str(value))
-        
-        msg = Message(
-            subject=subject,
-            recipients=[to_email],
-            body=body
-        )
-        mail.send(msg)
-        return True
-    except Exception as e:
-        print(f"Email sending error: {e}")
+    """Send email using template (giden kutusuna yazılıp commit edilir, dağıtıcı gönderir)"""
+    if queue_email(to_email, template_name, context) is None:
         return False
+    db.session.commit()
+    return True
 
 def fetch_book_info_from_api(isbn):
     """Önce Google Books, sonra Open Library API'den kitap bilgisi ve kapak resmi çek"""
@@ -193,34 +190,16 @@ def add_notification(type, message, related_isbn=None):
     notification = Notification(
         type=type,
         message=message,
-        created_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        created_date=datetime.now(),
         related_isbn=related_isbn
     )
     db.session.add(notification)
     db.session.commit()
 
 def check_overdue_books():
-    """Check for overdue books and create notifications"""
-    # Books due soon
-    upcoming = db.session.query(Transaction, Book, Member).join(Book, Transaction.isbn == Book.isbn)\
-        .join(Member, Transaction.member_id == Member.id)\
-        .filter(Transaction.return_date == None)\
-        .filter(Transaction.due_date <= (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d"))\
-        .filter(Transaction.due_date >= datetime.now().strftime("%Y-%m-%d")).all()
-    
-    for trans, book, member in upcoming:
-        message = f"'{book.title}' kitabı {member.ad_soyad} tarafından {trans.due_date} tarihine kadar iade edilmelidir."
-        add_notification("return_reminder", message, book.isbn)
-    
-    # Overdue books
-    overdue = db.session.query(Transaction, Book, Member).join(Book, Transaction.isbn == Book.isbn)\
-        .join(Member, Transaction.member_id == Member.id)\
-        .filter(Transaction.return_date == None)\
-        .filter(Transaction.due_date < datetime.now().strftime("%Y-%m-%d")).all()
-    
-    for trans, book, member in overdue:
-        message = f"'{book.title}' kitabı {member.ad_soyad} tarafından {trans.due_date} tarihinden beri gecikmiştir."
-        add_notification("overdue", message, book.isbn)
+    """Check for overdue books and create notifications (yalnızca durumu değişen ödünçler için)"""
+    from overdue_scanner import scan_loan_notifications
+    return scan_loan_notifications()
 
 def process_borrow_transaction(book, member, method, notes):
     """Ödünç alma işlemini işle"""
@@ -229,8 +208,7 @@ def process_borrow_transaction(book, member, method, notes):
         return jsonify({'success': False, 'message': 'Üyenin ceza süresi devam ediyor'}), 403
     
     # Kullanılabilirlik kontrolü
-    borrowed_count = Transaction.query.filter_by(isbn=book.isbn, return_date=None).count()
-    if book.quantity <= borrowed_count:
+    if book.available_quantity <= 0:
         return jsonify({'success': False, 'message': 'Kitap şu anda mevcut değil'}), 400
     
     # Kullanıcının bu kitabı zaten ödünç alıp almadığını kontrol et
@@ -245,17 +223,22 @@ def process_borrow_transaction(book, member, method, notes):
     
     # Aktif ödünç alma sayısı kontrolü
     active_borrows = Transaction.query.filter_by(member_id=member.id, return_date=None).count()
-    max_books = int(get_setting('max_books_per_member', '5'))
+    max_books = get_setting('max_books_per_member', 5, type=int)
     if active_borrows >= max_books:
         return jsonify({'success': False, 'message': f'Üye maksimum {max_books} kitap ödünç alabilir'}), 400
     
+    # Kopyayı ayır (eşzamanlı ödünç almalara karşı koşullu güncelleme)
+    if not checkout_book_copy(book.isbn):
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Kitap şu anda mevcut değil'}), 400
+    
     # Ödünç alma işlemi
-    due_date = (datetime.now() + timedelta(days=int(get_setting('max_borrow_days', '14')))).strftime('%Y-%m-%d')
+    due_date = date.today() + timedelta(days=get_setting('max_borrow_days', 14, type=int))
     
     transaction = Transaction(
         isbn=book.isbn,
         member_id=member.id,
-        borrow_date=datetime.now().strftime('%Y-%m-%d'),
+        borrow_date=date.today(),
         due_date=due_date,
         notes=f'{method.upper()} ile ödünç alındı - {notes}'
     )
@@ -269,20 +252,21 @@ def process_borrow_transaction(book, member, method, notes):
     member.current_borrowed += 1
     
     db.session.add(transaction)
-    db.session.commit()
-    
-    # Bildirim oluştur
-    add_notification('borrow', f'"{book.title}" kitabı ödünç alındı', book.isbn)
     
-    # E-posta bildirimi gönder
+    # E-posta bildirimi (ödünç kaydıyla aynı işlemde giden kutusuna)
     if member.email:
-        send_email(member.email, 'book_borrowed', {
+        queue_email(member.email, 'book_borrowed', {
             'member_name': member.ad_soyad,
             'book_title': book.title,
             'due_date': due_date,
             'borrow_date': transaction.borrow_date
         })
     
+    db.session.commit()
+    
+    # Bildirim oluştur
+    add_notification('borrow', f'"{book.title}" kitabı ödünç alındı', book.isbn)
+    
     log_activity('borrow_transaction', f'{method.upper()} ile ödünç alma: {book.title} - {member.ad_soyad}')
     
     return jsonify({
@@ -310,18 +294,19 @@ def process_return_transaction(book, member, method, notes):
     if not transaction:
         return jsonify({'success': False, 'message': 'Bu kitap için aktif ödünç alma işlemi bulunamadı'}), 404
     
-    # İade işlemi
-    transaction.return_date = datetime.now().strftime('%Y-%m-%d')
+    # İade işlemi; sayaç yalnızca ödüncü bu istek kapattıysa düşer
+    if not close_transaction(transaction.id):
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Bu kitap için aktif ödünç alma işlemi bulunamadı'}), 404
     transaction.notes = f'{transaction.notes} - {method.upper()} ile iade edildi - {notes}'
     
     # Gecikme kontrolü
-    due_date = datetime.strptime(transaction.due_date, '%Y-%m-%d')
     fine_amount = 0
     days_overdue = 0
     
-    if datetime.now().date() > due_date.date():
-        days_overdue = (datetime.now().date() - due_date.date()).days
-        fine_amount = days_overdue * float(get_setting('daily_fine_amount', '1.0'))
+    if transaction.return_date > transaction.due_date:
+        days_overdue = (transaction.return_date - transaction.due_date).days
+        fine_amount = days_overdue * get_setting('daily_fine_amount', 1.0, type=float)
         
         # Ceza oluştur
         fine = Fine(
@@ -336,17 +321,13 @@ def process_return_transaction(book, member, method, notes):
         # Üye güvenilirlik puanını düşür
         member.reliability_score = max(0, member.reliability_score - (days_overdue * 2))
     
-    # Üye istatistiklerini güncelle
+    # Üye ve kitap sayaçlarını güncelle
     member.current_borrowed = max(0, member.current_borrowed - 1)
+    release_book_copy(book.isbn)
     
-    db.session.commit()
-    
-    # Bildirim oluştur
-    add_notification('return', f'"{book.title}" kitabı iade edildi', book.isbn)
-    
-    # E-posta bildirimi gönder
+    # E-posta bildirimi (iade kaydıyla aynı işlemde giden kutusuna)
     if member.email:
-        send_email(member.email, 'book_returned', {
+        queue_email(member.email, 'book_returned', {
             'member_name': member.ad_soyad,
             'book_title': book.title,
             'return_date': transaction.return_date,
@@ -354,6 +335,11 @@ def process_return_transaction(book, member, method, notes):
             'days_overdue': days_overdue
         })
     
+    db.session.commit()
+    
+    # Bildirim oluştur
+    add_notification('return', f'"{book.title}" kitabı iade edildi', book.isbn)
+    
     log_activity('return_transaction', f'{method.upper()} ile iade: {book.title} - {member.ad_soyad}')
     
     return jsonify({
@@ -377,8 +363,8 @@ def create_backup():
         backup_filename = f'backup_{timestamp}.db'
         backup_path = os.path.join(backup_dir, backup_filename)
         
-        # Copy database file
-        shutil.copy2('instance/books_info.db', backup_path)
+        # Copy database file (WAL içeriği dahil)
+        copy_database('instance/books_info.db', backup_path)
         
         log_activity('create_backup', f'Created backup: {backup_filename}')
         
@@ -401,10 +387,10 @@ def restore_backup(filename):
         db.engine.dispose()
         
         # Mevcut veritabanını yedekle
-        shutil.copy2('instance/books_info.db', 'instance/books_info_before_restore.db')
+        copy_database('instance/books_info.db', 'instance/books_info_before_restore.db')
         
         # Yedeği geri yükle
-        shutil.copy2(backup_path, 'instance/books_info.db')
+        copy_database(backup_path, 'instance/books_info.db')
         
         log_activity('restore_backup', f'Restored from backup: {filename}')
         
@@ -570,13 +556,13 @@ def process_online_borrow_request(request_data):
     notes = request_data.get('notes', '')
     
     # Kitap kontrolü
-    book = Book.query.get(isbn)
+    book = Book.find_by_isbn(isbn)
     if not book:
         return {'success': False, 'message': 'Kitap bulunamadı'}
+    isbn = book.isbn
     
     # Kullanılabilirlik kontrolü
-    borrowed_count = Transaction.query.filter_by(isbn=isbn, return_date=None).count()
-    if book.quantity <= borrowed_count:
+    if book.available_quantity <= 0:
         return {'success': False, 'message': 'Kitap şu anda mevcut değil'}
     
     # Üye kontrolü
@@ -590,7 +576,7 @@ def process_online_borrow_request(request_data):
     
     # Aktif ödünç alma sayısı kontrolü
     active_borrows = Transaction.query.filter_by(member_id=member.id, return_date=None).count()
-    max_books = int(get_setting('max_books_per_member', '5'))
+    max_books = get_setting('max_books_per_member', 5, type=int)
     if active_borrows >= max_books:
         return {'success': False, 'message': f'Maksimum {max_books} kitap ödünç alabilirsiniz'}
     
@@ -606,27 +592,21 @@ def process_online_borrow_request(request_data):
     )
     
     db.session.add(online_request)
-    db.session.commit()
+    db.session.flush()  # e-postalardaki talep numarası için
     
-    # E-posta bildirimi gönder
-    send_email(current_user.email, 'online_borrow_request', {
+    # Üyeye ve admin'lere e-posta (talep kaydıyla aynı işlemde giden kutusuna)
+    email_data = {
         'member_name': current_user.username,
         'book_title': book.title,
         'pickup_date': pickup_date,
         'pickup_time': pickup_time,
         'request_id': online_request.id
-    })
+    }
+    queue_email(current_user.email, 'online_borrow_request', email_data)
+    for admin_email in db.session.scalars(db.select(User.email).where(User.role == 'admin')):
+        queue_email(admin_email, 'admin_online_borrow_notification', email_data)
     
-    # Admin'lere bildirim gönder
-    admins = User.query.filter_by(role='admin').all()
-    for admin in admins:
-        send_email(admin.email, 'admin_online_borrow_notification', {
-            'member_name': current_user.username,
-            'book_title': book.title,
-            'pickup_date': pickup_date,
-            'pickup_time': pickup_time,
-            'request_id': online_request.id
-        })
+    db.session.commit()
     
     log_activity('online_borrow_request', f'Online ödünç alma talebi: {book.title}')
     
@@ -658,18 +638,18 @@ def approve_online_borrow_request(request_id):
         online_request.status = 'approved'
         online_request.approved_at = datetime.utcnow()
         online_request.approved_by = current_user.username
-        db.session.commit()
         
-        # Kullanıcıya onay e-postası gönder
+        # Kullanıcıya onay e-postası (onayla aynı işlemde giden kutusuna)
         user = User.query.get(online_request.user_id)
-        send_email(user.email, 'online_borrow_approved', {
+        queue_email(user.email, 'online_borrow_approved', {
             'member_name': user.username,
             'book_title': book.title,
             'pickup_date': online_request.pickup_date,
             'pickup_time': online_request.pickup_time,
-            'due_date': (datetime.now() + timedelta(days=int(get_setting('max_borrow_days', '14')))).strftime('%Y-%m-%d'),
+            'due_date': (datetime.now() + timedelta(days=get_setting('max_borrow_days', 14, type=int))).strftime('%Y-%m-%d'),
             'request_id': online_request.id
         })
+        db.session.commit()
         
         log_activity('approve_online_borrow', f'Online ödünç alma onaylandı: {book.title}')
         
@@ -690,18 +670,18 @@ def reject_online_borrow_request(request_id, reason):
     online_request.approved_at = datetime.utcnow()
     online_request.approved_by = current_user.username
     
-    db.session.commit()
-    
-    # Kullanıcıya red e-postası gönder
+    # Kullanıcıya red e-postası (retle aynı işlemde giden kutusuna)
     user = User.query.get(online_request.user_id)
     book = Book.query.get(online_request.isbn)
-    send_email(user.email, 'online_borrow_rejected', {
+    queue_email(user.email, 'online_borrow_rejected', {
         'member_name': user.username,
         'book_title': book.title,
         'reason': reason,
         'request_id': online_request.id
     })
     
+    db.session.commit()
+    
     log_activity('reject_online_borrow', f'Online ödünç alma reddedildi: {book.title}')
     
     return {'success': True, 'message': 'Ödünç alma talebi reddedildi ve kullanıcı bilgilendirildi'}
@@ -764,7 +744,7 @@ def get_member_statistics():
         Member.ad_soyad.label('name'), db.func.count(Transaction.id).label('overdue_count')
     ).join(Transaction).filter(
         Transaction.return_date == None,
-        Transaction.due_date < datetime.now().strftime('%Y-%m-%d')
+        Transaction.due_date < date.today()
     ).group_by(Member.id).order_by(db.text('overdue_count DESC')).limit(10).all()
     
     return {
@@ -785,28 +765,17 @@ def quick_search_books(query, limit=10):
         return {'success': False, 'message': 'Arama terimi gerekli'}
     
     # Kitap arama
-    books = Book.query.filter(
-        db.or_(
-            Book.title.contains(query),
-            Book.authors.contains(query),
-            Book.isbn.contains(query),
-            Book.barcode.contains(query)
-        )
-    ).limit(limit).all()
+    books = apply_search(Book.query, query).limit(limit).all()
     
     books_data = []
     for book in books:
-        # Mevcut durumu kontrol et
-        borrowed_count = Transaction.query.filter_by(isbn=book.isbn, return_date=None).count()
-        available = book.quantity > borrowed_count
-        
         books_data.append({
             'isbn': book.isbn,
             'title': book.title,
             'authors': book.authors,
             'quantity': book.quantity,
-            'available': available,
-            'borrowed_count': borrowed_count,
+            'available': book.available_quantity > 0,
+            'borrowed_count': book.borrowed_count,
             'shelf': book.shelf,
             'cupboard': book.cupboard,
             'image_path': book.image_path,